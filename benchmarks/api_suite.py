@@ -0,0 +1,342 @@
+"""
+Benchmark the Blog API scenario by scenario and compare the results with a stored baseline.
+
+Scenarios: list, list_summary, get, create, update, delete and token (login through
+POST /api/v1/auth/token). Each reports throughput and p50/p95/p99 latency.
+
+Two targets:
+
+    # In-process, through the Ninja test client. Creates a throwaway test database
+    # (test_<DB_NAME>) seeded with synthetic posts, and drops it afterwards.
+    python benchmarks/api_suite.py --posts 10000 --content-size 2000
+
+    # Against a running server. Posts are seeded through the bulk endpoint; the token
+    # scenario runs only when --username and --password are given.
+    python benchmarks/api_suite.py --url http://localhost:8000 --concurrency 16 --posts 1000
+
+Results can be saved and used as the baseline of later runs:
+
+    python benchmarks/api_suite.py --output benchmarks/baselines/inprocess.json
+    python benchmarks/api_suite.py --baseline benchmarks/baselines/inprocess.json --tolerance 0.2
+
+With --baseline, the exit status is 1 when any scenario's throughput fell, or its latency
+at --gate (p50 by default) rose, by more than --tolerance. Baselines are only comparable on the same machine and
+settings (e.g. POSTS_CACHE_BACKEND).
+"""
+
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import platform
+import random
+import statistics
+import string
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SCENARIOS = ["list", "list_summary", "get", "create", "update", "delete", "token"]
+USERNAME = "benchmark"
+PASSWORD = "benchmark-password"
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def make_post(rng: random.Random, content_size: int) -> dict:
+    """A synthetic post whose content is `content_size` characters of word-like text."""
+    words = []
+    length = 0
+    while length < content_size:
+        word = "".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 10)))
+        words.append(word)
+        length += len(word) + 1
+    content = " ".join(words)[:content_size]
+    return {"title": " ".join(words[:6]).title()[:200], "content": content}
+
+
+class InProcessClient:
+    """Calls the API through the Ninja test client: routing, parsing, services and rendering, no middleware."""
+
+    def __init__(self):
+        from django.conf import settings
+        from ninja.testing import TestAsyncClient, TestClient
+        from blog.api import api
+
+        if settings.API_ASYNC:
+            self.loop = asyncio.new_event_loop()
+            self.client = TestAsyncClient(api)
+        else:
+            self.loop = None
+            self.client = TestClient(api)
+
+    def request(self, method: str, path: str, body=None) -> tuple[int, bytes]:
+        # The test client resolves paths relative to the API root
+        path = path.removeprefix("/api")
+        response = self.client.request(method, path, json=body)
+        if self.loop:
+            response = self.loop.run_until_complete(response)
+        return response.status_code, response.content
+
+
+class HTTPClient:
+    """Keep-alive HTTP client with one connection per thread."""
+
+    def __init__(self, url: str, timeout: float):
+        parts = urlsplit(url)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.netloc = parts.netloc
+        self.prefix = parts.path.rstrip("/")
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def request(self, method: str, path: str, body=None) -> tuple[int, bytes]:
+        headers = {"Accept": "application/json"}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        for attempt in range(2):
+            connection = getattr(self.local, "connection", None)
+            if connection is None:
+                connection = self.local.connection = self.connection_class(self.netloc, timeout=self.timeout)
+            try:
+                connection.request(method, self.prefix + path, body=payload, headers=headers)
+                response = connection.getresponse()
+                return response.status, response.read()
+            except (http.client.HTTPException, OSError):
+                # The server closed an idle keep-alive connection; reconnect once
+                connection.close()
+                self.local.connection = None
+                if attempt:
+                    raise
+
+
+def seed_database(count: int, content_size: int, rng: random.Random) -> list[int]:
+    """Create a throwaway test database holding `count` synthetic posts and a benchmark user."""
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+    from post import cache
+    from post.models import Posts
+
+    setup_test_environment(debug=False)
+    settings.DB_REPLICAS = []
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    User.objects.create_user(USERNAME, password=PASSWORD)
+    for start in range(0, count, 5000):
+        Posts.objects.bulk_create(
+            Posts(**make_post(rng, content_size)) for _ in range(start, min(count, start + 5000))
+        )
+    cache.reset_backend()
+    return list(Posts.objects.values_list("id", flat=True))
+
+
+def seed_server(client: HTTPClient, count: int, content_size: int, rng: random.Random) -> list[int]:
+    """Create `count` posts through the bulk endpoint and return the ids of the posts on the server."""
+    for start in range(0, count, 500):
+        batch = [make_post(rng, content_size) for _ in range(start, min(count, start + 500))]
+        status, body = client.request("POST", "/api/v1/posts/bulk", batch)
+        if status >= 400:
+            raise SystemExit(f"Seeding failed with {status}: {body[:200]!r}")
+    ids = []
+    path = "/api/v1/posts?limit=100"
+    while path and len(ids) < max(count, 1000):
+        status, body = client.request("GET", path)
+        page = json.loads(body)
+        ids.extend(post["id"] for post in page["posts"])
+        path = f"/api/v1/posts?limit=100&after={page['next_cursor']}" if page.get("next_cursor") else None
+    return ids
+
+
+def build_scenarios(ids: list[int], args, rng: random.Random, credentials) -> dict:
+    """Map each scenario to a function returning (method, path, body, expected statuses) for one request."""
+    delete_ids = list(ids)
+    rng.shuffle(delete_ids)
+
+    def create():
+        return "POST", "/api/v1/posts", make_post(rng, args.content_size), (201,)
+
+    def update():
+        return "PUT", f"/api/v1/posts/{rng.choice(ids)}", {"title": f"Updated {uuid.uuid4().hex[:8]}"}, (200,)
+
+    def delete():
+        return "DELETE", f"/api/v1/posts/{delete_ids.pop()}", None, (204,)
+
+    scenarios = {
+        "list": lambda: ("GET", f"/api/v1/posts?limit={args.page_size}", None, (200,)),
+        "list_summary": lambda: ("GET", f"/api/v1/posts?limit={args.page_size}&summary=true", None, (200,)),
+        "get": lambda: ("GET", f"/api/v1/posts/{rng.choice(ids)}", None, (200,)),
+        "create": create,
+        "update": update,
+        # Runs last among the post scenarios, so it only deletes what the others no longer need
+        "delete": delete,
+    }
+    if credentials:
+        username, password = credentials
+        scenarios["token"] = lambda: ("POST", "/api/v1/auth/token", {"username": username, "password": password}, (200,))
+    return scenarios
+
+
+def run_scenario(client, make_request, requests: int, warmup: int, concurrency: int) -> dict:
+    def one(_):
+        method, path, body, expected = make_request()
+        started = time.perf_counter()
+        try:
+            status, _body = client.request(method, path, body)
+        except Exception:
+            status = None
+        return time.perf_counter() - started, status in expected
+
+    for _ in range(warmup):
+        one(None)
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(one, range(requests)))
+    else:
+        results = [one(None) for _ in range(requests)]
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency for latency, ok in results if ok]
+    result = {"requests": requests, "errors": requests - len(latencies), "throughput": len(latencies) / elapsed}
+    if latencies:
+        result.update(
+            mean_ms=statistics.mean(latencies) * 1000,
+            p50_ms=percentile(latencies, 50) * 1000,
+            p95_ms=percentile(latencies, 95) * 1000,
+            p99_ms=percentile(latencies, 99) * 1000,
+        )
+    return result
+
+
+def compare(results: dict, baseline: dict, tolerance: float, gate: str) -> list[str]:
+    """Print the change against the baseline per scenario and return the regressions."""
+    regressions = []
+    print(f"\n{'vs baseline':<13} {'req/s':>9} {'p50':>9} {'p95':>9}")
+    for name, result in results.items():
+        previous = baseline["scenarios"].get(name)
+        if not previous or "p50_ms" not in result or "p50_ms" not in previous:
+            continue
+        throughput = result["throughput"] / previous["throughput"] - 1
+        changes = {key: result[f"{key}_ms"] / previous[f"{key}_ms"] - 1 for key in ("p50", "p95", "p99")}
+        print(f"{name:<13} {throughput:>+9.1%} {changes['p50']:>+9.1%} {changes['p95']:>+9.1%}")
+        if throughput < -tolerance:
+            regressions.append(f"{name}: throughput {throughput:+.1%}")
+        if changes[gate] > tolerance:
+            regressions.append(f"{name}: {gate} {changes[gate]:+.1%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Base URL of a running server; runs in-process when omitted")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--posts", type=int, default=2000, help="Synthetic posts to seed")
+    parser.add_argument("--content-size", type=int, default=1000, help="Characters of content per post")
+    parser.add_argument("--requests", type=int, default=500, help="Timed requests per scenario")
+    parser.add_argument("--warmup", type=int, default=20, help="Untimed requests per scenario")
+    parser.add_argument(
+        "--token-requests", type=int, default=20, help="Timed requests for token, which is bound by password hashing"
+    )
+    parser.add_argument("--concurrency", type=int, default=1, help="Concurrent requests (--url only)")
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for data and request order")
+    parser.add_argument("--username", help="Existing user for the token scenario (--url only)")
+    parser.add_argument("--password")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--baseline", help="Compare with results saved by --output")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression")
+    parser.add_argument(
+        "--gate",
+        choices=["p50", "p95", "p99"],
+        default="p50",
+        help="Latency percentile checked against the baseline; tail percentiles need many --requests to be stable",
+    )
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    if "delete" in args.scenarios:
+        # Every delete needs its own post
+        args.posts = max(args.posts, args.requests + args.warmup)
+
+    if args.url:
+        client = HTTPClient(args.url, args.timeout)
+        ids = seed_server(client, args.posts, args.content_size, rng)
+        credentials = (args.username, args.password) if args.username and args.password else None
+    else:
+        os.environ.setdefault("DJANGO_SETTINGS_MODULE", "blog.settings")
+        import django
+
+        django.setup()
+        args.concurrency = 1
+        ids = seed_database(args.posts, args.content_size, rng)
+        client = InProcessClient()
+        credentials = (USERNAME, PASSWORD)
+
+    try:
+        scenarios = build_scenarios(ids, args, rng, credentials)
+        results = {}
+        print(f"{'scenario':<13} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>6}")
+        for name in sorted(args.scenarios, key=SCENARIOS.index):
+            if name not in scenarios:
+                print(f"{name:<13} skipped: needs --username and --password")
+                continue
+            if name == "token":
+                requests, warmup = args.token_requests, min(args.warmup, 2)
+            else:
+                requests, warmup = args.requests, args.warmup
+            result = results[name] = run_scenario(client, scenarios[name], requests, warmup, args.concurrency)
+            if "p50_ms" not in result:
+                print(f"{name:<13} all {result['requests']} requests failed")
+                continue
+            print(
+                f"{name:<13} {result['throughput']:>9.1f} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f}"
+                f" {result['p99_ms']:>8.2f} {result['errors']:>6}"
+            )
+    finally:
+        if not args.url:
+            from django.db import connection
+
+            connection.creation.destroy_test_db(connection.settings_dict["NAME"], verbosity=0)
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "target": args.url or "in-process",
+        "python": platform.python_version(),
+        "options": {
+            key: getattr(args, key)
+            for key in (
+                "posts", "content_size", "requests", "token_requests", "warmup", "concurrency", "page_size", "seed"
+            )
+        },
+        "scenarios": results,
+    }
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as fp:
+            json.dump(report, fp, indent=2)
+            fp.write("\n")
+
+    if args.baseline:
+        with open(args.baseline) as fp:
+            regressions = compare(results, json.load(fp), args.tolerance, args.gate)
+        if regressions:
+            raise SystemExit("Regressions beyond tolerance:\n  " + "\n  ".join(regressions))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Fire concurrent GET requests at a running Blog API and report throughput and latency.
+
+Used to compare deployment modes at the same worker count, e.g.:
+
+    # sync workers
+    gunicorn blog.wsgi:application --workers 4
+    python benchmarks/concurrency.py --url http://localhost:8000/api/v1/posts --concurrency 64
+
+    # uvicorn workers with the async handlers
+    API_ASYNC=True gunicorn blog.asgi:application --workers 4 -k uvicorn_worker.UvicornWorker
+    python benchmarks/concurrency.py --url http://localhost:8000/api/v1/posts --concurrency 64
+
+A local database answers in about a millisecond, which makes any workload CPU bound. To see
+how each mode copes with a remote or slow database, put a latency proxy in front of it and
+point the server at the proxy (DB_PORT=6432 here):
+
+    python benchmarks/concurrency.py --db-proxy localhost:5432 --listen-port 6432 --db-latency-ms 20
+
+Only the standard library is used so it can run from any environment.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def fetch(url: str, timeout: float) -> tuple[float, bool]:
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            response.read()
+            ok = response.status < 400
+    except Exception:
+        ok = False
+    return time.perf_counter() - started, ok
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run(url: str, requests: int, concurrency: int, timeout: float) -> dict:
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda _: fetch(url, timeout), range(requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency for latency, ok in results if ok]
+    errors = sum(1 for _, ok in results if not ok)
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000 if latencies else None,
+        "p95_ms": percentile(latencies, 95) * 1000 if latencies else None,
+        "p99_ms": percentile(latencies, 99) * 1000 if latencies else None,
+        "mean_ms": statistics.mean(latencies) * 1000 if latencies else None,
+    }
+
+
+async def _pipe(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, delay: float) -> None:
+    # Every chunk is released `delay` after it arrived, so the link adds latency but no bandwidth limit
+    chunks: asyncio.Queue = asyncio.Queue()
+
+    async def send() -> None:
+        while (item := await chunks.get()) is not None:
+            due, data = item
+            await asyncio.sleep(max(0.0, due - time.monotonic()))
+            writer.write(data)
+            await writer.drain()
+        writer.close()
+
+    sender = asyncio.create_task(send())
+    try:
+        while data := await reader.read(65536):
+            chunks.put_nowait((time.monotonic() + delay, data))
+    finally:
+        chunks.put_nowait(None)
+        await sender
+
+
+async def serve_db_proxy(upstream: str, listen_port: int, latency_ms: float) -> None:
+    """Forward TCP connections to `upstream`, delaying each direction by half of `latency_ms`."""
+    host, port = upstream.rsplit(":", 1)
+    delay = latency_ms / 2000
+
+    async def handle(client_reader: asyncio.StreamReader, client_writer: asyncio.StreamWriter) -> None:
+        try:
+            server_reader, server_writer = await asyncio.open_connection(host, int(port))
+        except OSError:
+            client_writer.close()
+            return
+        await asyncio.gather(
+            _pipe(client_reader, server_writer, delay), _pipe(server_reader, client_writer, delay), return_exceptions=True
+        )
+
+    server = await asyncio.start_server(handle, "127.0.0.1", listen_port)
+    print(f"Proxying 127.0.0.1:{listen_port} -> {upstream} with {latency_ms:g} ms added per round trip")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000/api/v1/posts")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--db-proxy", metavar="HOST:PORT", help="run a latency proxy to this database instead")
+    parser.add_argument("--listen-port", type=int, default=6432)
+    parser.add_argument("--db-latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    if args.db_proxy:
+        asyncio.run(serve_db_proxy(args.db_proxy, args.listen_port, args.db_latency_ms))
+        return
+
+    result = run(args.url, args.requests, args.concurrency, args.timeout)
+    if result["errors"] == result["requests"]:
+        raise SystemExit(f"All {result['requests']} requests to {args.url} failed")
+    print(
+        f"{result['requests']} requests, concurrency {result['concurrency']}, {result['errors']} errors\n"
+        f"throughput: {result['throughput']:.1f} req/s\n"
+        f"latency ms: p50 {result['p50_ms']:.1f}  p95 {result['p95_ms']:.1f}  p99 {result['p99_ms']:.1f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Measure per-request database connection overhead for each connection mode.
+
+Each simulated request does what Django does around a view: close_old_connections()
+on request_started, one small query, close_old_connections() on request_finished.
+Modes:
+
+    fresh       CONN_MAX_AGE=0: connect and disconnect on every request (the old default)
+    persistent  CONN_MAX_AGE=60 with health checks (sync gunicorn default)
+    pool        psycopg 3 pool (ASGI default when psycopg[pool] is installed)
+
+Runs against the database configured through the usual DB_* env vars:
+
+    python benchmarks/db_connections.py --requests 2000
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "blog.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.exceptions import ImproperlyConfigured  # noqa: E402
+from django.db.utils import ConnectionHandler  # noqa: E402
+
+MODES = {
+    "fresh": {"CONN_MAX_AGE": 0, "CONN_HEALTH_CHECKS": False, "OPTIONS": {}},
+    "persistent": {"CONN_MAX_AGE": 60, "CONN_HEALTH_CHECKS": True, "OPTIONS": {}},
+    "pool": {"CONN_MAX_AGE": 0, "CONN_HEALTH_CHECKS": True, "OPTIONS": {"pool": {"min_size": 1, "max_size": 4}}},
+}
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run(mode: str, requests: int) -> list[float]:
+    settings_dict = {**settings.DATABASES["default"], **MODES[mode]}
+    settings_dict.pop("TEST", None)
+    connection = ConnectionHandler({"default": settings_dict})["default"]
+    timings = []
+    try:
+        for _ in range(requests + 1):
+            started = time.perf_counter()
+            connection.close_if_unusable_or_obsolete()
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            connection.close_if_unusable_or_obsolete()
+            timings.append(time.perf_counter() - started)
+    finally:
+        connection.close()
+        if mode == "pool":
+            connection.close_pool()
+    # The first request pays for the initial connect in every mode
+    return timings[1:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    args = parser.parse_args()
+
+    print(f"{'mode':<11} {'mean ms':>8} {'p50 ms':>8} {'p99 ms':>8} {'req/s':>8}")
+    for mode in args.modes:
+        try:
+            timings = run(mode, args.requests)
+        except ImproperlyConfigured as exc:
+            print(f"{mode:<11} skipped: {exc}")
+            continue
+        mean = statistics.mean(timings)
+        print(
+            f"{mode:<11} {mean * 1000:>8.3f} {percentile(timings, 50) * 1000:>8.3f}"
+            f" {percentile(timings, 99) * 1000:>8.3f} {1 / mean:>8.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Compare ninja's default JSON renderer with the orjson renderer on lists of posts.
+
+The payload matches what ninja hands to the renderer for a List[PostOut] response
+(validated, then dumped to plain dicts with datetime values), so no database is needed:
+
+    python benchmarks/json_render.py
+    python benchmarks/json_render.py --sizes 1000 10000 100000 --repeat 5
+
+Timings include encoding to bytes, as HttpResponse does. Before timing, each size is
+rendered by both renderers and checked to decode to the same data, so datetime strings
+are byte-identical.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "blog.settings")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+import django  # noqa: E402
+
+django.setup()
+
+from ninja.renderers import JSONRenderer  # noqa: E402
+from blog.renderers import ORJSONRenderer, orjson  # noqa: E402
+from post.schemas import PostOut  # noqa: E402
+
+
+def make_payload(size: int) -> list[dict]:
+    started = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    posts = [
+        PostOut(
+            id=i,
+            title=f"Post title {i}",
+            content="Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 8,
+            created_at=started + timedelta(seconds=i, microseconds=i * 7),
+            updated_at=started + timedelta(seconds=i * 2, microseconds=i * 13),
+        )
+        for i in range(size)
+    ]
+    return [post.model_dump() for post in posts]
+
+
+def best_time(renderer, payload: list[dict], repeat: int) -> tuple[float, int]:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = renderer.render(None, payload, response_status=200)
+        # HttpResponse encodes str bodies; orjson already returns bytes
+        if isinstance(body, str):
+            body = body.encode()
+        timings.append(time.perf_counter() - started)
+    return min(timings), len(body)
+
+
+def check_equivalent(payload: list[dict]) -> None:
+    default = json.loads(JSONRenderer().render(None, payload, response_status=200))
+    fast = json.loads(ORJSONRenderer().render(None, payload, response_status=200))
+    if default != fast:
+        raise SystemExit("orjson output differs from the default renderer")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if orjson is None:
+        raise SystemExit("orjson is not installed; install it to compare renderers")
+
+    print(f"{'posts':>8}  {'json ms':>9}  {'orjson ms':>9}  {'speedup':>7}  {'json KB':>8}  {'orjson KB':>9}")
+    for size in args.sizes:
+        payload = make_payload(size)
+        check_equivalent(payload)
+        default_s, default_bytes = best_time(JSONRenderer(), payload, args.repeat)
+        fast_s, fast_bytes = best_time(ORJSONRenderer(), payload, args.repeat)
+        print(
+            f"{size:>8}  {default_s * 1000:>9.1f}  {fast_s * 1000:>9.1f}  {default_s / fast_s:>6.1f}x"
+            f"  {default_bytes / 1024:>8.0f}  {fast_bytes / 1024:>9.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Measure the middleware overhead per API request with and without the lean /api/ profile.
+
+Each mode loads a Django request handler with its own MIDDLEWARE list and sends it
+RequestFactory requests, so the numbers cover middleware, URL resolution and the view,
+without a server or network:
+
+    full   every middleware runs for /api/ (API_LEAN_MIDDLEWARE=False)
+    lean   SiteMiddleware skips SITE_MIDDLEWARE for /api/ (the default)
+
+    python benchmarks/middleware.py --requests 20000
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "blog.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.handlers.base import BaseHandler  # noqa: E402
+from django.test import RequestFactory, override_settings  # noqa: E402
+
+MODES = {
+    "full": [path for path in settings.MIDDLEWARE if path != "blog.middleware.SiteMiddleware"]
+    + settings.SITE_MIDDLEWARE,
+    "lean": settings.MIDDLEWARE,
+}
+
+
+def run(mode: str, path: str, requests: int, repeats: int) -> list[float]:
+    """Best-of-`repeats` mean seconds per request; the minimum filters out scheduler noise."""
+    with override_settings(MIDDLEWARE=MODES[mode]):
+        handler = BaseHandler()
+        handler.load_middleware()
+    factory = RequestFactory()
+    for _ in range(200):
+        handler.get_response(factory.get(path))
+
+    means = []
+    for _ in range(repeats):
+        batch = [factory.get(path) for _ in range(requests)]
+        started = time.perf_counter()
+        for request in batch:
+            handler.get_response(request)
+        means.append((time.perf_counter() - started) / requests)
+    return means
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default="/api/health", help="API path to request (no database for the default)")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    results = {mode: run(mode, args.path, args.requests, args.repeats) for mode in MODES}
+    print(f"{'mode':<6} {'best µs':>9} {'median µs':>10}")
+    for mode, means in results.items():
+        print(f"{mode:<6} {min(means) * 1e6:>9.1f} {statistics.median(means) * 1e6:>10.1f}")
+    saved = min(results["full"]) - min(results["lean"])
+    print(f"lean saves {saved * 1e6:.1f} µs per request ({saved / min(results['full']):.0%})")
+
+
+if __name__ == "__main__":
+    main()
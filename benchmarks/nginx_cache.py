@@ -0,0 +1,145 @@
+"""
+Check the nginx micro-cache in front of the API and measure cache hits against misses.
+
+Run against nginx, not the app, with HTTP_CACHE_PURGE_URLS pointing at nginx's refresh
+server (docker-compose.yml does this):
+
+    docker-compose -f docker-compose.yml -f docker-compose.cache.yml run --rm cache-check
+    # or from the host
+    python benchmarks/nginx_cache.py --url http://localhost:8000
+
+Checks, in order (exit status 1 if any fails):
+
+    miss/hit    the second anonymous GET of a post is served from the cache
+    bypass      a GET with an Authorization header always reaches the app
+    purge       after a PUT, the cached post shows the new title (refreshed by the app)
+    list        the cached list page shows the updated post
+
+Then times --requests cached GETs (HIT) and uncached ones (BYPASS) of the same post.
+"""
+
+import argparse
+import http.client
+import json
+import statistics
+import sys
+import time
+from urllib.parse import urlsplit
+
+
+class Client:
+    """Keep-alive HTTP client returning status, headers and parsed JSON."""
+
+    def __init__(self, url: str, timeout: float):
+        parts = urlsplit(url)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.netloc = parts.netloc
+        self.timeout = timeout
+        self.connection = None
+
+    def request(self, method: str, path: str, body=None, headers=None) -> tuple[int, http.client.HTTPMessage, object]:
+        headers = {"Accept": "application/json", **(headers or {})}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = self.connection_class(self.netloc, timeout=self.timeout)
+            try:
+                self.connection.request(method, path, body=payload, headers=headers)
+                response = self.connection.getresponse()
+                data = response.read()
+                return response.status, response.headers, json.loads(data) if data else None
+            except (http.client.HTTPException, OSError):
+                # nginx closed an idle keep-alive connection; reconnect once
+                self.connection.close()
+                self.connection = None
+                if attempt:
+                    raise
+
+
+def wait_for(check, timeout: float, interval: float = 0.1) -> float | None:
+    """Seconds until check() was true, or None if it was not within `timeout`."""
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        if check():
+            return time.perf_counter() - started
+        time.sleep(interval)
+    return None
+
+
+def timed(client: Client, path: str, requests: int, headers=None) -> tuple[list[float], set[str]]:
+    latencies, statuses = [], set()
+    for _ in range(requests):
+        started = time.perf_counter()
+        _, response_headers, _ = client.request("GET", path, headers=headers)
+        latencies.append(time.perf_counter() - started)
+        statuses.add(response_headers.get("X-Cache-Status", "-"))
+    return latencies, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000", help="Base URL of nginx")
+    parser.add_argument("--requests", type=int, default=500, help="Timed requests for the hit and bypass runs")
+    parser.add_argument(
+        "--purge-wait", type=float, default=1.0, help="Seconds to wait for a write; below HTTP_CACHE_TTL, so expiry alone fails"
+    )
+    parser.add_argument("--timeout", type=float, default=10.0)
+    args = parser.parse_args()
+
+    client = Client(args.url, args.timeout)
+    failures = []
+
+    def check(name: str, ok: bool, detail: str) -> None:
+        print(f"{name:<10} {'ok' if ok else 'FAIL':<5} {detail}")
+        if not ok:
+            failures.append(name)
+
+    status, _, post = client.request(
+        "POST", "/api/v1/posts", {"title": "Cache check", "content": "Created by nginx_cache.py"}
+    )
+    if status != 201:
+        raise SystemExit(f"Creating the test post failed with {status}")
+    path = f"/api/v1/posts/{post['id']}"
+
+    try:
+        first = client.request("GET", path)[1].get("X-Cache-Status")
+        second = client.request("GET", path)[1].get("X-Cache-Status")
+        check("miss/hit", second == "HIT", f"first {first}, second {second}")
+
+        _, headers, _ = client.request("GET", path, headers={"Authorization": "Bearer cache-check"})
+        cache_status = headers.get("X-Cache-Status")
+        check("bypass", cache_status == "BYPASS", f"with Authorization: {cache_status}, {headers.get('Cache-Control')}")
+
+        title = f"Cache check {time.time():.0f}"
+        client.request("PUT", path, {"title": title})
+        waited = wait_for(lambda: client.request("GET", path)[2]["title"] == title, args.purge_wait)
+        check("purge", waited is not None, f"new title after {waited:.2f}s" if waited is not None else "stale")
+
+        waited = wait_for(
+            lambda: any(row["title"] == title for row in client.request("GET", "/api/v1/posts")[2]["posts"]),
+            args.purge_wait,
+        )
+        check("list", waited is not None, f"new title after {waited:.2f}s" if waited is not None else "stale")
+
+        hits, hit_statuses = timed(client, path, args.requests)
+        misses, miss_statuses = timed(client, path, args.requests, headers={"Authorization": "Bearer cache-check"})
+    finally:
+        client.request("DELETE", path)
+
+    print()
+    print(f"{'run':<7} {'statuses':<14} {'p50 ms':>8} {'p95 ms':>8}")
+    for name, latencies, statuses in (("hit", hits, hit_statuses), ("bypass", misses, miss_statuses)):
+        p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else latencies[0]
+        print(f"{name:<7} {','.join(sorted(statuses)):<14} {statistics.median(latencies) * 1e3:>8.2f} {p95 * 1e3:>8.2f}")
+    print(f"cache hits are {statistics.median(misses) / statistics.median(hits):.1f}x faster at p50")
+
+    if failures:
+        print(f"Failed: {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
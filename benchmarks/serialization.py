@@ -0,0 +1,77 @@
+"""
+Measure the per-row cost of building list responses from model instances versus `.values()` rows.
+
+"instances" is the old list path: load Posts instances, convert each with PostOut.from_orm(),
+then validate and dump the page against PostPage as ninja does for a response schema.
+"values" is the current path: `.values()` dicts passed straight to the renderer.
+Rendering is identical for both, so it is left out.
+
+Runs against the configured database (posts must already exist, e.g. from import_posts):
+
+    python benchmarks/serialization.py --rows 10000 --repeat 5
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "blog.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from post.models import Posts  # noqa: E402
+from post.schemas import PostOut, PostPage  # noqa: E402
+from post.services import POST_OUT_FIELDS  # noqa: E402
+
+
+def from_instances(rows: int) -> list:
+    posts = [PostOut.from_orm(post).dict() for post in Posts.objects.order_by("-created_at", "-id")[:rows]]
+    return PostPage.model_validate({"posts": posts}).model_dump()["posts"]
+
+
+def from_values(rows: int) -> list:
+    return list(Posts.objects.order_by("-created_at", "-id").values(*POST_OUT_FIELDS)[:rows])
+
+
+def measure(build, rows: int, repeat: int) -> tuple[float, float]:
+    """Best CPU time per row (µs) and peak traced memory per row (bytes)."""
+    build(rows)  # warm up connections and caches
+    cpu = min(_cpu_time(build, rows) for _ in range(repeat))
+    tracemalloc.start()
+    build(rows)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return cpu / rows * 1e6, peak / rows
+
+
+def _cpu_time(build, rows: int) -> float:
+    started = time.process_time()
+    build(rows)
+    return time.process_time() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    available = Posts.objects.count()
+    if available < args.rows:
+        raise SystemExit(f"Need {args.rows} posts, found {available}; load some with import_posts first")
+
+    old_cpu, old_mem = measure(from_instances, args.rows, args.repeat)
+    new_cpu, new_mem = measure(from_values, args.rows, args.repeat)
+    print(f"{args.rows} rows, CPU time per row (best of {args.repeat}) and peak memory per row")
+    print(f"instances: {old_cpu:7.1f} µs  {old_mem:8.0f} B")
+    print(f"values:    {new_cpu:7.1f} µs  {new_mem:8.0f} B")
+    print(f"saved:     {old_cpu - new_cpu:7.1f} µs  {old_mem - new_mem:8.0f} B  ({old_cpu / new_cpu:.1f}x CPU)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,9 @@
 from ninja import NinjaAPI
-from post.api_v1 import router as post_api_v1
-from post.authentication import APIAuthBearer
+from django.conf import settings
+from post.authentication import APIAuthBearer, AsyncAPIAuthBearer
+from .metrics import render_metrics
+from .readiness import get_monitor
+from .renderers import get_parser, get_renderer
 from django.http import HttpResponse
 from functools import wraps
 from ninja.errors import ValidationError, HttpError
@@ -11,10 +14,16 @@ import logging
 # Initialize loggers
 error_logger = logging.getLogger("api.error")
 
-api = NinjaAPI(title="Blog API", version="1.0.0")
+# Under ASGI (uvicorn workers) serve the async handlers so one process can hold many in-flight requests
+if settings.API_ASYNC:
+    from post.api_v1_async import router as post_api_v1
+else:
+    from post.api_v1 import router as post_api_v1
+
+api = NinjaAPI(title="Blog API", version="1.0.0", renderer=get_renderer(), parser=get_parser())
 api.add_router("/v1", post_api_v1)
 
-# Uncomment to enable API authentication
+# Uncomment to enable API authentication (use AsyncAPIAuthBearer() when API_ASYNC is on)
 # api.add_router("/v1", post_api_v1, auth=APIAuthBearer())
 
 
@@ -100,3 +109,29 @@ def health_check(request):
         - Load balancing health checks
     """
     return "OK"
+
+
+@api.get("/ready", tags=["Health check"])
+def readiness_check(request):
+    """
+    Readiness probe for load balancers: 200 while the database (and shared cache, if
+    configured) answered the worker's last background check, 503 otherwise.
+
+    Serves the cached result of that check, so probes never query the database.
+    Also reports the worker's pid, uptime and requests in flight.
+    """
+    status = get_monitor().status()
+    response = api.create_response(request, status, status=200 if status["status"] == "ready" else 503)
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
+@api.get("/metrics", tags=["Health check"], include_in_schema=False)
+def metrics(request):
+    """
+    Prometheus metrics: per-route request counts by status, latency, and DB queries and time.
+
+    Aggregated over all gunicorn workers when PROMETHEUS_MULTIPROC_DIR is set.
+    """
+    body, content_type = render_metrics()
+    return HttpResponse(body, content_type=content_type)
@@ -0,0 +1,153 @@
+"""
+Queue-based logging: request threads only enqueue records, a listener thread does the I/O.
+
+Django calls `configure` (settings.LOGGING_CONFIG) with settings.LOGGING. It applies the
+config as usual, then moves the handlers of the loggers in settings.LOG_QUEUE["LOGGERS"]
+behind a bounded queue drained by a QueueListener. When the queue is full, records are
+dropped and counted rather than blocking the request.
+"""
+
+import atexit
+import logging
+import logging.config
+import queue
+import threading
+import time
+from collections import OrderedDict
+from logging.handlers import QueueHandler, QueueListener
+
+_listeners: list[QueueListener] = []
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler for a bounded queue that drops (and counts) records instead of blocking."""
+
+    def __init__(self, queue):
+        super().__init__(queue)
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def prepare(self, record):
+        # The queue stays in-process, so skip QueueHandler's formatting in the request thread.
+        # Handlers behind the listener format the record as if it had been logged directly.
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+
+class ReportingQueueListener(QueueListener):
+    """QueueListener that logs how many records its handler dropped since the last report."""
+
+    def __init__(self, source: DroppingQueueHandler, *handlers, logger_name: str):
+        super().__init__(source.queue, *handlers, respect_handler_level=True)
+        self.source = source
+        self.logger_name = logger_name
+        self.reported = 0
+
+    def handle(self, record):
+        dropped = self.source.dropped
+        if dropped > self.reported:
+            super().handle(
+                logging.LogRecord(
+                    self.logger_name,
+                    logging.WARNING,
+                    __file__,
+                    0,
+                    f"Log queue full: dropped {dropped - self.reported} records",
+                    None,
+                    None,
+                )
+            )
+            self.reported = dropped
+        super().handle(record)
+
+
+class RepeatedErrorFilter(logging.Filter):
+    """
+    Let through at most `burst` identical errors per `window` seconds.
+
+    Errors are identical when they share logger, path, error_type and status_code (read from
+    a dict message, as blog.api logs them, or from `extra`). The first record let through
+    after suppression carries a `suppressed` count.
+    """
+
+    def __init__(self, burst: int = 10, window: float = 60.0, max_keys: int = 1024):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self.max_keys = max_keys
+        # key -> [window_started, seen_in_window, suppressed]
+        self._seen: OrderedDict[tuple, list] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, record) -> tuple:
+        fields = record.msg if isinstance(record.msg, dict) else record.__dict__
+        return (record.name, fields.get("path"), fields.get("error_type"), fields.get("status_code"))
+
+    def filter(self, record) -> bool:
+        if self.burst <= 0:
+            return True
+        key = self._key(record)
+        now = time.monotonic()
+        with self._lock:
+            state = self._seen.get(key)
+            if state is None or now - state[0] >= self.window:
+                suppressed = state[2] if state else 0
+                self._seen[key] = [now, 1, 0]
+                self._seen.move_to_end(key)
+                if len(self._seen) > self.max_keys:
+                    self._seen.popitem(last=False)
+            elif state[1] < self.burst:
+                state[1] += 1
+                return True
+            else:
+                state[2] += 1
+                return False
+
+        if suppressed:
+            if isinstance(record.msg, dict):
+                record.msg = {**record.msg, "suppressed": suppressed}
+            else:
+                record.suppressed = suppressed
+        return True
+
+
+def _queue_logger(name: str, max_size: int) -> None:
+    logger = logging.getLogger(name)
+    handlers = list(logger.handlers)
+    if not handlers:
+        return
+    source = DroppingQueueHandler(queue.Queue(max_size))
+    for handler in handlers:
+        logger.removeHandler(handler)
+    logger.addHandler(source)
+    listener = ReportingQueueListener(source, *handlers, logger_name=name)
+    listener.start()
+    _listeners.append(listener)
+
+
+def stop_listeners() -> None:
+    """Flush queued records and stop the listener threads."""
+    while _listeners:
+        _listeners.pop().stop()
+
+
+def configure(config: dict) -> None:
+    """LOGGING_CONFIG callable: dictConfig, then queue the configured loggers."""
+    from django.conf import settings
+
+    stop_listeners()
+    logging.config.dictConfig(config)
+    options = settings.LOG_QUEUE
+    if not options["ENABLED"]:
+        return
+    for name in options["LOGGERS"]:
+        _queue_logger(name, options["MAX_SIZE"])
+
+
+atexit.register(stop_listeners)
@@ -0,0 +1,144 @@
+"""
+Per-route request metrics in Prometheus format.
+
+MetricsMiddleware times every request and counts its database queries through an
+`execute_wrapper` installed on each connection as it opens. The wrapper adds to the current
+request's QueryStats, found through a context variable so queries run by async views in
+sync_to_async threads are counted too. Counting is lock-free; the only locked work is one
+update per metric when the request finishes.
+
+With several worker processes, set PROMETHEUS_MULTIPROC_DIR (gunicorn.conf.py does) so each
+worker writes its samples to memory-mapped files in that directory and `/api/metrics`
+aggregates all workers, whichever one serves the scrape.
+"""
+
+import os
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+# Label for requests that matched no URL pattern, so unknown paths cannot grow the label set
+UNMATCHED_ROUTE = "<unmatched>"
+
+REQUESTS = Counter("api_requests_total", "Requests by route and status code", ["method", "route", "status"])
+LATENCY = Histogram("api_request_duration_seconds", "Request latency by route", ["method", "route"])
+DB_QUERIES = Histogram(
+    "api_db_queries_per_request",
+    "Database queries per request by route",
+    ["method", "route"],
+    buckets=(0, 1, 2, 3, 5, 10, 25, 50, 100, float("inf")),
+)
+DB_TIME = Histogram(
+    "api_db_duration_seconds",
+    "Time spent in database queries per request by route",
+    ["method", "route"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, float("inf")),
+)
+
+# Recorded by post.cache; hit ratio = (hit + negative_hit) / all lookups
+POST_CACHE_LOOKUPS = Counter("post_cache_lookups_total", "Per-post cache lookups by result", ["result"])
+
+
+class QueryStats:
+    """Queries and their time for one request."""
+
+    __slots__ = ("queries", "duration")
+
+    def __init__(self):
+        self.queries = 0
+        self.duration = 0.0
+
+
+_stats: ContextVar[QueryStats | None] = ContextVar("request_query_stats", default=None)
+
+
+def count_queries(execute, sql, params, many, context):
+    """execute_wrapper adding each query to the current request's QueryStats, if any."""
+    stats = _stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.duration += time.perf_counter() - started
+        stats.queries += 1
+
+
+def install_wrapper(sender, connection, **kwargs):
+    # connection_created fires on every reconnect of the same DatabaseWrapper
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
+
+
+connection_created.connect(install_wrapper)
+for _connection in connections.all(initialized_only=True):
+    install_wrapper(None, _connection)
+
+
+def route_label(request) -> str:
+    """The URL pattern the request resolved to, e.g. /api/v1/posts/<post_id>."""
+    match = getattr(request, "resolver_match", None)
+    return f"/{match.route}" if match else UNMATCHED_ROUTE
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Metrics text for a scrape, aggregated over all workers in multiprocess mode."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """Record latency, status code and database usage for every request, labelled by route."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _record(self, request, response, stats: QueryStats, started: float) -> None:
+        method, route = request.method, route_label(request)
+        LATENCY.labels(method, route).observe(time.perf_counter() - started)
+        REQUESTS.labels(method, route, str(response.status_code)).inc()
+        DB_QUERIES.labels(method, route).observe(stats.queries)
+        DB_TIME.labels(method, route).observe(stats.duration)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        stats = QueryStats()
+        token = _stats.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            _stats.reset(token)
+        self._record(request, response, stats, started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        stats = QueryStats()
+        token = _stats.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _stats.reset(token)
+        self._record(request, response, stats, started)
+        return response
@@ -0,0 +1,83 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.handlers.exception import convert_exception_to_response
+from django.utils.module_loading import import_string
+
+
+class SiteMiddleware:
+    """
+    Run `settings.SITE_MIDDLEWARE` for every request outside `settings.API_PATH_PREFIX`.
+
+    The API is stateless and token-authenticated, so it needs no sessions, CSRF tokens,
+    messages or frame options: /api/ requests go straight to the view. /admin/ and any
+    other page get the whole stack, including the process_view/process_exception hooks
+    that Django's handler only calls for entries of MIDDLEWARE, so they are relayed here.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.api_prefix = settings.API_PATH_PREFIX
+        self.site_handler, middleware = self._load(get_response)
+        self._view_middleware = [mw.process_view for mw in middleware if hasattr(mw, "process_view")]
+        # Like Django's handler: innermost first for responses and exceptions
+        self._template_response_middleware = [
+            mw.process_template_response for mw in reversed(middleware) if hasattr(mw, "process_template_response")
+        ]
+        self._exception_middleware = [
+            mw.process_exception for mw in reversed(middleware) if hasattr(mw, "process_exception")
+        ]
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def _load(get_response):
+        handler, middleware = get_response, []
+        for path in reversed(settings.SITE_MIDDLEWARE):
+            try:
+                instance = import_string(path)(handler)
+            except MiddlewareNotUsed:
+                continue
+            middleware.insert(0, instance)
+            handler = convert_exception_to_response(instance)
+        return handler, middleware
+
+    def _is_api(self, request) -> bool:
+        return request.path_info.startswith(self.api_prefix)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.get_response(request) if self._is_api(request) else self.site_handler(request)
+
+    async def __acall__(self, request):
+        if self._is_api(request):
+            return await self.get_response(request)
+        return await self.site_handler(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if self._is_api(request):
+            return None
+        for process_view in self._view_middleware:
+            response = process_view(request, view_func, view_args, view_kwargs)
+            if response is not None:
+                return response
+        return None
+
+    def process_template_response(self, request, response):
+        if not self._is_api(request):
+            for process_template_response in self._template_response_middleware:
+                response = process_template_response(request, response)
+        return response
+
+    def process_exception(self, request, exception):
+        if self._is_api(request):
+            return None
+        for process_exception in self._exception_middleware:
+            response = process_exception(request, exception)
+            if response is not None:
+                return response
+        return None
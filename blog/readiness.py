@@ -0,0 +1,210 @@
+"""
+Readiness probe for load balancers, with a constant cost however often they poll.
+
+`/api/health` only shows that a worker answers. `/api/ready` also reports whether the
+worker's dependencies do: every database alias it reads or writes ("default" and
+DB_REPLICAS) and, with READINESS["CHECK_CACHE"], the shared Django cache. A daemon thread
+per worker runs these checks every READINESS["INTERVAL"] seconds; probes only read the last
+result, so they never touch the database. A result older than READINESS["STALE_AFTER"]
+seconds, e.g. because a check hangs on an unreachable host, counts as not ready.
+
+The probe also reports worker stats: pid, uptime, and requests in flight and served,
+counted by WorkerStatsMiddleware.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Callable
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+
+STARTED_AT = time.time()
+_started = time.monotonic()
+
+
+class WorkerStats:
+    """Requests in flight and served by this worker process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.served = 0
+
+    def started(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+
+    def finished(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self.served += 1
+
+
+stats = WorkerStats()
+
+
+def worker_stats() -> dict:
+    return {
+        "pid": os.getpid(),
+        "started_at": datetime.fromtimestamp(STARTED_AT, tz=timezone.utc),
+        "uptime_seconds": round(time.monotonic() - _started, 1),
+        # Includes the probe asking
+        "in_flight": stats.in_flight,
+        "served": stats.served,
+    }
+
+
+class WorkerStatsMiddleware:
+    """Count the requests in flight and served, for the readiness probe."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats.started()
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            stats.finished()
+            raise
+        return self._finish(response)
+
+    async def __acall__(self, request):
+        stats.started()
+        try:
+            response = await self.get_response(request)
+        except BaseException:
+            stats.finished()
+            raise
+        return self._finish(response)
+
+    @staticmethod
+    def _finish(response):
+        if not response.streaming:
+            stats.finished()
+        elif response.is_async:
+            response.streaming_content = _afinished_after(response.streaming_content)
+        else:
+            response.streaming_content = _finished_after(response.streaming_content)
+        return response
+
+
+# A streamed body (event streams, exports) is sent after the view returns. The request counts
+# as finished once the server has drained it, or closed it early (e.g. on a disconnect).
+
+
+def _finished_after(content):
+    try:
+        yield from content
+    finally:
+        stats.finished()
+
+
+async def _afinished_after(content):
+    try:
+        async for chunk in content:
+            yield chunk
+    finally:
+        stats.finished()
+
+
+def check_database(alias: str) -> None:
+    with connections[alias].cursor() as cursor:
+        cursor.execute("SELECT 1")
+
+
+def check_cache() -> None:
+    cache = caches["default"]
+    key = f"readiness:{os.getpid()}"
+    cache.set(key, 1, timeout=60)
+    if cache.get(key) != 1:
+        raise RuntimeError("The cache did not return the value just set")
+
+
+def default_checks() -> dict[str, Callable[[], None]]:
+    aliases = [DEFAULT_DB_ALIAS, *settings.DB_REPLICAS]
+    checks = {f"database:{alias}": lambda alias=alias: check_database(alias) for alias in aliases}
+    if settings.READINESS["CHECK_CACHE"]:
+        checks["cache"] = check_cache
+    return checks
+
+
+class ReadinessMonitor:
+    """Run `checks` on a background thread and keep the last result for probes."""
+
+    def __init__(self, checks: dict[str, Callable[[], None]], interval: float, stale_after: float):
+        self.checks = checks
+        self.interval = interval
+        self.stale_after = stale_after
+        self._result: dict | None = None
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def run_checks(self) -> dict:
+        results = {}
+        for name, check in self.checks.items():
+            started = time.perf_counter()
+            try:
+                check()
+            except Exception as exc:
+                results[name] = {"ok": False, "error": f"{exc.__class__.__name__}: {exc}"}
+            else:
+                results[name] = {"ok": True}
+            results[name]["duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        self._result = {"ready": all(result["ok"] for result in results.values()), "checks": results, "at": time.time()}
+        return self._result
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.run_checks()
+            finally:
+                # This thread's connections only; each round connects afresh, which is what a new request would do
+                connections.close_all()
+
+    def _ensure_running(self) -> None:
+        # Compare pids so a worker forked from a process that started the thread starts its own
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._result = None
+                threading.Thread(target=self._run, name="readiness-checker", daemon=True).start()
+                self._pid = os.getpid()
+
+    def status(self) -> dict:
+        """Last check result and worker stats; the first call in a worker runs the checks itself."""
+        self._ensure_running()
+        result = self._result
+        if result is None:
+            with self._lock:
+                result = self._result or self.run_checks()
+        age = time.time() - result["at"]
+        ready = result["ready"] and age <= self.stale_after
+        return {
+            "status": "ready" if ready else "unavailable",
+            "checks": result["checks"],
+            "checked_at": datetime.fromtimestamp(result["at"], tz=timezone.utc),
+            "age_seconds": round(age, 2),
+            "worker": worker_stats(),
+        }
+
+
+@lru_cache(maxsize=None)
+def get_monitor() -> ReadinessMonitor:
+    config = settings.READINESS
+    return ReadinessMonitor(default_checks(), config["INTERVAL"], config["STALE_AFTER"])
@@ -0,0 +1,58 @@
+from datetime import datetime
+from typing import Any
+from django.conf import settings
+from django.http import HttpRequest
+from ninja.parser import Parser
+from ninja.renderers import JSONRenderer
+from ninja.responses import NinjaJSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_encoder_default = NinjaJSONEncoder().default
+
+
+def _default(o: Any) -> Any:
+    # Inlined copy of DjangoJSONEncoder's datetime branch, checked first because
+    # datetimes are the only values orjson hands back for every post
+    if type(o) is datetime:
+        r = o.isoformat()
+        if o.microsecond:
+            r = r[:23] + r[26:]
+        if r.endswith("+00:00"):
+            r = r[:-6] + "Z"
+        return r
+    return _encoder_default(o)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSON renderer backed by orjson.
+
+    Datetimes are handed back to Python so they keep DjangoJSONEncoder's format
+    exactly (milliseconds, "Z" for UTC) rather than orjson's microsecond output.
+    Everything else orjson serializes natively. Output is compact UTF-8.
+    """
+
+    def render(self, request: HttpRequest, data: Any, *, response_status: int) -> Any:
+        return orjson.dumps(data, default=_default, option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS)
+
+
+class ORJSONParser(Parser):
+    def parse_body(self, request: HttpRequest) -> Any:
+        return orjson.loads(request.body)
+
+
+def use_orjson() -> bool:
+    return settings.API_FAST_JSON and orjson is not None
+
+
+def get_renderer() -> JSONRenderer:
+    """orjson renderer when enabled and installed, otherwise ninja's default."""
+    return ORJSONRenderer() if use_orjson() else JSONRenderer()
+
+
+def get_parser() -> Parser:
+    return ORJSONParser() if use_orjson() else Parser()
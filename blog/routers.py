@@ -0,0 +1,92 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Cookie marking a client that wrote recently; its reads go to the primary until it expires
+PIN_COOKIE = "db_pin"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+_pinned: ContextVar[bool] = ContextVar("db_pinned_to_primary", default=False)
+
+
+@contextmanager
+def use_primary():
+    """Send reads inside the block to the primary."""
+    token = _pinned.set(True)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """
+    Route reads to a random replica in `settings.DB_REPLICAS` and everything else to the primary.
+
+    Reads stay on the primary when the current request is pinned (see ReadYourWritesMiddleware)
+    and inside a transaction on the primary, so read-modify-write code sees its own rows.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DB_REPLICAS
+        if not replicas or _pinned.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive schema changes through replication
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReadYourWritesMiddleware:
+    """
+    Pin requests to the primary database when they write, or when the client wrote recently.
+
+    Unsafe methods (POST, PUT, DELETE, ...) read from the primary and set a cookie for
+    DB_REPLICA_STICKY_SECONDS, so the client's next reads are not served stale data
+    while replicas catch up.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _pin(self, request) -> bool:
+        return request.method not in SAFE_METHODS or PIN_COOKIE in request.COOKIES
+
+    def _finish(self, request, response):
+        if request.method not in SAFE_METHODS and settings.DB_REPLICAS:
+            response.set_cookie(
+                PIN_COOKIE, "1", max_age=settings.DB_REPLICA_STICKY_SECONDS, httponly=True, samesite="Lax"
+            )
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _pinned.set(self._pin(request))
+        try:
+            return self._finish(request, self.get_response(request))
+        finally:
+            _pinned.reset(token)
+
+    async def __acall__(self, request):
+        token = _pinned.set(self._pin(request))
+        try:
+            return self._finish(request, await self.get_response(request))
+        finally:
+            _pinned.reset(token)
@@ -10,8 +10,10 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+from importlib.util import find_spec
 from pathlib import Path
 import os
+import dj_database_url
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -55,14 +57,33 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Outermost, so recorded latency covers the other middleware too
+    "blog.metrics.MetricsMiddleware",
+    # Requests in flight and served, reported by /api/ready
+    "blog.readiness.WorkerStatsMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "django.contrib.sessions.middleware.SessionMiddleware",
+    "blog.routers.ReadYourWritesMiddleware",
     "django.middleware.common.CommonMiddleware",
+    # Runs SITE_MIDDLEWARE for everything outside API_PATH_PREFIX (admin, static pages)
+    "blog.middleware.SiteMiddleware",
+]
+
+# Session, CSRF, auth, messages and clickjacking middleware. The token-based API under
+# API_PATH_PREFIX skips them; set API_LEAN_MIDDLEWARE=False to run them for every request.
+SITE_MIDDLEWARE = [
+    "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
+API_PATH_PREFIX = "/api/"
+
+if os.getenv("API_LEAN_MIDDLEWARE", "True") != "True":
+    MIDDLEWARE = MIDDLEWARE[:-1] + SITE_MIDDLEWARE
+else:
+    # The admin checks look for these middleware in MIDDLEWARE; SiteMiddleware runs them for /admin/
+    SILENCED_SYSTEM_CHECKS = ["admin.E408", "admin.E409", "admin.E410"]
 
 ROOT_URLCONF = "blog.urls"
 
@@ -82,10 +103,25 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "blog.wsgi.application"
+ASGI_APPLICATION = "blog.asgi.application"
+
+# Serve the async API handlers (post.api_v1_async). Enable when running under ASGI,
+# e.g. gunicorn with uvicorn workers; keep off for sync gunicorn workers.
+API_ASYNC = os.getenv("API_ASYNC", "False") == "True"
 
+# Render and parse API JSON with orjson when it is installed
+API_FAST_JSON = os.getenv("API_FAST_JSON", "True") == "True"
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+
+# Sync gunicorn workers reuse one connection per worker for DB_CONN_MAX_AGE seconds.
+# Under ASGI requests hop between threads, so persistent connections would pile up;
+# there psycopg 3's pool is used instead when installed (pip install "psycopg[binary,pool]").
+DB_POOL = os.getenv("DB_POOL", str(API_ASYNC and find_spec("psycopg_pool") is not None)) == "True"
+# Django requires CONN_MAX_AGE=0 with a pool: closing a connection returns it to the pool
+DB_CONN_MAX_AGE = 0 if DB_POOL else int(os.getenv("DB_CONN_MAX_AGE", "0" if API_ASYNC else "60"))
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.postgresql",
@@ -94,6 +130,8 @@ DATABASES = {
         "PASSWORD": os.getenv("DB_PASSWORD"),
         "HOST": os.getenv("DB_HOST"),
         "PORT": os.getenv("DB_PORT"),
+        "CONN_MAX_AGE": DB_CONN_MAX_AGE,
+        "CONN_HEALTH_CHECKS": os.getenv("DB_CONN_HEALTH_CHECKS", "True") == "True",
         "TEST": {
             "ENGINE": "django.db.backends.sqlite3",
             "NAME": ":memory:",
@@ -101,6 +139,110 @@ DATABASES = {
     }
 }
 
+if DB_POOL:
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            # Per worker process
+            "min_size": int(os.getenv("DB_POOL_MIN_SIZE", "2")),
+            "max_size": int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+            # Seconds a request waits for a free connection before failing
+            "timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),
+            # CONN_HEALTH_CHECKS makes Django pass ConnectionPool.check_connection,
+            # so connections are checked when handed out
+        }
+    }
+
+# Read replicas: comma-separated database URLs, e.g.
+# DB_REPLICA_URLS=postgres://blog_user:pw@replica1:5432/blog,postgres://blog_user:pw@replica2:5432/blog
+# Reads go to a random replica, writes to "default" (see blog.routers).
+DB_REPLICAS = []
+for number, url in enumerate(filter(None, os.getenv("DB_REPLICA_URLS", "").split(",")), start=1):
+    alias = f"replica{number}"
+    DATABASES[alias] = dj_database_url.parse(
+        url.strip(), conn_max_age=DB_CONN_MAX_AGE, conn_health_checks=DATABASES["default"]["CONN_HEALTH_CHECKS"]
+    )
+    if DATABASES[alias]["ENGINE"] == DATABASES["default"]["ENGINE"]:
+        # Same pool settings as the primary
+        DATABASES[alias]["OPTIONS"] = dict(DATABASES["default"].get("OPTIONS", {}))
+    # Tests run against a single database
+    DATABASES[alias]["TEST"] = {"MIRROR": "default"}
+    DB_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ["blog.routers.PrimaryReplicaRouter"]
+# After a client writes, its reads stay on the primary this long to cover replication lag
+DB_REPLICA_STICKY_SECONDS = int(os.getenv("DB_REPLICA_STICKY_SECONDS", "5"))
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Set REDIS_URL (requires the `redis` package) to share the cache between workers.
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+        }
+    }
+
+# Post list and per-post cache
+# BACKEND is "local" (per-process LRU), "django" (the CACHES alias above) or "none".
+# "local" is only safe with a single worker: other workers never see its invalidations,
+# so the default is the shared cache when REDIS_URL is set and no cache otherwise.
+POSTS_CACHE = {
+    "BACKEND": os.getenv("POSTS_CACHE_BACKEND", "django" if os.getenv("REDIS_URL") else "none"),
+    "ALIAS": os.getenv("POSTS_CACHE_ALIAS", "default"),
+    "TIMEOUT": int(os.getenv("POSTS_CACHE_TIMEOUT", "60")),
+    "MAX_ENTRIES": int(os.getenv("POSTS_CACHE_MAX_ENTRIES", "1024")),
+    "OBJECT_TIMEOUT": int(os.getenv("POSTS_CACHE_OBJECT_TIMEOUT", "60")),
+    "NEGATIVE_TIMEOUT": int(os.getenv("POSTS_CACHE_NEGATIVE_TIMEOUT", "5")),
+}
+
+# nginx micro-cache hints and purges (post.http_cache). PURGE_URLS are nginx refresh
+# servers (the :8081 server in nginx.conf); empty disables purging.
+HTTP_CACHE = {
+    "TTL": int(os.getenv("HTTP_CACHE_TTL", "2")),
+    "PURGE_URLS": [url.rstrip("/") for url in os.getenv("HTTP_CACHE_PURGE_URLS", "").split(",") if url],
+    "PURGE_TIMEOUT": float(os.getenv("HTTP_CACHE_PURGE_TIMEOUT", "1")),
+    "PURGE_MAX_POSTS": int(os.getenv("HTTP_CACHE_PURGE_MAX_POSTS", "50")),
+}
+
+# Change feed (post.changes). Rows show up SETTLE_SECONDS after their timestamp, so writes
+# still committing are not skipped; cursors older than TOMBSTONE_RETENTION_DAYS get 410.
+# Long-polls (`wait`) and event streams hold their request open. A sync gunicorn worker serves
+# one request at a time and is killed after the gunicorn timeout (gunicorn.conf.py), so they are
+# only offered under ASGI unless LONG_POLL is set, with MAX_WAIT and STREAM_SECONDS below that timeout.
+POSTS_CHANGES = {
+    "LONG_POLL": os.getenv("POSTS_CHANGES_LONG_POLL", str(API_ASYNC)) == "True",
+    "SETTLE_SECONDS": float(os.getenv("POSTS_CHANGES_SETTLE_SECONDS", "1")),
+    "POLL_INTERVAL": float(os.getenv("POSTS_CHANGES_POLL_INTERVAL", "1")),
+    "MAX_WAIT": int(os.getenv("POSTS_CHANGES_MAX_WAIT", "30")),
+    "STREAM_SECONDS": int(os.getenv("POSTS_CHANGES_STREAM_SECONDS", "300")),
+    "HEARTBEAT_SECONDS": int(os.getenv("POSTS_CHANGES_HEARTBEAT_SECONDS", "15")),
+    "TOMBSTONE_RETENTION_DAYS": int(os.getenv("POSTS_CHANGES_TOMBSTONE_RETENTION_DAYS", "30")),
+}
+
+# Authenticated token cache (post.authentication). Revocations are shared between
+# workers through the CACHES alias below, so the token cache stays off unless that alias
+# is a shared backend such as Redis (REDIS_URL).
+AUTH_TOKEN_CACHE = {
+    "ENABLED": os.getenv("AUTH_TOKEN_CACHE_ENABLED", "True") == "True",
+    "ALIAS": os.getenv("AUTH_TOKEN_CACHE_ALIAS", "default"),
+    "TIMEOUT": int(os.getenv("AUTH_TOKEN_CACHE_TIMEOUT", "300")),
+    "MAX_ENTRIES": int(os.getenv("AUTH_TOKEN_CACHE_MAX_ENTRIES", "10000")),
+}
+
+# generate_token returns a user's existing token while it has at least this many seconds left
+AUTH_TOKEN_REUSE_MIN_REMAINING = int(os.getenv("AUTH_TOKEN_REUSE_MIN_REMAINING", "3600"))
+
+# Bulk post endpoints: max items per request and rows per INSERT/UPDATE statement
+POSTS_BULK_MAX_ITEMS = int(os.getenv("POSTS_BULK_MAX_ITEMS", "1000"))
+POSTS_BULK_BATCH_SIZE = int(os.getenv("POSTS_BULK_BATCH_SIZE", "500"))
+
+# Rows fetched per server-side cursor round trip when streaming post exports
+POSTS_EXPORT_CHUNK_SIZE = int(os.getenv("POSTS_EXPORT_CHUNK_SIZE", "2000"))
+
+# Rows written per COPY/INSERT (and per transaction) by the import_posts command
+POSTS_IMPORT_BATCH_SIZE = int(os.getenv("POSTS_IMPORT_BATCH_SIZE", "5000"))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -154,7 +296,28 @@ CORS_ALLOWED_ORIGINS = [
     "http://127.0.0.1",
 ]
 
+# Per-route latency, status and DB query metrics served on /api/metrics (see blog.metrics)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "True") == "True"
+
+# /api/ready (see blog.readiness): a background thread per worker checks the databases, and
+# the cache with CHECK_CACHE, every INTERVAL seconds; results older than STALE_AFTER fail
+READINESS = {
+    "INTERVAL": float(os.getenv("READINESS_INTERVAL", "2")),
+    "STALE_AFTER": float(os.getenv("READINESS_STALE_AFTER", "10")),
+    "CHECK_CACHE": os.getenv("READINESS_CHECK_CACHE", "True" if os.getenv("REDIS_URL") else "False") == "True",
+}
+
 # Logging Configuration
+# Handlers of the LOGGERS below run on a listener thread behind a bounded queue; records
+# logged while the queue is full are dropped and counted (see blog.logging_queue)
+LOG_QUEUE = {
+    "ENABLED": os.getenv("LOG_QUEUE_ENABLED", "True") == "True",
+    "MAX_SIZE": int(os.getenv("LOG_QUEUE_MAX_SIZE", "10000")),
+    "LOGGERS": tuple(filter(None, os.getenv("LOG_QUEUE_LOGGERS", "django,api,api.error").split(","))),
+}
+
+LOGGING_CONFIG = "blog.logging_queue.configure"
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
@@ -169,6 +332,14 @@ LOGGING = {
             "json_ensure_ascii": False,
         },
     },
+    "filters": {
+        # Identical errors (same path, error_type and status) beyond the limit per window are dropped
+        "repeated_errors": {
+            "()": "blog.logging_queue.RepeatedErrorFilter",
+            "burst": int(os.getenv("LOG_ERROR_RATE_LIMIT", "10")),
+            "window": float(os.getenv("LOG_ERROR_RATE_WINDOW", "60")),
+        },
+    },
     "handlers": {
         "console": {
             "class": "logging.StreamHandler",
@@ -202,6 +373,7 @@ LOGGING = {
         },
         "api.error": {
             "handlers": ["console", "api_file"],
+            "filters": ["repeated_errors"],
             "level": "ERROR",
             "propagate": False,
         },
@@ -0,0 +1,26 @@
+"""
+Gunicorn settings picked up from the working directory, on top of the command-line flags.
+
+Workers share Prometheus metrics through files in PROMETHEUS_MULTIPROC_DIR (see blog.metrics).
+"""
+
+import os
+import shutil
+
+metrics_dir = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/blog-metrics")
+
+# A sync worker busy with one request for longer than this is killed and restarted.
+# Requests held open by the change feed (POSTS_CHANGES) must finish well within it.
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+
+
+def on_starting(server):
+    # Samples from a previous run would be aggregated into the new one
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
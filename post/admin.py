@@ -1,5 +1,7 @@
 from django.contrib import admin
 from .models import Posts
+from .search import search_queryset
+from . import services
 
 
 @admin.register(Posts)
@@ -9,3 +11,20 @@ class PostsAdmin(admin.ModelAdmin):
     search_fields = ["title"]
     readonly_fields = ["created_at", "updated_at"]
     ordering = ["-created_at"]
+
+    def get_search_results(self, request, queryset, search_term):
+        # Use the indexed full-text search instead of an unindexed icontains scan
+        if not search_term:
+            return queryset, False
+        return queryset.filter(pk__in=search_queryset(queryset, search_term).values("pk")), False
+
+    # Through post.services, so admin writes refresh the post, list and HTTP caches like API writes
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        services.post_saved(obj)
+
+    def delete_model(self, request, obj):
+        services.delete_posts(Posts.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        services.delete_posts(queryset)
@@ -1,40 +1,175 @@
 from typing import List
-from ninja import NinjaAPI, Router
-from ninja.responses import Response
-from .schemas import PostCreate, PostOut, PostUpdate, TokenRequest, TokenResponse
-from django.http import HttpRequest
-from . import services
+from datetime import datetime
+from asgiref.sync import sync_to_async
+from ninja import Query
+from .schemas import (
+    PostBulkDelete,
+    PostBulkResponse,
+    PostBulkUpdate,
+    PostChangesPage,
+    PostCreate,
+    PostOut,
+    PostPage,
+    PostSearchPage,
+    PostSummaryPage,
+    PostUpdate,
+    TokenRequest,
+    TokenResponse,
+)
+from django.http import HttpRequest, HttpResponse
+from .pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, MAX_SEARCH_OFFSET
+from .endpoints import Endpoints, Unvalidated, call
+from . import changes, conditional, export, http_cache, services
 
-router = Router(tags=["Posts"])
+# Each handler yields its service calls as sync/async pairs (see post.endpoints), so this one
+# route table serves both the WSGI router below and post.api_v1_async.
+endpoints = Endpoints(tags=["Posts"])
 
 
-@router.get("/posts", response=List[PostOut], description="Get all posts.", tags=["posts"])
-def list_posts(request: HttpRequest):
-    return services.list_posts()
+@endpoints.get(
+    "/posts",
+    response=PostPage | PostSummaryPage,
+    description="Get a page of posts, newest first. With summary=true, posts carry an excerpt instead of content.",
+    tags=["posts"],
+)
+def list_posts(
+    request: HttpRequest,
+    response: HttpResponse,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: str | None = None,
+    before: str | None = None,
+    summary: bool = False,
+):
+    validators = yield call(services.get_list_validators, services.aget_list_validators)
+    last_modified = validators["last_modified"]
+    etag = conditional.make_etag(validators["last_updated"], validators["last_deleted"], limit, after, before, summary)
+    not_modified = conditional.not_modified(request, etag, last_modified)
+    if not_modified:
+        return not_modified
 
+    conditional.set_validators(response, etag, last_modified)
+    page = yield call(
+        services.list_posts_page, services.alist_posts_page, limit, after=after, before=before, summary=summary
+    )
+    tags = [http_cache.LIST_TAG] + [http_cache.post_tag(post["id"]) for post in page["posts"]]
+    http_cache.set_cache_headers(request, response, tags)
+    # Rows already match PostPage/PostSummaryPage, so render them directly instead of re-validating each one
+    return Unvalidated(request, response, page)
 
-@router.get("/posts/{post_id}", response=PostOut, description="Get a single post by ID.", tags=["posts"])
-def get_post(request: HttpRequest, post_id: int):
-    return services.get_post(post_id)
 
+# Registered before the /posts/{post_id} routes so "search", "export", "changes" and "bulk" are not taken as ids.
+@endpoints.get("/posts/search", response=PostSearchPage, description="Full-text search over posts.", tags=["posts"])
+def search_posts(
+    request: HttpRequest,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0, le=MAX_SEARCH_OFFSET),
+):
+    return (yield call(services.search_posts, services.asearch_posts, q, limit=limit, offset=offset))
 
-@router.post("/posts", response={201: PostOut}, description="Create a new post.", tags=["posts"])
+
+@endpoints.get("/posts/export", description="Stream all posts as NDJSON (gzip when accepted).", tags=["posts"])
+def export_posts(request: HttpRequest, updated_since: datetime | None = None):
+    queryset = export.export_queryset(updated_since)
+    return (yield call(export.ndjson_response, export.andjson_response, request, queryset))
+
+
+@endpoints.get(
+    "/posts/changes",
+    response=PostChangesPage,
+    description="Posts created, updated or deleted after the `since` cursor, oldest first. "
+    "With `wait`, hold the request up to that many seconds until there are changes.",
+    tags=["posts"],
+)
+def posts_changes(
+    request: HttpRequest,
+    since: str | None = None,
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    wait: int = Query(0, ge=0),
+):
+    return (yield call(changes.changes_page, changes.achanges_page, since, limit, wait))
+
+
+@endpoints.get(
+    "/posts/changes/stream",
+    description="Server-Sent Events for every change after `since` (or Last-Event-ID).",
+    tags=["posts"],
+)
+def posts_changes_stream(request: HttpRequest, since: str | None = None):
+    return (
+        yield call(changes.event_stream_response, changes.aevent_stream_response, request, since, MAX_PAGE_SIZE)
+    )
+
+
+def _bulk(service, data):
+    # Bulk writes need transaction.atomic(), which the async ORM does not support,
+    # so async handlers run the sync service in a worker thread
+    return call(service, sync_to_async(service), data)
+
+
+@endpoints.post(
+    "/posts/bulk", response={201: PostBulkResponse}, description="Create posts in bulk.", tags=["posts"]
+)
+def bulk_create_posts(request: HttpRequest, data: List[PostCreate]):
+    return 201, {"results": (yield _bulk(services.bulk_create_posts, data))}
+
+
+@endpoints.put("/posts/bulk", response=PostBulkResponse, description="Update posts in bulk.", tags=["posts"])
+def bulk_update_posts(request: HttpRequest, data: List[PostBulkUpdate]):
+    return {"results": (yield _bulk(services.bulk_update_posts, data))}
+
+
+@endpoints.post("/posts/bulk/delete", response=PostBulkResponse, description="Delete posts in bulk.", tags=["posts"])
+def bulk_delete_posts(request: HttpRequest, data: PostBulkDelete):
+    return {"results": (yield _bulk(services.bulk_delete_posts, data.ids))}
+
+
+@endpoints.get("/posts/{post_id}", response=PostOut, description="Get a single post by ID.", tags=["posts"])
+def get_post(request: HttpRequest, response: HttpResponse, post_id: int):
+    post = yield call(services.get_post, services.aget_post, post_id)
+    etag = conditional.version_etag(post.updated_at)
+    not_modified = conditional.not_modified(request, etag, post.updated_at)
+    if not_modified:
+        return not_modified
+
+    conditional.set_validators(response, etag, post.updated_at)
+    http_cache.set_cache_headers(request, response, [http_cache.post_tag(post.id)])
+    return post
+
+
+@endpoints.post("/posts", response={201: PostOut}, description="Create a new post.", tags=["posts"])
 def create_post(request: HttpRequest, data: PostCreate):
-    return services.create_post(data)
+    return (yield call(services.create_post, services.acreate_post, data))
 
 
-@router.put("/posts/{post_id}", response=PostOut, description="Update an existing post.", tags=["posts"])
-def update_post(request: HttpRequest, post_id: int, data: PostUpdate):
-    return services.update_post(post_id, data)
+@endpoints.put(
+    "/posts/{post_id}",
+    response=PostOut,
+    description="Update an existing post. Send its ETag as If-Match to fail with 412 if it changed meanwhile.",
+    tags=["posts"],
+)
+def update_post(request: HttpRequest, response: HttpResponse, post_id: int, data: PostUpdate):
+    versions = conditional.if_match_versions(request)
+    post = yield call(services.update_post, services.aupdate_post, post_id, data, versions)
+    conditional.set_validators(response, conditional.version_etag(post.updated_at), post.updated_at)
+    return post
 
 
-@router.delete("/posts/{post_id}", response={204: None}, description="Delete a post.", tags=["posts"])
+@endpoints.delete(
+    "/posts/{post_id}",
+    response={204: None},
+    description="Delete a post. Send its ETag as If-Match to fail with 412 if it changed meanwhile.",
+    tags=["posts"],
+)
 def delete_post(request: HttpRequest, post_id: int):
-    services.delete_post(post_id)
+    yield call(services.delete_post, services.adelete_post, post_id, conditional.if_match_versions(request))
     return 204, None
 
 
-@router.post("/auth/token", response=TokenResponse, description="Get authentication token.", tags=["auth"], auth=None)
+@endpoints.post("/auth/token", response=TokenResponse, description="Get authentication token.", tags=["auth"], auth=None)
 def get_token(request: HttpRequest, data: TokenRequest):
-    token = services.generate_token(data.username, data.password)
+    token = yield call(services.generate_token, services.agenerate_token, data.username, data.password)
     return {"token": token}
+
+
+router = endpoints.build_router()
@@ -0,0 +1,5 @@
+from .api_v1 import endpoints
+
+# The handlers of post.api_v1 awaiting the async services, mounted instead of it when
+# API_ASYNC=True (ASGI / uvicorn workers).
+router = endpoints.build_router(asynchronous=True)
@@ -1,16 +1,179 @@
+import logging
+import time
+from functools import lru_cache
+from django.conf import settings
+from django.core.cache import caches
 from ninja.security import HttpBearer
+from blog.routers import use_primary
+from .cache import LocalTTLCache
 from .models import UserToken
 from django.utils import timezone
 
+TOKEN_VERSION_KEY = "auth:tokens:version"
+# Caches that keep entries inside one process (or nowhere) cannot carry a revocation to other workers
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+logger = logging.getLogger("api")
+
+
+def get_token_cache_settings() -> dict:
+    return {
+        "ENABLED": True,
+        "ALIAS": "default",
+        "TIMEOUT": 300,
+        "MAX_ENTRIES": 10000,
+        **getattr(settings, "AUTH_TOKEN_CACHE", {}),
+    }
+
+
+@lru_cache(maxsize=None)
+def get_token_cache() -> LocalTTLCache | None:
+    """
+    In-process token -> (user, expires_at, version) cache, or None when disabled.
+
+    Also disabled when ALIAS is a per-process cache: the revocation version would then
+    only change in the worker that revoked the token, and the others keep accepting it.
+    """
+    config = get_token_cache_settings()
+    if not config["ENABLED"]:
+        return None
+    if settings.CACHES[config["ALIAS"]]["BACKEND"] in PROCESS_LOCAL_CACHES:
+        logger.warning(
+            "Token cache disabled: the %r cache is not shared between workers, so revocations would not reach them",
+            config["ALIAS"],
+        )
+        return None
+    return LocalTTLCache(max_entries=config["MAX_ENTRIES"], timeout=config["TIMEOUT"])
+
+
+def _version_backend():
+    return caches[get_token_cache_settings()["ALIAS"]]
+
+
+def get_token_version() -> int:
+    """
+    Current revocation version, shared between workers through the Django cache.
+
+    Seeded from the clock so a lost key never makes old entries valid again.
+    """
+    backend = _version_backend()
+    version = backend.get(TOKEN_VERSION_KEY)
+    if version is None:
+        backend.add(TOKEN_VERSION_KEY, time.time_ns(), None)
+        version = backend.get(TOKEN_VERSION_KEY, time.time_ns())
+    return version
+
+
+async def aget_token_version() -> int:
+    backend = _version_backend()
+    version = await backend.aget(TOKEN_VERSION_KEY)
+    if version is None:
+        await backend.aadd(TOKEN_VERSION_KEY, time.time_ns(), None)
+        version = await backend.aget(TOKEN_VERSION_KEY, time.time_ns())
+    return version
+
+
+def bump_token_version() -> None:
+    """Invalidate every cached token in every worker. Called when tokens are revoked."""
+    backend = _version_backend()
+    try:
+        backend.incr(TOKEN_VERSION_KEY)
+    except ValueError:
+        backend.set(TOKEN_VERSION_KEY, time.time_ns(), None)
+    token_cache = get_token_cache()
+    if token_cache is not None:
+        token_cache.clear()
+
+
+def revoke_tokens(queryset) -> int:
+    """
+    Deactivate the tokens in `queryset` and invalidate cached tokens in every worker.
+
+    Use this for bulk revocation: `queryset.update(is_active=False)` sends no signals, so the
+    revoked tokens would keep authenticating from worker caches until their entries expire.
+    """
+    revoked = queryset.filter(is_active=True).update(is_active=False)
+    if revoked:
+        bump_token_version()
+    return revoked
+
+
+def _cached_user(token_cache: LocalTTLCache, token: str, version: int):
+    entry = token_cache.get(token)
+    if entry is None:
+        return None
+    user, expires_at, cached_version = entry
+    if cached_version != version or expires_at <= timezone.now():
+        token_cache.delete(token)
+        return None
+    return user
+
+
+def _remember(token_cache: LocalTTLCache, token: str, user_token: UserToken, version: int) -> None:
+    # Never keep an entry past the token's own expiry
+    ttl = min(get_token_cache_settings()["TIMEOUT"], (user_token.expires_at - timezone.now()).total_seconds())
+    if ttl > 0:
+        token_cache.set(token, (user_token.user, user_token.expires_at, version), ttl)
+
+
+def _active_tokens():
+    return UserToken.objects.select_related("user").filter(is_active=True, expires_at__gt=timezone.now())
+
+
+# Token lookups always read the primary: a lagging replica could miss a just-issued token
+# or still accept a revoked one (and the result would then be cached).
+# get() rather than first(): tokens are unique, and first() would sort by Meta.ordering.
+def _find_token(token: str) -> UserToken | None:
+    with use_primary():
+        try:
+            return _active_tokens().get(token=token)
+        except UserToken.DoesNotExist:
+            return None
+
+
+async def _afind_token(token: str) -> UserToken | None:
+    with use_primary():
+        try:
+            return await _active_tokens().aget(token=token)
+        except UserToken.DoesNotExist:
+            return None
+
 
 class APIAuthBearer(HttpBearer):
     def authenticate(self, request, token):
-        app_user = None
-        # token is from the request header
-        # Implement your authentication logic here
-        # For example, you might want to check if the token is valid
-        # and return the corresponding user object.
-        user_token = UserToken.objects.filter(token=token, is_active=True, expires_at__gt=timezone.now()).first()
-        if user_token:
-            app_user = user_token.user
+        token_cache = get_token_cache()
+        if token_cache is None:
+            user_token = _find_token(token)
+            return user_token.user if user_token else None
+
+        # Read the version before querying so a concurrent revocation is never cached as current
+        version = get_token_version()
+        app_user = _cached_user(token_cache, token, version)
+        if app_user is None:
+            user_token = _find_token(token)
+            if user_token:
+                _remember(token_cache, token, user_token, version)
+                app_user = user_token.user
+        return app_user
+
+
+class AsyncAPIAuthBearer(HttpBearer):
+    """Async variant of APIAuthBearer for the ASGI router (post.api_v1_async)."""
+
+    async def authenticate(self, request, token):
+        token_cache = get_token_cache()
+        if token_cache is None:
+            user_token = await _afind_token(token)
+            return user_token.user if user_token else None
+
+        version = await aget_token_version()
+        app_user = _cached_user(token_cache, token, version)
+        if app_user is None:
+            user_token = await _afind_token(token)
+            if user_token:
+                _remember(token_cache, token, user_token, version)
+                app_user = user_token.user
         return app_user
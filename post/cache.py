@@ -0,0 +1,348 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Awaitable, Callable
+from django.conf import settings
+from django.core.cache import caches
+from blog.metrics import POST_CACHE_LOOKUPS
+
+LIST_VERSION_KEY = "posts:list:version"
+LIST_WRITTEN_AT_KEY = "posts:list:written_at"
+POST_KEY = "posts:obj:{}"
+# Stored instead of a post to remember that an id does not exist
+NOT_FOUND = "__not_found__"
+
+class LocalTTLCache:
+    """
+    Thread-safe in-process LRU cache whose entries expire after a TTL.
+
+    Implements the subset of Django's cache API used by this module
+    (get/set/add/delete/incr/clear), so it can be swapped for a shared backend.
+    """
+
+    def __init__(self, max_entries: int = 1024, timeout: float | None = 60):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._data: OrderedDict[str, tuple[float | None, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expiry(self, timeout):
+        timeout = self.timeout if timeout is ... else timeout
+        return None if timeout is None else time.monotonic() + timeout
+
+    def _get_entry(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, _ = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return entry
+
+    def _store(self, key, value, timeout):
+        self._data[key] = (self._expiry(timeout), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._get_entry(key)
+            return default if entry is None else entry[1]
+
+    def set(self, key: str, value: Any, timeout: float | None = ...) -> None:
+        with self._lock:
+            self._store(key, value, timeout)
+
+    def add(self, key: str, value: Any, timeout: float | None = ...) -> bool:
+        with self._lock:
+            if self._get_entry(key) is not None:
+                return False
+            self._store(key, value, timeout)
+            return True
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            return self._data.pop(key, None) is not None
+
+    def set_many(self, data: dict, timeout: float | None = ...) -> list:
+        with self._lock:
+            for key, value in data.items():
+                self._store(key, value, timeout)
+        return []
+
+    def delete_many(self, keys) -> None:
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def incr(self, key: str, delta: int = 1) -> int:
+        with self._lock:
+            entry = self._get_entry(key)
+            if entry is None:
+                raise ValueError(f"Key '{key}' not found")
+            expires_at, value = entry
+            self._data[key] = (expires_at, value + delta)
+            return value + delta
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    # Entries live in memory, so the async API can call straight through
+    # instead of hopping to a thread like Django's default async cache methods.
+    async def aget(self, key: str, default: Any = None) -> Any:
+        return self.get(key, default)
+
+    async def aset(self, key: str, value: Any, timeout: float | None = ...) -> None:
+        self.set(key, value, timeout)
+
+    async def aadd(self, key: str, value: Any, timeout: float | None = ...) -> bool:
+        return self.add(key, value, timeout)
+
+    async def adelete(self, key: str) -> bool:
+        return self.delete(key)
+
+    async def aincr(self, key: str, delta: int = 1) -> int:
+        return self.incr(key, delta)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def get_cache_settings() -> dict:
+    return {
+        "BACKEND": "local",
+        "ALIAS": "default",
+        "TIMEOUT": 60,
+        "MAX_ENTRIES": 1024,
+        "OBJECT_TIMEOUT": 60,
+        "NEGATIVE_TIMEOUT": 5,
+        **getattr(settings, "POSTS_CACHE", {}),
+    }
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    """
+    Return the configured cache backend, or None when caching is disabled.
+
+    "local" keeps entries in this process only, "django" uses the Django cache
+    named by ALIAS (e.g. Redis) so every worker sees the same versions.
+    """
+    config = get_cache_settings()
+    if config["BACKEND"] == "none":
+        return None
+    if config["BACKEND"] == "django":
+        return caches[config["ALIAS"]]
+    return LocalTTLCache(max_entries=config["MAX_ENTRIES"], timeout=config["TIMEOUT"])
+
+
+def reset_backend() -> None:
+    """Drop the configured backend, e.g. after settings change in tests."""
+    backend = get_backend()
+    if isinstance(backend, LocalTTLCache):
+        backend.clear()
+    get_backend.cache_clear()
+
+
+def get_list_version(backend) -> int:
+    version = backend.get(LIST_VERSION_KEY)
+    if version is None:
+        # Seed from the clock so a lost version key never revives old pages.
+        backend.add(LIST_VERSION_KEY, time.time_ns(), None)
+        version = backend.get(LIST_VERSION_KEY, time.time_ns())
+    return version
+
+
+async def aget_list_version(backend) -> int:
+    version = await backend.aget(LIST_VERSION_KEY)
+    if version is None:
+        await backend.aadd(LIST_VERSION_KEY, time.time_ns(), None)
+        version = await backend.aget(LIST_VERSION_KEY, time.time_ns())
+    return version
+
+
+def bump_list_version() -> None:
+    """Make every cached list page unreachable. Called by the post write paths."""
+    backend = get_backend()
+    if backend is None:
+        return
+    try:
+        backend.incr(LIST_VERSION_KEY)
+    except ValueError:
+        backend.set(LIST_VERSION_KEY, time.time_ns(), None)
+    backend.set(LIST_WRITTEN_AT_KEY, time.time(), None)
+
+
+async def abump_list_version() -> None:
+    backend = get_backend()
+    if backend is None:
+        return
+    try:
+        await backend.aincr(LIST_VERSION_KEY)
+    except ValueError:
+        await backend.aset(LIST_VERSION_KEY, time.time_ns(), None)
+    await backend.aset(LIST_WRITTEN_AT_KEY, time.time(), None)
+
+
+def get_list_written_at() -> float | None:
+    """Unix time of the last post write seen by this backend, if known."""
+    backend = get_backend()
+    return None if backend is None else backend.get(LIST_WRITTEN_AT_KEY)
+
+
+def _get_versioned(name: str, loader: Callable[[], Any]) -> Any:
+    backend = get_backend()
+    if backend is None:
+        return loader()
+    key = f"posts:list:v{get_list_version(backend)}:{name}"
+    value = backend.get(key)
+    if value is None:
+        value = loader()
+        backend.set(key, value, get_cache_settings()["TIMEOUT"])
+    return value
+
+
+async def _aget_versioned(name: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+    backend = get_backend()
+    if backend is None:
+        return await loader()
+    key = f"posts:list:v{await aget_list_version(backend)}:{name}"
+    value = await backend.aget(key)
+    if value is None:
+        value = await loader()
+        await backend.aset(key, value, get_cache_settings()["TIMEOUT"])
+    return value
+
+
+def _page_name(limit: int, after: str | None, before: str | None, summary: bool) -> str:
+    return f"{'summary' if summary else 'page'}:{limit}:{after or ''}:{before or ''}"
+
+
+def get_list_page(
+    limit: int, after: str | None, before: str | None, loader: Callable[[], dict], summary: bool = False
+) -> dict:
+    """Return the cached page for the current collection version, loading it on a miss."""
+    return _get_versioned(_page_name(limit, after, before, summary), loader)
+
+
+def get_list_validators(loader: Callable[[], dict]) -> dict:
+    """Return the cached list validators (see services.get_list_validators) for the current version."""
+    return _get_versioned("validators", loader)
+
+
+async def aget_list_page(
+    limit: int, after: str | None, before: str | None, loader: Callable[[], Awaitable[dict]], summary: bool = False
+) -> dict:
+    return await _aget_versioned(_page_name(limit, after, before, summary), loader)
+
+
+async def aget_list_validators(loader: Callable[[], Awaitable[dict]]) -> dict:
+    return await _aget_versioned("validators", loader)
+
+
+async def aget_list_written_at() -> float | None:
+    backend = get_backend()
+    return None if backend is None else await backend.aget(LIST_WRITTEN_AT_KEY)
+
+
+def _record_lookup(value: Any) -> None:
+    result = "miss" if value is None else "negative_hit" if value == NOT_FOUND else "hit"
+    POST_CACHE_LOOKUPS.labels(result).inc()
+
+
+def get_post(post_id: int) -> Any:
+    """
+    Return the cached post, NOT_FOUND for a negative-cached id, or None on a miss.
+    """
+    backend = get_backend()
+    if backend is None:
+        return None
+    value = backend.get(POST_KEY.format(post_id))
+    _record_lookup(value)
+    return value
+
+
+async def aget_post(post_id: int) -> Any:
+    backend = get_backend()
+    if backend is None:
+        return None
+    value = await backend.aget(POST_KEY.format(post_id))
+    _record_lookup(value)
+    return value
+
+
+def set_post(post_id: int, post: Any) -> None:
+    backend = get_backend()
+    if backend is not None:
+        backend.set(POST_KEY.format(post_id), post, get_cache_settings()["OBJECT_TIMEOUT"])
+
+
+def fill_post(post_id: int, post: Any) -> None:
+    """
+    Cache a post read from the database, unless a write has stored an entry since the miss.
+
+    Reads fill with add(), writes use set(): a reader that loaded the row before an update
+    or delete committed must not replace the newer entry the write stored.
+    """
+    backend = get_backend()
+    if backend is not None:
+        backend.add(POST_KEY.format(post_id), post, get_cache_settings()["OBJECT_TIMEOUT"])
+
+
+def fill_post_missing(post_id: int) -> None:
+    """Briefly remember that `post_id` does not exist so repeated 404s skip the database."""
+    backend = get_backend()
+    if backend is not None:
+        backend.add(POST_KEY.format(post_id), NOT_FOUND, get_cache_settings()["NEGATIVE_TIMEOUT"])
+
+
+def set_post_missing(post_id: int) -> None:
+    """Mark a deleted post, so a read that loaded it before the delete cannot cache it again."""
+    backend = get_backend()
+    if backend is not None:
+        backend.set(POST_KEY.format(post_id), NOT_FOUND, get_cache_settings()["NEGATIVE_TIMEOUT"])
+
+
+async def aset_post(post_id: int, post: Any) -> None:
+    backend = get_backend()
+    if backend is not None:
+        await backend.aset(POST_KEY.format(post_id), post, get_cache_settings()["OBJECT_TIMEOUT"])
+
+
+async def afill_post(post_id: int, post: Any) -> None:
+    backend = get_backend()
+    if backend is not None:
+        await backend.aadd(POST_KEY.format(post_id), post, get_cache_settings()["OBJECT_TIMEOUT"])
+
+
+async def afill_post_missing(post_id: int) -> None:
+    backend = get_backend()
+    if backend is not None:
+        await backend.aadd(POST_KEY.format(post_id), NOT_FOUND, get_cache_settings()["NEGATIVE_TIMEOUT"])
+
+
+async def aset_post_missing(post_id: int) -> None:
+    backend = get_backend()
+    if backend is not None:
+        await backend.aset(POST_KEY.format(post_id), NOT_FOUND, get_cache_settings()["NEGATIVE_TIMEOUT"])
+
+
+def set_posts(posts: dict[int, Any]) -> None:
+    """Write through many posts in one backend call, keyed by id."""
+    backend = get_backend()
+    if backend is not None and posts:
+        data = {POST_KEY.format(post_id): post for post_id, post in posts.items()}
+        backend.set_many(data, get_cache_settings()["OBJECT_TIMEOUT"])
+
+
+def set_posts_missing(post_ids) -> None:
+    """Mark many deleted posts in one backend call (see `set_post_missing`)."""
+    backend = get_backend()
+    if backend is not None and post_ids:
+        data = {POST_KEY.format(post_id): NOT_FOUND for post_id in post_ids}
+        backend.set_many(data, get_cache_settings()["NEGATIVE_TIMEOUT"])
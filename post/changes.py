@@ -0,0 +1,234 @@
+"""
+Incremental change feed: posts created, updated or deleted since a cursor.
+
+Created and updated posts are read in (updated_at, id) order through posts_updated_id_idx,
+deletions from PostTombstone in (deleted_at, id) order. A cursor holds one keyset position
+per stream, so each poll is two bounded index range scans however large the table is.
+A post changed several times since the cursor appears once, with its latest state.
+
+updated_at is stamped before the write commits, so a slow transaction can commit a row
+older than rows a client has already been given. Rows only become visible
+POSTS_CHANGES["SETTLE_SECONDS"] after their timestamp, which keeps cursors behind writes
+still in flight. For the same reason the feed reads the primary, never a lagging replica.
+"""
+
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Iterator
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q, QuerySet
+from django.http import HttpRequest, StreamingHttpResponse
+from django.utils import timezone
+from ninja.errors import HttpError
+from blog.routers import use_primary
+from .conditional import EPOCH
+from .models import Posts, PostTombstone
+from .pagination import decode_cursor, encode_cursor
+from .services import POST_OUT_FIELDS
+
+UPSERT = "upsert"
+DELETE = "delete"
+
+_encoder = DjangoJSONEncoder(ensure_ascii=False)
+
+Position = tuple[datetime, int]
+
+
+def encode_changes_cursor(posts: Position, deletions: Position) -> str:
+    # base64url never contains ".", so the two positions can be joined with it
+    return f"{encode_cursor(*posts)}.{encode_cursor(*deletions)}"
+
+
+def decode_changes_cursor(cursor: str) -> tuple[Position, Position]:
+    """Decode a token produced by `encode_changes_cursor`. Raises HttpError(400) when malformed."""
+    posts, separator, deletions = cursor.partition(".")
+    if not separator:
+        raise HttpError(400, "Invalid cursor")
+    return decode_cursor(posts), decode_cursor(deletions)
+
+
+def _start(since: str | None, horizon: datetime) -> tuple[Position, Position]:
+    if since is None:
+        # A first sync reads every post; posts deleted before now are not among them
+        return (EPOCH, 0), (horizon, 0)
+    posts, deletions = decode_changes_cursor(since)
+    retention = timedelta(days=settings.POSTS_CHANGES["TOMBSTONE_RETENTION_DAYS"])
+    if deletions[0] < timezone.now() - retention:
+        raise HttpError(410, "The cursor is older than the retained deletions; sync again without 'since'.")
+    return posts, deletions
+
+
+def _after(queryset: QuerySet, field: str, position: Position, horizon: datetime, limit: int) -> QuerySet:
+    moment, pk = position
+    # The redundant >= bound becomes the index condition; PostgreSQL cannot derive one from the OR
+    keyset = Q(**{f"{field}__gt": moment}) | Q(**{field: moment, "id__gt": pk})
+    bounds = {f"{field}__gte": moment, f"{field}__lt": horizon}
+    return queryset.filter(keyset, **bounds).order_by(field, "id")[: limit + 1]
+
+
+def _post_rows(position: Position, horizon: datetime, limit: int) -> QuerySet:
+    return _after(Posts.objects.values(*POST_OUT_FIELDS), "updated_at", position, horizon, limit)
+
+
+def _tombstone_rows(position: Position, horizon: datetime, limit: int) -> QuerySet:
+    return _after(PostTombstone.objects.values("id", "post_id", "deleted_at"), "deleted_at", position, horizon, limit)
+
+
+def _merge(
+    posts: list, tombstones: list, start: tuple[Position, Position], horizon: datetime, limit: int
+) -> tuple[list[tuple[dict, str]], str, bool]:
+    """
+    Interleave both streams by timestamp into at most `limit` changes.
+
+    Returns (change, cursor after it) pairs, the cursor after the page and whether more
+    changes are ready. A stream read up to the horizon moves its position to the horizon,
+    so idle cursors keep advancing (and stay within the tombstone retention).
+    """
+    events = [(row["updated_at"], 0, row["id"], row) for row in posts[:limit]]
+    events += [(row["deleted_at"], 1, row["id"], row) for row in tombstones[:limit]]
+    events.sort(key=lambda event: event[:3])
+
+    post_position, deletion_position = start
+    changes = []
+    for moment, kind, pk, row in events[:limit]:
+        if kind == 0:
+            post_position = (moment, pk)
+            change = {"op": UPSERT, "id": pk, "changed_at": moment, "post": row}
+        else:
+            deletion_position = (moment, pk)
+            change = {"op": DELETE, "id": row["post_id"], "changed_at": moment, "post": None}
+        changes.append((change, encode_changes_cursor(post_position, deletion_position)))
+
+    taken = events[:limit]
+    if len(posts) <= limit and sum(1 for event in taken if event[1] == 0) == len(posts):
+        post_position = (horizon, 0)
+    if len(tombstones) <= limit and sum(1 for event in taken if event[1] == 1) == len(tombstones):
+        deletion_position = (horizon, 0)
+    has_more = len(events) > limit or len(posts) > limit or len(tombstones) > limit
+    return changes, encode_changes_cursor(post_position, deletion_position), has_more
+
+
+def _horizon() -> datetime:
+    return timezone.now() - timedelta(seconds=settings.POSTS_CHANGES["SETTLE_SECONDS"])
+
+
+def read_changes(since: str | None, limit: int) -> tuple[list[tuple[dict, str]], str, bool]:
+    horizon = _horizon()
+    start = _start(since, horizon)
+    with use_primary():
+        posts = list(_post_rows(start[0], horizon, limit))
+        tombstones = list(_tombstone_rows(start[1], horizon, limit))
+    return _merge(posts, tombstones, start, horizon, limit)
+
+
+async def aread_changes(since: str | None, limit: int) -> tuple[list[tuple[dict, str]], str, bool]:
+    horizon = _horizon()
+    start = _start(since, horizon)
+    with use_primary():
+        posts = [row async for row in _post_rows(start[0], horizon, limit)]
+        tombstones = [row async for row in _tombstone_rows(start[1], horizon, limit)]
+    return _merge(posts, tombstones, start, horizon, limit)
+
+
+def _page(changes: list[tuple[dict, str]], cursor: str, has_more: bool) -> dict:
+    return {"changes": [change for change, _ in changes], "next_cursor": cursor, "has_more": has_more}
+
+
+def _wait_seconds(wait: int) -> float:
+    if wait and not settings.POSTS_CHANGES["LONG_POLL"]:
+        # A sync worker held for `wait` seconds serves nobody else meanwhile
+        raise HttpError(400, "Long-polling is not enabled; poll without 'wait'.")
+    return min(wait, settings.POSTS_CHANGES["MAX_WAIT"])
+
+
+def changes_page(since: str | None, limit: int, wait: int = 0) -> dict:
+    """
+    A page of changes after `since`. With `wait`, long-poll: hold the request for up to
+    `wait` seconds (capped at MAX_WAIT), re-reading every POLL_INTERVAL until there are changes.
+    Raises HttpError(400) for `wait` unless POSTS_CHANGES["LONG_POLL"] is on.
+    """
+    deadline = time.monotonic() + _wait_seconds(wait)
+    while True:
+        changes, cursor, has_more = read_changes(since, limit)
+        if changes or time.monotonic() >= deadline:
+            return _page(changes, cursor, has_more)
+        since = cursor
+        time.sleep(settings.POSTS_CHANGES["POLL_INTERVAL"])
+
+
+async def achanges_page(since: str | None, limit: int, wait: int = 0) -> dict:
+    deadline = time.monotonic() + _wait_seconds(wait)
+    while True:
+        changes, cursor, has_more = await aread_changes(since, limit)
+        if changes or time.monotonic() >= deadline:
+            return _page(changes, cursor, has_more)
+        since = cursor
+        await asyncio.sleep(settings.POSTS_CHANGES["POLL_INTERVAL"])
+
+
+def _event(change: dict, cursor: str) -> bytes:
+    # The id lets EventSource resume after a reconnect by sending it back as Last-Event-ID
+    return f"id: {cursor}\nevent: {change['op']}\ndata: {_encoder.encode(change)}\n\n".encode()
+
+
+def _stream_start(request: HttpRequest, since: str | None) -> str | None:
+    if not settings.POSTS_CHANGES["LONG_POLL"]:
+        raise HttpError(404, "Change streams are not enabled; poll /posts/changes instead.")
+    since = request.headers.get("Last-Event-ID") or since
+    # Validate before the 200 response starts; errors cannot be reported once it has
+    _start(since, _horizon())
+    return since
+
+
+def iter_events(since: str | None, limit: int) -> Iterator[bytes]:
+    """Server-Sent Events for every change after `since`, for POSTS_CHANGES["STREAM_SECONDS"]."""
+    options = settings.POSTS_CHANGES
+    yield f"retry: {int(options['POLL_INTERVAL'] * 1000)}\n\n".encode()
+    started = last_write = time.monotonic()
+    while time.monotonic() - started < options["STREAM_SECONDS"]:
+        changes, since, has_more = read_changes(since, limit)
+        if changes:
+            yield b"".join(_event(change, cursor) for change, cursor in changes)
+            last_write = time.monotonic()
+        elif time.monotonic() - last_write >= options["HEARTBEAT_SECONDS"]:
+            # Keeps proxies from closing an idle stream
+            yield b": keepalive\n\n"
+            last_write = time.monotonic()
+        if not has_more:
+            time.sleep(options["POLL_INTERVAL"])
+
+
+async def aiter_events(since: str | None, limit: int) -> AsyncIterator[bytes]:
+    options = settings.POSTS_CHANGES
+    yield f"retry: {int(options['POLL_INTERVAL'] * 1000)}\n\n".encode()
+    started = last_write = time.monotonic()
+    while time.monotonic() - started < options["STREAM_SECONDS"]:
+        changes, since, has_more = await aread_changes(since, limit)
+        if changes:
+            yield b"".join(_event(change, cursor) for change, cursor in changes)
+            last_write = time.monotonic()
+        elif time.monotonic() - last_write >= options["HEARTBEAT_SECONDS"]:
+            yield b": keepalive\n\n"
+            last_write = time.monotonic()
+        if not has_more:
+            await asyncio.sleep(options["POLL_INTERVAL"])
+
+
+def _event_stream_response(content) -> StreamingHttpResponse:
+    response = StreamingHttpResponse(content, content_type="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    # Let nginx pass events through as they are written
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+def event_stream_response(request: HttpRequest, since: str | None, limit: int) -> StreamingHttpResponse:
+    """Stream changes as Server-Sent Events, resuming from Last-Event-ID when the client sends it."""
+    return _event_stream_response(iter_events(_stream_start(request, since), limit))
+
+
+def aevent_stream_response(request: HttpRequest, since: str | None, limit: int) -> StreamingHttpResponse:
+    """Async-iterator version of `event_stream_response` for the ASGI router."""
+    return _event_stream_response(aiter_events(_stream_start(request, since), limit))
@@ -0,0 +1,65 @@
+import hashlib
+from datetime import datetime, timedelta, timezone
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_etags, quote_etag
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def make_etag(*parts) -> str:
+    """Build a quoted strong ETag from the given validator parts."""
+    digest = hashlib.md5(":".join(str(part) for part in parts).encode(), usedforsecurity=False).hexdigest()
+    return quote_etag(digest)
+
+
+def version_etag(updated_at: datetime) -> str:
+    """
+    Strong ETag of a single post: its updated_at in microseconds since the epoch.
+
+    Unlike a digest it can be turned back into the version (see if_match_versions), so
+    a conditional write can compare it inside its UPDATE/DELETE statement.
+    """
+    return quote_etag(str((updated_at - EPOCH) // MICROSECOND))
+
+
+def if_match_versions(request: HttpRequest) -> list[datetime] | None:
+    """
+    The post versions (updated_at values) the If-Match header accepts.
+
+    None when there is no precondition: no header, or `*`. Weak or foreign ETags can
+    never match, so they are left out; an empty list means the write must fail with 412.
+    """
+    header = request.headers.get("If-Match")
+    if header is None:
+        return None
+    etags = parse_etags(header)
+    if etags == ["*"]:
+        return None
+    versions = []
+    for etag in etags:
+        value = etag.strip('"')
+        if etag.startswith('"') and value.isdigit():
+            versions.append(EPOCH + int(value) * MICROSECOND)
+    return versions
+
+
+def set_validators(response: HttpResponse, etag: str, last_modified: datetime | None) -> None:
+    response.headers["ETag"] = etag
+    if last_modified is not None:
+        response.headers["Last-Modified"] = http_date(last_modified.timestamp())
+
+
+def not_modified(request: HttpRequest, etag: str, last_modified: datetime | None) -> HttpResponse | None:
+    """
+    Evaluate If-None-Match / If-Modified-Since against the validators.
+
+    Returns a 304 response carrying the validators when the client copy is
+    still fresh, otherwise None so the caller renders the body as usual.
+    """
+    timestamp = int(last_modified.timestamp()) if last_modified is not None else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
@@ -0,0 +1,104 @@
+"""
+API handlers written once and served by both the sync (post.api_v1) and async (post.api_v1_async) routers.
+
+A handler is a generator. Every service call it makes is yielded as a `call()` pairing the
+sync function with its async twin, and the result is sent back in. `Endpoints.build_router()`
+wraps each handler in a plain view that runs the sync side, or in a coroutine view that awaits
+the async side, so routes, parameters and response handling are shared by both modes.
+"""
+
+import inspect
+from functools import partial, wraps
+from typing import Any, Callable, Generator, NamedTuple
+from django.http import HttpRequest, HttpResponse
+from ninja import Router
+
+Handler = Callable[..., Generator[tuple[Callable, Callable], Any, Any]]
+
+
+def call(sync: Callable, asynchronous: Callable, *args, **kwargs) -> tuple[Callable, Callable]:
+    """One step for a handler to yield: the same call to `sync` and to its async twin."""
+    return partial(sync, *args, **kwargs), partial(asynchronous, *args, **kwargs)
+
+
+class Unvalidated(NamedTuple):
+    """Handler result already shaped like the response schema, rendered without validating it again."""
+
+    request: HttpRequest
+    response: HttpResponse
+    data: Any
+
+
+def _result(router: Router, result: Any) -> Any:
+    if isinstance(result, Unvalidated):
+        return router.api.create_response(result.request, result.data, temporal_response=result.response)
+    return result
+
+
+def _sync_view(router: Router, handler: Handler) -> Callable:
+    @wraps(handler)
+    def view(*args, **kwargs):
+        steps = handler(*args, **kwargs)
+        value = None
+        while True:
+            try:
+                sync, _ = steps.send(value)
+            except StopIteration as done:
+                return _result(router, done.value)
+            value = sync()
+
+    return view
+
+
+def _async_view(router: Router, handler: Handler) -> Callable:
+    @wraps(handler)
+    async def view(*args, **kwargs):
+        steps = handler(*args, **kwargs)
+        value = None
+        while True:
+            try:
+                _, asynchronous = steps.send(value)
+            except StopIteration as done:
+                return _result(router, done.value)
+            value = asynchronous()
+            # Some twins only build a response around an async iterator and are not awaited
+            if inspect.isawaitable(value):
+                value = await value
+
+    return view
+
+
+class Endpoints:
+    """Route table of generator handlers; `build_router()` turns it into a ninja Router."""
+
+    def __init__(self, **router_options):
+        self.router_options = router_options
+        self.routes: list[tuple[list[str], str, dict, Handler]] = []
+
+    def api_operation(self, methods: list[str], path: str, **options) -> Callable[[Handler], Handler]:
+        def decorator(handler: Handler) -> Handler:
+            if not inspect.isgeneratorfunction(handler):
+                raise TypeError(f"{handler.__name__} must yield its service calls")
+            self.routes.append((methods, path, options, handler))
+            return handler
+
+        return decorator
+
+    def get(self, path: str, **options):
+        return self.api_operation(["GET"], path, **options)
+
+    def post(self, path: str, **options):
+        return self.api_operation(["POST"], path, **options)
+
+    def put(self, path: str, **options):
+        return self.api_operation(["PUT"], path, **options)
+
+    def delete(self, path: str, **options):
+        return self.api_operation(["DELETE"], path, **options)
+
+    def build_router(self, asynchronous: bool = False) -> Router:
+        router = Router(**self.router_options)
+        view = _async_view if asynchronous else _sync_view
+        for methods, path, options, handler in self.routes:
+            router.add_api_operation(path, methods, view(router, handler), **options)
+        return router
@@ -0,0 +1,108 @@
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, Iterable, Iterator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.conf import settings
+from django.db.models import QuerySet
+from django.http import HttpRequest, StreamingHttpResponse
+from .models import Posts
+
+EXPORT_FIELDS = ("id", "title", "content", "created_at", "updated_at")
+DEFAULT_CHUNK_SIZE = 2000
+# Lines are grouped into writes of roughly this many bytes
+BUFFER_SIZE = 64 * 1024
+
+_encoder = DjangoJSONEncoder(ensure_ascii=False)
+
+
+def export_queryset(updated_since: datetime | None = None) -> QuerySet:
+    """Plain dict rows in id order; `.values()` skips model instantiation per row."""
+    queryset = Posts.objects.order_by("id").values(*EXPORT_FIELDS)
+    if updated_since is not None:
+        queryset = queryset.filter(updated_at__gte=updated_since)
+    return queryset
+
+
+def _encode(row: dict) -> bytes:
+    return _encoder.encode(row).encode() + b"\n"
+
+
+def iter_ndjson(queryset: QuerySet, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Yield NDJSON bytes for `queryset`.
+
+    Rows come through `iterator()`, which uses a server-side cursor on PostgreSQL,
+    so memory use stays flat regardless of table size.
+    """
+    buffer = bytearray()
+    for row in queryset.iterator(chunk_size=chunk_size):
+        buffer += _encode(row)
+        if len(buffer) >= BUFFER_SIZE:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+async def aiter_ndjson(queryset: QuerySet, chunk_size: int = DEFAULT_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    buffer = bytearray()
+    async for row in queryset.aiterator(chunk_size=chunk_size):
+        buffer += _encode(row)
+        if len(buffer) >= BUFFER_SIZE:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+def _gzip_compressor():
+    # wbits=31 writes a gzip header and trailer
+    return zlib.compressobj(6, zlib.DEFLATED, 31)
+
+
+def gzip_stream(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = _gzip_compressor()
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+async def agzip_stream(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    compressor = _gzip_compressor()
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _streaming_response(content, compressed: bool) -> StreamingHttpResponse:
+    response = StreamingHttpResponse(content, content_type="application/x-ndjson")
+    response.headers["Vary"] = "Accept-Encoding"
+    # Let nginx pass chunks through instead of buffering the whole export
+    response.headers["X-Accel-Buffering"] = "no"
+    if compressed:
+        response.headers["Content-Encoding"] = "gzip"
+    return response
+
+
+def _accepts_gzip(request: HttpRequest) -> bool:
+    return "gzip" in request.headers.get("Accept-Encoding", "")
+
+
+def ndjson_response(request: HttpRequest, queryset: QuerySet) -> StreamingHttpResponse:
+    """Stream `queryset` as NDJSON, gzip-compressed when the client accepts it."""
+    chunks = iter_ndjson(queryset, settings.POSTS_EXPORT_CHUNK_SIZE)
+    if _accepts_gzip(request):
+        return _streaming_response(gzip_stream(chunks), compressed=True)
+    return _streaming_response(chunks, compressed=False)
+
+
+def andjson_response(request: HttpRequest, queryset: QuerySet) -> StreamingHttpResponse:
+    """Async-iterator version of `ndjson_response` for the ASGI router."""
+    chunks = aiter_ndjson(queryset, settings.POSTS_EXPORT_CHUNK_SIZE)
+    if _accepts_gzip(request):
+        return _streaming_response(agzip_stream(chunks), compressed=True)
+    return _streaming_response(chunks, compressed=False)
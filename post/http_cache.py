@@ -0,0 +1,83 @@
+"""
+Hints for the nginx micro-cache in front of the API, and purges after writes.
+
+Cacheable GET responses carry `X-Accel-Expires` (how long nginx may keep them; nginx
+strips it), `Cache-Control: public, no-cache` (clients revalidate with the ETag) and a
+`Cache-Tag` header naming the posts they contain, for tag-aware caches and CDNs.
+
+Open-source nginx cannot purge by tag, so `purge_posts` maps tags to the URLs it can
+refresh: each changed post and the default list pages. It requests them from the
+refresh server in nginx.conf (HTTP_CACHE["PURGE_URLS"]), which bypasses the cache and
+stores the fresh response. Other list variants expire within the TTL.
+"""
+
+import logging
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpRequest, HttpResponse
+from blog.routers import PIN_COOKIE
+
+logger = logging.getLogger("api")
+
+LIST_TAG = "posts"
+LIST_PATHS = ("/api/v1/posts", "/api/v1/posts?summary=true")
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="http-cache-purge")
+
+
+def post_tag(post_id: int) -> str:
+    return f"post-{post_id}"
+
+
+def set_cache_headers(request: HttpRequest, response: HttpResponse, tags: Iterable[str]) -> None:
+    """Mark a GET response as shareable for HTTP_CACHE["TTL"] seconds, unless the request is authenticated."""
+    ttl = settings.HTTP_CACHE["TTL"]
+    if ttl <= 0 or "Authorization" in request.headers:
+        response.headers["Cache-Control"] = "private, no-cache"
+        return
+    response.headers["Cache-Control"] = "public, no-cache"
+    response.headers["X-Accel-Expires"] = str(ttl)
+    response.headers["Cache-Tag"] = " ".join(tags)
+
+
+def _refresh(path: str) -> None:
+    for base in settings.HTTP_CACHE["PURGE_URLS"]:
+        # The pin cookie makes the app read the primary, so a lagging replica cannot be re-cached
+        request = urllib.request.Request(base + path, headers={"Cookie": f"{PIN_COOKIE}=1"})
+        try:
+            with urllib.request.urlopen(request, timeout=settings.HTTP_CACHE["PURGE_TIMEOUT"]) as response:
+                response.read()
+        except OSError as exc:
+            # 4xx answers (a deleted post) raise HTTPError too, but still refresh the cache entry
+            if getattr(exc, "code", 500) >= 500:
+                logger.warning("Cache refresh of %s%s failed: %s", base, path, exc)
+
+
+def _submit(paths: list[str]) -> None:
+    for path in paths:
+        _executor.submit(_refresh, path)
+
+
+def purge_posts(post_ids: Iterable[int]) -> None:
+    """
+    Refresh the cached URLs of the given posts and the list pages, off the request thread.
+
+    Runs after the surrounding transaction commits, so nginx never re-caches the old rows.
+    At most HTTP_CACHE["PURGE_MAX_POSTS"] posts are refreshed; the rest expire within the TTL.
+    """
+    if not settings.HTTP_CACHE["PURGE_URLS"]:
+        return
+    post_ids = list(post_ids)[: settings.HTTP_CACHE["PURGE_MAX_POSTS"]]
+    paths = [f"/api/v1/posts/{post_id}" for post_id in post_ids] + list(LIST_PATHS)
+    transaction.on_commit(lambda: _submit(paths))
+
+
+async def apurge_posts(post_ids: Iterable[int]) -> None:
+    # Async writes run in autocommit, so there is no transaction to wait for
+    if not settings.HTTP_CACHE["PURGE_URLS"]:
+        return
+    post_ids = list(post_ids)[: settings.HTTP_CACHE["PURGE_MAX_POSTS"]]
+    _submit([f"/api/v1/posts/{post_id}" for post_id in post_ids] + list(LIST_PATHS))
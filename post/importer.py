@@ -0,0 +1,207 @@
+import csv
+import io
+import json
+from itertools import chain, islice
+from typing import IO, Iterable, Iterator
+from django.core.management.color import no_style
+from django.db import connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from . import cache, http_cache
+from .models import Posts
+from .schemas import PostOut
+
+IMPORT_COLUMNS = ("id", "title", "content", "created_at", "updated_at")
+FIXTURE_MODEL = "post.posts"
+READ_SIZE = 64 * 1024
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+def _iter_json_array(fp: IO[str], head: str = "") -> Iterator[dict]:
+    """Yield the elements of a top-level JSON array without loading the whole document."""
+    decoder = json.JSONDecoder()
+    buffer = (head + fp.read(READ_SIZE)).lstrip()
+    if not buffer.startswith("["):
+        raise ImportFormatError("Fixture files must contain a JSON array.")
+    buffer = buffer[1:]
+    while True:
+        buffer = buffer.lstrip().lstrip(",").lstrip()
+        if buffer.startswith("]"):
+            return
+        try:
+            obj, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            chunk = fp.read(READ_SIZE)
+            if not chunk:
+                raise ImportFormatError("Unexpected end of fixture file.")
+            buffer += chunk
+            continue
+        yield obj
+        buffer = buffer[end:]
+
+
+def _iter_ndjson(fp: IO[str], head: str = "") -> Iterator[dict]:
+    for line in chain([head + fp.readline()], fp):
+        if line.strip():
+            yield json.loads(line)
+
+
+def _normalize(record: dict, number: int) -> dict | None:
+    # Fixture entries look like {"model", "pk", "fields"}; NDJSON rows (see post.export) are flat
+    if "fields" in record:
+        if record.get("model") != FIXTURE_MODEL:
+            return None
+        row = {"id": record.get("pk"), **record["fields"]}
+    else:
+        row = record
+    if not row.get("title") or not row.get("content"):
+        raise ImportFormatError(f"Record {number} is missing 'title' or 'content'.")
+    now = timezone.now().isoformat()
+    return {
+        "id": row.get("id"),
+        "title": row["title"],
+        "content": row["content"],
+        "created_at": row.get("created_at") or now,
+    }
+
+
+def iter_records(fp: IO[str], fmt: str = "auto") -> Iterator[dict]:
+    """
+    Stream normalized post rows from a Django fixture (JSON array) or NDJSON file.
+
+    With fmt="auto" the format is detected from the first non-blank character.
+    """
+    head = fp.read(1)
+    while head and head.isspace():
+        head = fp.read(1)
+    if fmt == "auto":
+        fmt = "fixture" if head == "[" else "ndjson"
+
+    records = _iter_json_array(fp, head) if fmt == "fixture" else _iter_ndjson(fp, head)
+    for number, record in enumerate(records, start=1):
+        row = _normalize(record, number)
+        if row is not None:
+            yield row
+
+
+def batched(rows: Iterable[dict], size: int) -> Iterator[list[dict]]:
+    iterator = iter(rows)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _columns(rows: list[dict]) -> tuple[str, ...]:
+    # Rows without an id take one from the sequence
+    return IMPORT_COLUMNS if rows[0]["id"] is not None else IMPORT_COLUMNS[1:]
+
+
+def _partition(batch: list[dict]) -> list[list[dict]]:
+    """Split a batch into rows with and without ids, since each needs its own column list."""
+    with_id = [row for row in batch if row["id"] is not None]
+    without_id = [row for row in batch if row["id"] is None]
+    return [group for group in (with_id, without_id) if group]
+
+
+def _copy(cursor, sql: str, rows: list[dict], columns: tuple[str, ...]) -> None:
+    buffer = io.StringIO()
+    # QUOTE_NONNUMERIC keeps empty strings quoted, so only None becomes NULL
+    writer = csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC)
+    for row in rows:
+        writer.writerow([row[column] for column in columns])
+    buffer.seek(0)
+    raw = cursor.cursor
+    # COPY goes through the driver cursor, so map its errors to django.db exceptions ourselves
+    with cursor.db.wrap_database_errors:
+        if hasattr(raw, "copy_expert"):  # psycopg2
+            raw.copy_expert(sql, buffer)
+        else:  # psycopg 3
+            with raw.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+
+
+def _load_postgresql(connection, rows: list[dict], upsert: bool) -> None:
+    table = Posts._meta.db_table
+    with connection.cursor() as cursor:
+        columns = _columns(rows)
+        column_list = ", ".join(columns)
+        # Rows without ids cannot conflict, so they skip the staging table
+        if not upsert or "id" not in columns:
+            _copy(cursor, f"COPY {table} ({column_list}) FROM STDIN WITH (FORMAT csv)", rows, columns)
+            return
+
+        # COPY into a scratch table, then merge with one INSERT ... ON CONFLICT.
+        # Dropped explicitly rather than ON COMMIT, since the caller may hold an outer transaction
+        cursor.execute(f"CREATE TEMP TABLE posts_import (LIKE {table} INCLUDING DEFAULTS)")
+        _copy(cursor, f"COPY posts_import ({column_list}) FROM STDIN WITH (FORMAT csv)", rows, columns)
+        updates = ", ".join(f"{column} = EXCLUDED.{column}" for column in columns if column != "id")
+        cursor.execute(
+            f"INSERT INTO {table} ({column_list}) SELECT {column_list} FROM posts_import "
+            f"ON CONFLICT (id) DO UPDATE SET {updates}"
+        )
+        cursor.execute("DROP TABLE posts_import")
+
+
+def _load_generic(connection, rows: list[dict], upsert: bool) -> None:
+    # executemany() rather than bulk_create(): bulk_create always applies auto_now_add /
+    # auto_now and would overwrite the imported timestamps.
+    table = Posts._meta.db_table
+    columns = _columns(rows)
+    placeholders = ", ".join(["%s"] * len(columns))
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+    if upsert:
+        updates = ", ".join(f"{column} = excluded.{column}" for column in columns if column != "id")
+        sql += f" ON CONFLICT (id) DO UPDATE SET {updates}"
+
+    adapt = connection.ops.adapt_datetimefield_value
+    params = [
+        [
+            adapt(parse_datetime(row[column])) if column in ("created_at", "updated_at") else row[column]
+            for column in columns
+        ]
+        for row in rows
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+
+
+def load_batch(rows: list[dict], upsert: bool = False, using: str = "default") -> int:
+    """
+    Write one batch in its own transaction. Returns the number of rows loaded.
+
+    created_at is kept from the input, but updated_at is the time of the import: the change
+    feed and If-Match versions follow updated_at, so an imported (older) value would hide
+    the rows from followers and move an upserted post's version backwards.
+    """
+    connection = connections[using]
+    loader = _load_postgresql if connection.vendor == "postgresql" else _load_generic
+    with transaction.atomic(using=using):
+        updated_at = timezone.now()
+        for group in _partition(rows):
+            loader(connection, [{**row, "updated_at": updated_at.isoformat()} for row in group], upsert)
+        # Every row of the batch carries this updated_at, so one range read over
+        # posts_updated_id_idx returns them as stored, with the ids the sequence handed out
+        written = {
+            post["id"]: PostOut(**post)
+            for post in Posts.objects.using(using)
+            .filter(updated_at=updated_at)
+            .order_by()
+            .values(*PostOut.model_fields)
+        }
+    # Write through, as the API writes do: replaces stale copies and negative entries alike
+    cache.set_posts(written)
+    cache.bump_list_version()
+    http_cache.purge_posts(written)
+    return len(rows)
+
+
+def reset_sequence(using: str = "default") -> None:
+    """Move the posts id sequence past the highest imported id."""
+    connection = connections[using]
+    statements = connection.ops.sequence_reset_sql(no_style(), [Posts])
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
@@ -1,17 +1,53 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from io import StringIO
+from django.conf import settings
+from django.core.management import call_command
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.test import TestCase, TransactionTestCase, override_settings
+from unittest import skipUnless
 from django.utils import timezone
-from datetime import datetime
+from django.contrib.auth.models import User
+from datetime import datetime, timedelta
+from unittest.mock import patch
 from django.http import Http404
-from .models import Posts
-from .schemas import PostCreate, PostUpdate
-from . import services
+from ninja.errors import HttpError
+from .models import EXCERPT_LENGTH, Posts, PostTombstone, UserToken
+from blog.readiness import get_monitor
+from blog.routers import PIN_COOKIE
+from prometheus_client import REGISTRY
+from .authentication import APIAuthBearer, AsyncAPIAuthBearer, get_token_cache, get_token_version
+from .importer import iter_records, load_batch
+from .schemas import PostBulkUpdate, PostCreate, PostOut, PostUpdate
+from . import cache, changes, http_cache, services
 
+# The default backend is "none" without REDIS_URL; these tests exercise the cache, so use the per-process one
+local_posts_cache = override_settings(POSTS_CACHE={**settings.POSTS_CACHE, "BACKEND": "local"})
+# A Django cache shared between processes, which the token cache requires
+shared_cache = override_settings(
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.path.join(tempfile.gettempdir(), "blog-tests-cache"),
+        }
+    }
+)
 
+
+@local_posts_cache
 class PostServicesIntegrationTest(TestCase):
     """Integration tests for Post services with database operations"""
 
     def setUp(self):
         """Create test data"""
+        cache.reset_backend()
         # Create multiple posts for testing
         self.test_posts = []
         for i in range(3):
@@ -106,3 +142,1167 @@ class PostServicesIntegrationTest(TestCase):
         # Try to delete non-existent post
         with self.assertRaises(Http404):
             services.delete_post(999)
+
+
+@local_posts_cache
+class OptimisticLockingIntegrationTest(TestCase):
+    """Integration tests for If-Match preconditions on update and delete"""
+
+    def setUp(self):
+        cache.reset_backend()
+        self.post = services.create_post(PostCreate(title="Locked", content="Locked Content"))
+        self.url = f"/api/v1/posts/{self.post.id}"
+
+    def put(self, data, **headers):
+        return self.client.put(self.url, data, content_type="application/json", **headers)
+
+    def test_update_returns_new_etag(self):
+        """An update with the current ETag succeeds and returns the next one"""
+        etag = self.client.get(self.url).headers["ETag"]
+        response = self.put({"title": "First"}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["title"], "First")
+        self.assertEqual(response.json()["content"], "Locked Content")
+        self.assertNotEqual(response.headers["ETag"], etag)
+        self.assertEqual(self.client.get(self.url).headers["ETag"], response.headers["ETag"])
+
+    def test_conflicting_writes_fail(self):
+        """A write based on an outdated ETag gets 412 and changes nothing"""
+        etag = self.client.get(self.url).headers["ETag"]
+        self.assertEqual(self.put({"title": "Theirs"}, HTTP_IF_MATCH=etag).status_code, 200)
+
+        response = self.put({"title": "Mine"}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(self.client.delete(self.url, HTTP_IF_MATCH=etag).status_code, 412)
+        self.assertEqual(Posts.objects.get(pk=self.post.id).title, "Theirs")
+
+    def test_unusable_if_match(self):
+        """Weak or unknown ETags never match; `*` and no header are unconditional"""
+        self.assertEqual(self.put({"title": "Weak"}, HTTP_IF_MATCH='W/"1"').status_code, 412)
+        self.assertEqual(self.put({"title": "Any"}, HTTP_IF_MATCH="*").status_code, 200)
+        self.assertEqual(self.put({"title": "Plain"}).status_code, 200)
+
+    def test_missing_post(self):
+        response = self.client.delete("/api/v1/posts/0", HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, 404)
+
+
+@local_posts_cache
+class PostPaginationIntegrationTest(TestCase):
+    """Integration tests for keyset pagination of posts"""
+
+    def setUp(self):
+        """Create posts, some sharing the same created_at to exercise the id tie-breaker"""
+        cache.reset_backend()
+        for i in range(7):
+            Posts.objects.create(title=f"Post {i}", content=f"Content {i}")
+        same_time = timezone.now()
+        Posts.objects.filter(title__in=["Post 2", "Post 3", "Post 4"]).update(created_at=same_time)
+        self.expected_ids = list(Posts.objects.order_by("-created_at", "-id").values_list("id", flat=True))
+
+    def test_walk_forward_and_back(self):
+        """Paging with `after` visits every post once; `before` returns the previous page"""
+        seen = []
+        pages = []
+        cursor = None
+        while True:
+            page = services.list_posts_page(limit=3, after=cursor)
+            pages.append(page)
+            seen.extend(post["id"] for post in page["posts"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+        self.assertEqual(seen, self.expected_ids)
+        self.assertEqual(len(pages), 3)
+        self.assertIsNone(pages[0]["prev_cursor"])
+
+        previous = services.list_posts_page(limit=3, before=pages[1]["prev_cursor"])
+        self.assertEqual([post["id"] for post in previous["posts"]], self.expected_ids[:3])
+        self.assertIsNone(previous["prev_cursor"])
+        self.assertIsNotNone(previous["next_cursor"])
+
+    def test_page_rows_skip_model_instances(self):
+        """Pages are built from `.values()` dicts that render the same as PostOut"""
+        with patch.object(Posts, "from_db", side_effect=AssertionError("model instantiated")):
+            page = services.list_posts_page(limit=2)
+        post = Posts.objects.get(id=page["posts"][0]["id"])
+        self.assertEqual(page["posts"][0], PostOut.from_orm(post).dict())
+
+        response = self.client.get("/api/v1/posts", {"limit": 2})
+        self.assertEqual(response.json()["posts"][0]["created_at"], DjangoJSONEncoder().default(post.created_at))
+
+    def test_summary_page(self):
+        """summary=true lists excerpts, kept current by the database, without reading content"""
+        post_id = self.expected_ids[0]
+        Posts.objects.filter(id=post_id).update(content="x" * 250)
+        with CaptureQueriesContext(connection) as queries:
+            page = services.list_posts_page(limit=3, summary=True)
+        self.assertNotIn("content", queries[-1]["sql"])
+        self.assertEqual(set(page["posts"][0]), {"id", "title", "excerpt", "created_at", "updated_at"})
+        excerpts = {row["id"]: row["excerpt"] for row in page["posts"]}
+        self.assertEqual(excerpts[post_id], "x" * EXCERPT_LENGTH)
+
+        response = self.client.get("/api/v1/posts", {"limit": 3, "summary": "true"})
+        full = self.client.get("/api/v1/posts", {"limit": 3})
+        self.assertNotIn("content", response.json()["posts"][0])
+        self.assertNotEqual(response.headers["ETag"], full.headers["ETag"])
+
+    def test_after_and_before_are_exclusive(self):
+        """Supplying both cursors should raise a 400 HttpError"""
+        page = services.list_posts_page(limit=3)
+        with self.assertRaises(HttpError) as context:
+            services.list_posts_page(limit=3, after=page["next_cursor"], before=page["next_cursor"])
+        self.assertEqual(context.exception.status_code, 400)
+
+
+@local_posts_cache
+class PostListCacheIntegrationTest(TestCase):
+    """Integration tests for the versioned post list cache"""
+
+    def setUp(self):
+        cache.reset_backend()
+        self.post = services.create_post(PostCreate(title="Cached", content="Cached Content"))
+
+    def test_cache_hit_skips_database(self):
+        """A repeated page request should be served without touching the database"""
+        services.list_posts_page(limit=10)
+        with self.assertNumQueries(0):
+            page = services.list_posts_page(limit=10)
+        self.assertEqual(page["posts"][0]["title"], "Cached")
+
+    def test_writes_invalidate_cached_pages(self):
+        """create, update and delete should each make cached pages unreachable"""
+        services.list_posts_page(limit=10)
+
+        services.create_post(PostCreate(title="Second", content="Second Content"))
+        self.assertEqual(len(services.list_posts_page(limit=10)["posts"]), 2)
+
+        services.update_post(self.post.id, PostUpdate(title="Renamed"))
+        titles = [post["title"] for post in services.list_posts_page(limit=10)["posts"]]
+        self.assertIn("Renamed", titles)
+
+        services.delete_post(self.post.id)
+        self.assertEqual(len(services.list_posts_page(limit=10)["posts"]), 1)
+
+
+@local_posts_cache
+class PostObjectCacheIntegrationTest(TestCase):
+    """Integration tests for the per-post read-through cache"""
+
+    def setUp(self):
+        cache.reset_backend()
+        self.post = Posts.objects.create(title="Hot Post", content="Hot Content")
+        self.lookups = {result: self.lookup_count(result) for result in ("hit", "miss", "negative_hit")}
+
+    def lookup_count(self, result):
+        return REGISTRY.get_sample_value("post_cache_lookups_total", {"result": result}) or 0
+
+    def assertLookups(self, result, count):
+        self.assertEqual(self.lookup_count(result) - self.lookups[result], count)
+
+    def test_read_through(self):
+        """The first read loads from the database, the next is a cache hit"""
+        with self.assertNumQueries(1):
+            services.get_post(self.post.id)
+        with self.assertNumQueries(0):
+            post = services.get_post(self.post.id)
+        self.assertEqual(post.title, "Hot Post")
+        self.assertLookups("hit", 1)
+        self.assertLookups("miss", 1)
+
+    def test_negative_cache(self):
+        """Repeated lookups of a missing id should only query the database once"""
+        with self.assertNumQueries(1):
+            for _ in range(3):
+                with self.assertRaises(Http404):
+                    services.get_post(999)
+        self.assertLookups("negative_hit", 2)
+
+    def test_write_through_and_evict(self):
+        """update_post refreshes the cached post and delete_post marks it missing"""
+        services.get_post(self.post.id)
+        services.update_post(self.post.id, PostUpdate(title="Updated Hot Post"))
+        with self.assertNumQueries(0):
+            self.assertEqual(services.get_post(self.post.id).title, "Updated Hot Post")
+
+        services.delete_post(self.post.id)
+        with self.assertRaises(Http404):
+            services.get_post(self.post.id)
+
+    def test_read_fill_loses_to_racing_writes(self):
+        """A read that loaded the row before an update or delete committed must not cache it"""
+        stale = Posts.objects.get(id=self.post.id)
+
+        def write_during_read(write):
+            def load(*args, **kwargs):
+                write()
+                return stale
+
+            return patch("post.services.get_object_or_404", side_effect=load)
+
+        with write_during_read(lambda: services.update_post(self.post.id, PostUpdate(title="Updated Hot Post"))):
+            self.assertEqual(services.get_post(self.post.id).title, "Hot Post")
+        self.assertEqual(services.get_post(self.post.id).title, "Updated Hot Post")
+
+        cache.get_backend().delete(cache.POST_KEY.format(self.post.id))
+        with write_during_read(lambda: services.bulk_delete_posts([self.post.id])):
+            services.get_post(self.post.id)
+        with self.assertNumQueries(0), self.assertRaises(Http404):
+            services.get_post(self.post.id)
+
+    def test_create_clears_negative_entry(self):
+        """A created post must not be hidden by an earlier negative cache entry"""
+        next_id = self.post.id + 1
+        with self.assertRaises(Http404):
+            services.get_post(next_id)
+        created = services.create_post(PostCreate(title="New Post", content="New Content"))
+        self.assertEqual(created.id, next_id)
+        self.assertEqual(services.get_post(next_id).title, "New Post")
+
+
+@local_posts_cache
+class ConditionalGetIntegrationTest(TestCase):
+    """Integration tests for ETag / Last-Modified handling on the post endpoints"""
+
+    def setUp(self):
+        cache.reset_backend()
+        self.post = services.create_post(PostCreate(title="Conditional", content="Conditional Content"))
+
+    def test_get_post_not_modified(self):
+        """A matching If-None-Match or If-Modified-Since should return an empty 304"""
+        response = self.client.get(f"/api/v1/posts/{self.post.id}")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("ETag", response.headers)
+        self.assertIn("Last-Modified", response.headers)
+
+        response = self.client.get(f"/api/v1/posts/{self.post.id}", HTTP_IF_NONE_MATCH=response.headers["ETag"])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+        response = self.client.get(
+            f"/api/v1/posts/{self.post.id}", HTTP_IF_MODIFIED_SINCE=response.headers["Last-Modified"]
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_get_post_modified_after_update(self):
+        """Updating a post should change its ETag"""
+        etag = self.client.get(f"/api/v1/posts/{self.post.id}").headers["ETag"]
+        services.update_post(self.post.id, PostUpdate(title="Changed"))
+        response = self.client.get(f"/api/v1/posts/{self.post.id}", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["title"], "Changed")
+
+    def test_list_not_modified_until_write(self):
+        """The list ETag should hold until a post is created or deleted, and depend on the page"""
+        etag = self.client.get("/api/v1/posts").headers["ETag"]
+        self.assertEqual(self.client.get("/api/v1/posts", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get("/api/v1/posts?limit=5", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        services.delete_post(self.post.id)
+        self.assertEqual(self.client.get("/api/v1/posts", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_list_modified_after_deleting_an_older_post(self):
+        """Deleting a post that is not the newest moves Last-Modified, with or without the posts cache"""
+        for backend in ("local", "none"):
+            posts_cache = override_settings(POSTS_CACHE={**settings.POSTS_CACHE, "BACKEND": backend})
+            with self.subTest(backend=backend), posts_cache:
+                cache.reset_backend()
+                older = services.create_post(PostCreate(title="Older", content="Content"))
+                # Last-Modified has one-second resolution, so date the posts before the deletion
+                Posts.objects.update(updated_at=timezone.now() - timedelta(days=1))
+                Posts.objects.filter(id=older.id).update(updated_at=timezone.now() - timedelta(days=2))
+                PostTombstone.objects.update(deleted_at=timezone.now() - timedelta(days=1))
+                last_modified = self.client.get("/api/v1/posts").headers["Last-Modified"]
+
+                services.delete_post(older.id)
+                response = self.client.get("/api/v1/posts", HTTP_IF_MODIFIED_SINCE=last_modified)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotIn(older.id, [post["id"] for post in response.json()["posts"]])
+
+
+@local_posts_cache
+class HttpCacheIntegrationTest(TestCase):
+    """Integration tests for the nginx micro-cache headers and the purges after writes"""
+
+    def setUp(self):
+        cache.reset_backend()
+        self.post = services.create_post(PostCreate(title="Cached", content="Cached Content"))
+        self.purging = {**settings.HTTP_CACHE, "PURGE_URLS": ["http://nginx:8081"]}
+
+    def test_anonymous_reads_are_shareable(self):
+        """Anonymous GETs carry the nginx TTL and the tags of the posts they contain"""
+        response = self.client.get(f"/api/v1/posts/{self.post.id}")
+        self.assertEqual(response.headers["Cache-Control"], "public, no-cache")
+        self.assertEqual(response.headers["X-Accel-Expires"], str(settings.HTTP_CACHE["TTL"]))
+        self.assertEqual(response.headers["Cache-Tag"], f"post-{self.post.id}")
+
+        response = self.client.get("/api/v1/posts")
+        self.assertEqual(response.headers["Cache-Tag"].split()[:2], ["posts", f"post-{self.post.id}"])
+
+    def test_authorized_reads_are_private(self):
+        response = self.client.get(f"/api/v1/posts/{self.post.id}", HTTP_AUTHORIZATION="Bearer token")
+        self.assertEqual(response.headers["Cache-Control"], "private, no-cache")
+        self.assertNotIn("X-Accel-Expires", response.headers)
+        self.assertNotIn("Cache-Tag", response.headers)
+
+    def test_writes_refresh_cached_urls_after_commit(self):
+        """Each write refreshes the post and the list pages, once its transaction commits"""
+        paths = [f"/api/v1/posts/{self.post.id}", *http_cache.LIST_PATHS]
+        with override_settings(HTTP_CACHE=self.purging), patch("post.http_cache._submit") as submit:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                services.update_post(self.post.id, PostUpdate(title="Changed"))
+                submit.assert_not_called()
+            self.assertEqual(len(callbacks), 1)
+            submit.assert_called_once_with(paths)
+
+            submit.reset_mock()
+            with self.captureOnCommitCallbacks(execute=True):
+                services.bulk_delete_posts([self.post.id])
+            submit.assert_called_once_with(paths)
+
+    def test_no_purge_urls(self):
+        with patch("post.http_cache._submit") as submit, self.captureOnCommitCallbacks(execute=True) as callbacks:
+            services.update_post(self.post.id, PostUpdate(title="Changed"))
+        self.assertEqual(callbacks, [])
+        submit.assert_not_called()
+
+
+@local_posts_cache
+class AsyncPostServicesIntegrationTest(TestCase):
+    """Integration tests for the async services and router used under ASGI"""
+
+    def setUp(self):
+        cache.reset_backend()
+
+    async def test_async_crud(self):
+        """The async services should create, read, list, update and delete posts"""
+        post = await services.acreate_post(PostCreate(title="Async Post", content="Async Content"))
+        self.assertEqual((await services.aget_post(post.id)).title, "Async Post")
+
+        page = await services.alist_posts_page(limit=10)
+        self.assertEqual([item["id"] for item in page["posts"]], [post.id])
+        validators = await services.aget_list_validators()
+        self.assertEqual(validators["last_modified"], post.updated_at)
+
+        updated = await services.aupdate_post(post.id, PostUpdate(content="Async Updated"))
+        self.assertEqual(updated.content, "Async Updated")
+        self.assertEqual((await services.aget_post(post.id)).content, "Async Updated")
+
+        await services.adelete_post(post.id)
+        with self.assertRaises(Http404):
+            await services.aget_post(post.id)
+        with self.assertRaises(Http404):
+            await services.adelete_post(post.id)
+
+    async def test_async_router(self):
+        """The async router should serve the same responses as the sync one"""
+        from ninja.testing import TestAsyncClient
+        from .api_v1_async import router
+
+        client = TestAsyncClient(router)
+        response = await client.post("/posts", json={"title": "Routed", "content": "Routed Content"})
+        self.assertEqual(response.status_code, 201)
+        post_id = response.json()["id"]
+
+        response = await client.get(f"/posts/{post_id}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["title"], "Routed")
+
+        response = await client.get("/posts")
+        self.assertEqual([post["id"] for post in response.json()["posts"]], [post_id])
+
+        response = await client.delete(f"/posts/{post_id}")
+        self.assertEqual(response.status_code, 204)
+
+
+@local_posts_cache
+class PostBulkIntegrationTest(TestCase):
+    """Integration tests for the bulk create / update / delete services and endpoints"""
+
+    def setUp(self):
+        cache.reset_backend()
+        self.items = [PostCreate(title=f"Bulk {i}", content=f"Bulk Content {i}") for i in range(25)]
+
+    def test_bulk_create(self):
+        """All posts should be inserted in one INSERT and reported per item"""
+        # SAVEPOINT, INSERT, RELEASE SAVEPOINT
+        with self.assertNumQueries(3):
+            results = services.bulk_create_posts(self.items)
+        self.assertEqual(Posts.objects.count(), 25)
+        self.assertTrue(all(result["status"] == 201 for result in results))
+        self.assertEqual(services.get_post(results[0]["id"]).title, "Bulk 0")
+
+    def test_bulk_update(self):
+        """Existing posts are updated, missing ids are reported as 404"""
+        created = services.bulk_create_posts(self.items[:3])
+        ids = [result["id"] for result in created]
+        original_updated_at = Posts.objects.get(id=ids[0]).updated_at
+        services.get_post(ids[0])
+
+        results = services.bulk_update_posts(
+            [
+                PostBulkUpdate(id=ids[0], title="Bulk Renamed"),
+                PostBulkUpdate(id=ids[1], content="Bulk Rewritten"),
+                PostBulkUpdate(id=999, title="Missing"),
+            ]
+        )
+        self.assertEqual([result["status"] for result in results], [200, 200, 404])
+
+        first = Posts.objects.get(id=ids[0])
+        self.assertEqual(first.title, "Bulk Renamed")
+        self.assertEqual(first.content, "Bulk Content 0")
+        self.assertGreater(first.updated_at, original_updated_at)
+        self.assertEqual(Posts.objects.get(id=ids[1]).content, "Bulk Rewritten")
+        self.assertEqual(services.get_post(ids[0]).title, "Bulk Renamed")
+
+    def test_bulk_delete(self):
+        """Existing posts are removed with one DELETE, missing ids are reported as 404"""
+        ids = [result["id"] for result in services.bulk_create_posts(self.items[:3])]
+        services.get_post(ids[0])
+
+        results = services.bulk_delete_posts(ids[:2] + [999])
+        self.assertEqual([result["status"] for result in results], [204, 204, 404])
+        self.assertEqual(list(Posts.objects.values_list("id", flat=True)), [ids[2]])
+        with self.assertRaises(Http404):
+            services.get_post(ids[0])
+
+    @override_settings(POSTS_BULK_MAX_ITEMS=10)
+    def test_bulk_size_cap(self):
+        """Requests over POSTS_BULK_MAX_ITEMS should be rejected with 400"""
+        with self.assertRaises(HttpError) as context:
+            services.bulk_create_posts(self.items)
+        self.assertEqual(context.exception.status_code, 400)
+        self.assertEqual(Posts.objects.count(), 0)
+
+    def test_bulk_endpoints(self):
+        """The bulk endpoints should return per-item results"""
+        response = self.client.post(
+            "/api/v1/posts/bulk", [item.dict() for item in self.items[:2]], content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 201)
+        ids = [result["id"] for result in response.json()["results"]]
+
+        response = self.client.put(
+            "/api/v1/posts/bulk", [{"id": ids[0], "title": "Via API"}], content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["results"][0]["post"]["title"], "Via API")
+
+        response = self.client.post("/api/v1/posts/bulk/delete", {"ids": ids}, content_type="application/json")
+        self.assertEqual([result["status"] for result in response.json()["results"]], [204, 204])
+        self.assertEqual(Posts.objects.count(), 0)
+
+
+@shared_cache
+class TokenCacheIntegrationTest(TestCase):
+    """Integration tests for the authenticated token cache"""
+
+    def setUp(self):
+        get_token_cache.cache_clear()
+        self.addCleanup(get_token_cache.cache_clear)
+        self.user = User.objects.create_user(username="reader", password="secret-password")
+        self.token = services.generate_token("reader", "secret-password")
+        self.auth = APIAuthBearer()
+
+    def test_cached_after_first_lookup(self):
+        """The first lookup runs one query (user included), later lookups none"""
+        with self.assertNumQueries(1):
+            self.assertEqual(self.auth.authenticate(None, self.token), self.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.auth.authenticate(None, self.token), self.user)
+
+    def test_revocation_propagates(self):
+        """Deactivating a token should drop it from the cache immediately"""
+        self.auth.authenticate(None, self.token)
+        user_token = UserToken.objects.get(token=self.token)
+        user_token.is_active = False
+        user_token.save()
+        self.assertIsNone(self.auth.authenticate(None, self.token))
+
+    def test_user_changes_revoke_only_when_access_changes(self):
+        """Logins (update_last_login) keep cached tokens; deactivation and new passwords drop them"""
+        self.auth.authenticate(None, self.token)
+        version = get_token_version()
+        services.generate_token("reader", "secret-password")
+        self.assertEqual(get_token_version(), version)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.auth.authenticate(None, self.token), self.user)
+
+        for change in (lambda user: user.set_password("new-password"), lambda user: setattr(user, "is_active", False)):
+            user = User.objects.get(pk=self.user.pk)
+            change(user)
+            user.save()
+            self.assertNotEqual(get_token_version(), version)
+            version = get_token_version()
+
+    def test_revoke_tokens_command(self):
+        """Bulk revocation deactivates the tokens and drops them from the cache"""
+        self.auth.authenticate(None, self.token)
+        out = StringIO()
+        call_command("revoke_tokens", "reader", stdout=out)
+        self.assertIn("Revoked 1 tokens", out.getvalue())
+        self.assertIsNone(self.auth.authenticate(None, self.token))
+        with self.assertRaises(CommandError):
+            call_command("revoke_tokens")
+
+    def test_entries_bounded_by_expiry(self):
+        """A cached token must stop authenticating once expires_at passes"""
+        UserToken.objects.filter(token=self.token).update(expires_at=timezone.now() + timedelta(seconds=30))
+        self.auth.authenticate(None, self.token)
+        with patch("post.authentication.timezone.now", return_value=timezone.now() + timedelta(minutes=1)):
+            with self.assertNumQueries(1):
+                self.assertIsNone(self.auth.authenticate(None, self.token))
+
+    def test_disabled_without_shared_cache(self):
+        """A per-process cache cannot carry revocations to other workers, so tokens are not cached"""
+        get_token_cache.cache_clear()
+        with override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}):
+            with self.assertLogs("api", "WARNING"):
+                self.assertIsNone(get_token_cache())
+            for _ in range(2):
+                with self.assertNumQueries(1):
+                    self.assertEqual(self.auth.authenticate(None, self.token), self.user)
+
+    def test_invalid_token(self):
+        """Unknown tokens are rejected"""
+        self.assertIsNone(self.auth.authenticate(None, "not-a-token"))
+
+    async def test_async_bearer(self):
+        """The async bearer shares the same cache"""
+        auth = AsyncAPIAuthBearer()
+        user = await auth.authenticate(None, self.token)
+        self.assertEqual(user.username, "reader")
+        self.assertIsNone(await auth.authenticate(None, "not-a-token"))
+
+
+class TokenLifecycleIntegrationTest(TestCase):
+    """Integration tests for token reuse and pruning"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="writer", password="secret-password")
+
+    def test_reuses_valid_token(self):
+        """A second login should return the existing token instead of inserting a new row"""
+        first = services.generate_token("writer", "secret-password")
+        second = services.generate_token("writer", "secret-password")
+        self.assertEqual(first, second)
+        self.assertEqual(UserToken.objects.filter(user=self.user).count(), 1)
+
+    def test_issues_new_token_near_expiry(self):
+        """Tokens with less than AUTH_TOKEN_REUSE_MIN_REMAINING left are not reused"""
+        first = services.generate_token("writer", "secret-password")
+        UserToken.objects.filter(token=first).update(expires_at=timezone.now() + timedelta(minutes=5))
+        self.assertNotEqual(services.generate_token("writer", "secret-password"), first)
+
+    def test_prune_tokens(self):
+        """prune_tokens deletes expired and inactive tokens in batches and keeps valid ones"""
+        now = timezone.now()
+        UserToken.objects.bulk_create(
+            [UserToken(user=self.user, token=f"expired-{i}", expires_at=now - timedelta(hours=1)) for i in range(5)]
+            + [UserToken(user=self.user, token="inactive", expires_at=now + timedelta(hours=1), is_active=False)]
+            + [UserToken(user=self.user, token="valid", expires_at=now + timedelta(hours=1))]
+        )
+
+        out = StringIO()
+        call_command("prune_tokens", "--dry-run", stdout=out)
+        self.assertIn("6 tokens would be deleted", out.getvalue())
+        self.assertEqual(UserToken.objects.count(), 7)
+
+        out = StringIO()
+        call_command("prune_tokens", "--batch-size", "2", stdout=out)
+        self.assertIn("Deleted 6 expired or inactive tokens", out.getvalue())
+        self.assertEqual(list(UserToken.objects.values_list("token", flat=True)), ["valid"])
+
+
+class PostSearchIntegrationTest(TestCase):
+    """Integration tests for full-text search (PostgreSQL) and its LIKE fallback (other databases)"""
+
+    def setUp(self):
+        self.title_hit = Posts.objects.create(title="Django tips", content="Working with the ORM")
+        self.content_hit = Posts.objects.create(title="Weekend cooking", content="Pasta while reading about Django")
+        Posts.objects.create(title="Gardening", content="Tomatoes and basil")
+
+    def test_ranked_results(self):
+        """Matches in the title should rank above matches in the content"""
+        page = services.search_posts("django")
+        self.assertEqual([post["id"] for post in page["posts"]], [self.title_hit.id, self.content_hit.id])
+        self.assertGreater(page["posts"][0]["rank"], page["posts"][1]["rank"])
+        self.assertIsNone(page["next_offset"])
+        self.assertEqual(services.search_posts("astronomy")["posts"], [])
+
+    def test_paginated(self):
+        """next_offset should lead to the remaining results"""
+        page = services.search_posts("django", limit=1)
+        self.assertEqual(page["next_offset"], 1)
+        page = services.search_posts("django", limit=1, offset=page["next_offset"])
+        self.assertEqual([post["id"] for post in page["posts"]], [self.content_hit.id])
+
+    def test_search_endpoint(self):
+        """GET /v1/posts/search should return ranked posts and validate q"""
+        response = self.client.get("/api/v1/posts/search", {"q": "tomatoes"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([post["title"] for post in response.json()["posts"]], ["Gardening"])
+        self.assertEqual(self.client.get("/api/v1/posts/search").status_code, 422)
+
+    @skipUnless(connection.vendor == "postgresql", "tsvector search requires PostgreSQL")
+    def test_search_vector_maintained(self):
+        """The trigger should stem words and follow updates, including bulk writes"""
+        self.assertEqual([post["id"] for post in services.search_posts("tip")["posts"]], [self.title_hit.id])
+
+        services.update_post(self.title_hit.id, PostUpdate(title="Flask notes"))
+        self.assertEqual(services.search_posts("tips")["posts"], [])
+
+        services.bulk_update_posts([PostBulkUpdate(id=self.content_hit.id, content="Nothing here")])
+        self.assertEqual(services.search_posts("pasta")["posts"], [])
+
+
+class PostExportIntegrationTest(TestCase):
+    """Integration tests for the streaming NDJSON export"""
+
+    def setUp(self):
+        self.posts = [Posts.objects.create(title=f"Export {i}", content=f"Export Content {i}") for i in range(3)]
+
+    def read_lines(self, content: bytes) -> list:
+        return [json.loads(line) for line in content.decode().splitlines()]
+
+    def test_export_endpoint(self):
+        """The endpoint streams one JSON object per post in id order"""
+        response = self.client.get("/api/v1/posts/export")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response.headers["Content-Type"], "application/x-ndjson")
+        rows = self.read_lines(b"".join(response.streaming_content))
+        self.assertEqual([row["id"] for row in rows], [post.id for post in self.posts])
+        self.assertEqual(set(rows[0]), {"id", "title", "content", "created_at", "updated_at"})
+
+    def test_export_gzip_and_updated_since(self):
+        """Gzip is used when accepted, and updated_since filters older posts"""
+        Posts.objects.filter(id=self.posts[0].id).update(updated_at=timezone.now() - timedelta(days=2))
+        since = (timezone.now() - timedelta(days=1)).isoformat()
+        response = self.client.get("/api/v1/posts/export", {"updated_since": since}, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        rows = self.read_lines(gzip.decompress(b"".join(response.streaming_content)))
+        self.assertEqual([row["id"] for row in rows], [post.id for post in self.posts[1:]])
+
+    def test_export_command(self):
+        """export_posts writes the same NDJSON to a file, optionally gzipped"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "posts.ndjson.gz")
+            call_command("export_posts", "--output", path, "--gzip", "--chunk-size", "2", stderr=StringIO())
+            with gzip.open(path) as f:
+                rows = self.read_lines(f.read())
+        self.assertEqual([row["title"] for row in rows], ["Export 0", "Export 1", "Export 2"])
+
+
+@local_posts_cache
+class PostChangesIntegrationTest(TestCase):
+    """Integration tests for the change feed: pages, long-polling and Server-Sent Events"""
+
+    def setUp(self):
+        cache.reset_backend()
+        self.settings_override = override_settings(
+            POSTS_CHANGES={
+                **settings.POSTS_CHANGES,
+                "LONG_POLL": True,
+                "SETTLE_SECONDS": 0,
+                "POLL_INTERVAL": 0.05,
+                "STREAM_SECONDS": 0.2,
+            }
+        )
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.posts = [services.create_post(PostCreate(title=f"Feed {i}", content="Feed Content")) for i in range(3)]
+
+    def changes(self, **params):
+        response = self.client.get("/api/v1/posts/changes", params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_sync_then_follow_changes(self):
+        """A first sync pages through every post; later pages carry only updates and deletions, in order"""
+        first = self.changes(limit=2)
+        self.assertTrue(first["has_more"])
+        second = self.changes(since=first["next_cursor"], limit=2)
+        self.assertFalse(second["has_more"])
+        synced = first["changes"] + second["changes"]
+        self.assertEqual([change["id"] for change in synced], [post.id for post in self.posts])
+        self.assertEqual({change["op"] for change in synced}, {"upsert"})
+        self.assertEqual(synced[0]["post"]["title"], "Feed 0")
+
+        services.update_post(self.posts[0].id, PostUpdate(title="Feed 0 edited"))
+        services.delete_post(self.posts[1].id)
+        services.bulk_delete_posts([self.posts[2].id])
+        page = self.changes(since=second["next_cursor"])
+        self.assertEqual(
+            [(change["op"], change["id"]) for change in page["changes"]],
+            [("upsert", self.posts[0].id), ("delete", self.posts[1].id), ("delete", self.posts[2].id)],
+        )
+        self.assertEqual(page["changes"][0]["post"]["title"], "Feed 0 edited")
+        self.assertIsNone(page["changes"][1]["post"])
+        self.assertEqual(self.changes(since=page["next_cursor"])["changes"], [])
+
+    def test_first_sync_skips_earlier_deletions(self):
+        services.delete_post(self.posts[0].id)
+        page = self.changes()
+        self.assertEqual([change["id"] for change in page["changes"]], [post.id for post in self.posts[1:]])
+        self.assertEqual({change["op"] for change in page["changes"]}, {"upsert"})
+
+    def test_recent_writes_settle_first(self):
+        """Rows newer than SETTLE_SECONDS are held back, so in-flight writes cannot be skipped"""
+        with override_settings(POSTS_CHANGES={**settings.POSTS_CHANGES, "SETTLE_SECONDS": 60}):
+            self.assertEqual(self.changes()["changes"], [])
+
+    def test_bad_cursors(self):
+        self.assertEqual(self.client.get("/api/v1/posts/changes", {"since": "nonsense"}).status_code, 400)
+        old = timezone.now() - timedelta(days=settings.POSTS_CHANGES["TOMBSTONE_RETENTION_DAYS"] + 1)
+        since = changes.encode_changes_cursor((old, 0), (old, 0))
+        self.assertEqual(self.client.get("/api/v1/posts/changes", {"since": since}).status_code, 410)
+
+    def test_long_poll_returns_empty_page_after_wait(self):
+        cursor = self.changes()["next_cursor"]
+        started = time.monotonic()
+        page = self.changes(since=cursor, wait=1)
+        self.assertGreaterEqual(time.monotonic() - started, 1)
+        self.assertEqual(page["changes"], [])
+
+    def test_requests_are_not_held_without_long_poll(self):
+        """Under sync workers (LONG_POLL off), wait and the stream are refused instead of tying up a worker"""
+        with override_settings(POSTS_CHANGES={**settings.POSTS_CHANGES, "LONG_POLL": False}):
+            started = time.monotonic()
+            self.assertEqual(self.client.get("/api/v1/posts/changes", {"wait": 1}).status_code, 400)
+            self.assertEqual(self.client.get("/api/v1/posts/changes/stream").status_code, 404)
+            self.assertLess(time.monotonic() - started, 1)
+            self.assertEqual(len(self.changes(wait=0)["changes"]), 3)
+
+    def test_imported_posts_show_up(self):
+        """Imports stamp updated_at, so rows carrying old timestamps still land after the cursor"""
+        cursor = self.changes()["next_cursor"]
+        version = self.posts[0].updated_at
+        old = "2020-01-01T00:00:00+00:00"
+        rows = [
+            {"id": self.posts[0].id, "title": "Feed 0 imported", "content": "Imported", "updated_at": old},
+            {"title": "Feed new", "content": "Imported", "created_at": old, "updated_at": old},
+        ]
+        load_batch(list(iter_records(StringIO("\n".join(json.dumps(row) for row in rows)))), upsert=True)
+
+        page = self.changes(since=cursor)
+        self.assertEqual([change["post"]["title"] for change in page["changes"]], ["Feed 0 imported", "Feed new"])
+        self.assertGreater(Posts.objects.get(id=self.posts[0].id).updated_at, version)
+
+    def test_prune_tombstones(self):
+        services.bulk_delete_posts([post.id for post in self.posts])
+        PostTombstone.objects.filter(post_id=self.posts[0].id).update(deleted_at=timezone.now() - timedelta(days=31))
+        out = StringIO()
+        call_command("prune_tombstones", "--days", "30", stdout=out)
+        self.assertIn("Deleted 1 tombstones", out.getvalue())
+        self.assertEqual(PostTombstone.objects.count(), 2)
+
+    def test_event_stream_resumes_from_last_event_id(self):
+        response = self.client.get("/api/v1/posts/changes/stream")
+        self.assertEqual(response.headers["Content-Type"], "text/event-stream")
+        events = [block for block in b"".join(response).decode().split("\n\n") if block.startswith("id: ")]
+        self.assertEqual(len(events), 3)
+        self.assertIn("event: upsert", events[0])
+        self.assertEqual(json.loads(events[0].split("data: ")[1])["id"], self.posts[0].id)
+
+        last_event_id = events[1].splitlines()[0][len("id: ") :]
+        response = self.client.get("/api/v1/posts/changes/stream", HTTP_LAST_EVENT_ID=last_event_id)
+        data = [line for line in b"".join(response).decode().splitlines() if line.startswith("data: ")]
+        self.assertEqual([json.loads(line[len("data: ") :])["id"] for line in data], [self.posts[2].id])
+
+
+@local_posts_cache
+class PostsAdminIntegrationTest(TestCase):
+    """Integration tests for post writes made in the admin or straight through the ORM"""
+
+    def setUp(self):
+        cache.reset_backend()
+        self.posts = [services.create_post(PostCreate(title=f"Admin {i}", content="Admin Content")) for i in range(3)]
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "secret-password"))
+
+    def test_delete_selected_records_tombstones_and_marks_posts_missing(self):
+        ids = [self.posts[0].id, self.posts[1].id]
+        response = self.client.post(
+            "/admin/post/posts/", {"action": "delete_selected", "_selected_action": ids, "post": "yes"}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(set(PostTombstone.objects.values_list("post_id", flat=True)), set(ids))
+        with self.assertNumQueries(0):
+            with self.assertRaises(Http404):
+                services.get_post(ids[0])
+        self.assertEqual([post["id"] for post in services.list_posts_page(limit=10)["posts"]], [self.posts[2].id])
+
+    def test_delete_view_records_tombstone(self):
+        response = self.client.post(f"/admin/post/posts/{self.posts[0].id}/delete/", {"post": "yes"})
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(PostTombstone.objects.filter(post_id=self.posts[0].id).exists())
+        with self.assertRaises(Http404):
+            services.get_post(self.posts[0].id)
+
+    def test_change_view_writes_through(self):
+        services.list_posts_page(limit=10)
+        response = self.client.post(
+            f"/admin/post/posts/{self.posts[0].id}/change/", {"title": "Edited in admin", "content": "Admin Content"}
+        )
+        self.assertEqual(response.status_code, 302)
+        with self.assertNumQueries(0):
+            self.assertEqual(services.get_post(self.posts[0].id).title, "Edited in admin")
+        titles = [post["title"] for post in services.list_posts_page(limit=10)["posts"]]
+        self.assertIn("Edited in admin", titles)
+
+    def test_orm_deletes_record_tombstones(self):
+        """QuerySet.delete() and Posts.delete() bypass the services but still reach the change feed"""
+        self.assertEqual(Posts.objects.filter(id=self.posts[0].id).delete(), (1, {"post.Posts": 1}))
+        Posts.objects.get(id=self.posts[1].id).delete()
+        self.assertEqual(Posts.objects.filter(id=self.posts[0].id).delete(), (0, {"post.Posts": 0}))
+        self.assertEqual(
+            sorted(PostTombstone.objects.values_list("post_id", flat=True)), [self.posts[0].id, self.posts[1].id]
+        )
+
+
+@local_posts_cache
+class PostImportIntegrationTest(TestCase):
+    """Integration tests for the import_posts command"""
+
+    def setUp(self):
+        cache.reset_backend()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name: str, text: str) -> str:
+        path = os.path.join(self.tmp.name, name)
+        opener = gzip.open if name.endswith(".gz") else open
+        with opener(path, "wt", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def import_posts(self, *args) -> str:
+        out = StringIO()
+        call_command("import_posts", *args, stdout=out)
+        return out.getvalue()
+
+    def test_import_fixture_keeps_ids_and_timestamps(self):
+        """The repo's fixture loads with its ids and creation times, and the sequence moves past them"""
+        output = self.import_posts("posts.json", "--batch-size", "1")
+        self.assertIn("Imported 2 posts", output)
+        self.assertIn("rows/s", output)
+        with open("posts.json") as f:
+            fixture = json.load(f)
+        for record in fixture:
+            post = Posts.objects.get(id=record["pk"])
+            self.assertEqual(post.title, record["fields"]["title"])
+            self.assertEqual(post.created_at.isoformat()[:19], record["fields"]["created_at"][:19])
+        new_post = Posts.objects.create(title="After", content="Import")
+        self.assertGreater(new_post.id, max(record["pk"] for record in fixture))
+
+    def test_import_ndjson_roundtrip_and_upsert(self):
+        """An export re-imports with --upsert, updating existing ids and adding new rows"""
+        post = Posts.objects.create(title="Original", content="Content")
+        rows = [
+            {"id": post.id, "title": "Replaced", "content": "New content"},
+            {"title": "Without id", "content": "Takes a sequence value"},
+        ]
+        path = self.write("posts.ndjson.gz", "\n".join(json.dumps(row) for row in rows) + "\n")
+        cache.get_backend().set(cache.POST_KEY.format(post.id), "stale")
+
+        with patch.object(http_cache, "purge_posts") as purge_posts:
+            self.import_posts(path, "--upsert")
+        post.refresh_from_db()
+        self.assertEqual(post.title, "Replaced")
+        added = Posts.objects.get(title="Without id")
+        with self.assertNumQueries(0):
+            self.assertEqual(services.get_post(post.id).title, "Replaced")
+            self.assertEqual(services.get_post(added.id).content, "Takes a sequence value")
+        self.assertEqual(set(purge_posts.call_args.args[0]), {post.id, added.id})
+
+    def test_import_duplicate_id_without_upsert_fails(self):
+        """Existing ids are rejected unless --upsert is given"""
+        post = Posts.objects.create(title="Original", content="Content")
+        path = self.write("dup.ndjson", json.dumps({"id": post.id, "title": "Dup", "content": "Dup"}) + "\n")
+        with self.assertRaises(CommandError):
+            self.import_posts(path)
+        post.refresh_from_db()
+        self.assertEqual(post.title, "Original")
+
+    def test_import_invalid_record(self):
+        """Records without a title or content are reported with their position"""
+        path = self.write("bad.ndjson", json.dumps({"title": "No content"}) + "\n")
+        with self.assertRaisesMessage(CommandError, "Record 1"):
+            self.import_posts(path)
+
+
+class QueryGuardMixin:
+    """
+    Pin the exact queries each operation runs.
+
+    `assertQueries(count)` fails when an operation's round trips change. On PostgreSQL every
+    captured SELECT is also EXPLAINed, and the test fails when a plan sequentially scans a
+    table or sorts more than `max_sort_rows` rows, unless that node type is listed in `allow`.
+    A Seq Scan over one of `large_tables` always fails: whole-table reads of posts are the
+    regression this guards against. Plans only mean something on a realistically sized
+    table, so combine this with `create_synthetic_posts`.
+    """
+
+    max_sort_rows = 1000
+    large_tables = (Posts._meta.db_table,)
+
+    @staticmethod
+    def create_synthetic_posts(count: int) -> None:
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "INSERT INTO posts (title, content, created_at, updated_at) "
+                    "SELECT 'Synthetic ' || n, repeat('content ', 50) || n, "
+                    "now() - n * interval '1 minute', now() - n * interval '1 minute' "
+                    "FROM generate_series(1, %s) AS n",
+                    [count],
+                )
+                cursor.execute("ANALYZE posts")
+        else:
+            Posts.objects.bulk_create(Posts(title=f"Synthetic {n}", content="content") for n in range(count))
+
+    def plan_problems(self, sql: str, allow: tuple) -> list[str]:
+        # Server-side cursors (export) wrap their SELECT in DECLARE ... FOR
+        select = sql[sql.index(" FOR SELECT ") + 5 :] if sql.startswith("DECLARE ") else sql
+        if not select.startswith("SELECT"):
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {select}")
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+
+        problems = []
+        nodes = [plan[0]["Plan"]]
+        while nodes:
+            node = nodes.pop()
+            nodes.extend(node.get("Plans", []))
+            node_type = node["Node Type"]
+            if node_type in allow and node.get("Relation Name") not in self.large_tables:
+                continue
+            if node_type == "Seq Scan":
+                problems.append(f"Seq Scan on {node['Relation Name']}")
+            elif node_type == "Sort" and node["Plan Rows"] > self.max_sort_rows:
+                problems.append(f"Sort of {node['Plan Rows']} rows")
+        return problems
+
+    @contextmanager
+    def assertQueries(self, count: int, allow: tuple = ()):
+        with CaptureQueriesContext(connection) as captured:
+            yield captured
+        queries = [query["sql"] for query in captured.captured_queries]
+        self.assertEqual(
+            len(queries), count, f"{len(queries)} queries instead of {count}:\n" + "\n".join(queries)
+        )
+        if connection.vendor != "postgresql":
+            return
+        for sql in queries:
+            problems = self.plan_problems(sql, allow)
+            self.assertFalse(problems, f"{', '.join(problems)} in plan of:\n{sql}")
+
+
+@local_posts_cache
+@shared_cache
+class QueryCountIntegrationTest(QueryGuardMixin, TestCase):
+    """Round trips per API operation, and query plans against a large posts table"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_synthetic_posts(20000)
+        cls.user = User.objects.create_user(username="counter", password="secret-password")
+
+    def setUp(self):
+        cache.reset_backend()
+        get_token_cache.cache_clear()
+        self.addCleanup(get_token_cache.cache_clear)
+        self.post = Posts.objects.order_by("-id").first()
+
+    def test_list(self):
+        # Collection validators (the newest updated_at and deleted_at) and the keyset page
+        with self.assertQueries(3):
+            page = self.client.get("/api/v1/posts?limit=20").json()
+        with self.assertQueries(0):
+            self.client.get("/api/v1/posts?limit=20")
+        with self.assertQueries(1):
+            self.client.get(f"/api/v1/posts?limit=20&after={page['next_cursor']}")
+        with self.assertQueries(1):
+            self.client.get("/api/v1/posts?limit=20&summary=true")
+
+    def test_list_without_cache(self):
+        # The default without REDIS_URL: every page pays the validators and its keyset query, never more
+        with override_settings(POSTS_CACHE={**settings.POSTS_CACHE, "BACKEND": "none"}):
+            cache.reset_backend()
+            with self.assertQueries(3):
+                page = self.client.get("/api/v1/posts?limit=20").json()
+            with self.assertQueries(3):
+                self.client.get(f"/api/v1/posts?limit=20&after={page['next_cursor']}")
+            with self.assertQueries(3):
+                self.client.get("/api/v1/posts?limit=20&summary=true")
+
+    def test_get(self):
+        with self.assertQueries(1):
+            self.assertEqual(self.client.get(f"/api/v1/posts/{self.post.id}").status_code, 200)
+        with self.assertQueries(0):
+            self.client.get(f"/api/v1/posts/{self.post.id}")
+        with self.assertQueries(1):
+            self.assertEqual(self.client.get("/api/v1/posts/0").status_code, 404)
+
+    def test_search(self):
+        Posts.objects.create(title="Searchable zeppelin", content="Content")
+        # Ranking has to sort every match
+        with self.assertQueries(1, allow=("Sort",)):
+            self.assertEqual(self.client.get("/api/v1/posts/search?q=zeppelin").status_code, 200)
+
+    def test_export(self):
+        with self.assertQueries(1):
+            response = self.client.get("/api/v1/posts/export")
+            b"".join(response.streaming_content)
+        since = (timezone.now() - timedelta(minutes=5)).isoformat()
+        with self.assertQueries(1):
+            response = self.client.get("/api/v1/posts/export", {"updated_since": since})
+            b"".join(response.streaming_content)
+
+    def test_changes(self):
+        # One keyset range scan each over posts_updated_id_idx and tombstones_deleted_id_idx
+        with self.assertQueries(2):
+            page = self.client.get("/api/v1/posts/changes").json()
+        with self.assertQueries(2):
+            self.client.get("/api/v1/posts/changes", {"since": page["next_cursor"]})
+
+    def test_writes(self):
+        with self.assertQueries(1):
+            response = self.client.post(
+                "/api/v1/posts", {"title": "Counted", "content": "Content"}, content_type="application/json"
+            )
+        post_id = response.json()["id"]
+        # Single UPDATE ... RETURNING, conditional or not
+        with self.assertQueries(1):
+            response = self.client.put(
+                f"/api/v1/posts/{post_id}", {"title": "Recounted"}, content_type="application/json"
+            )
+        # The row lock, DELETE and tombstone INSERT, in a transaction (a savepoint pair inside TestCase's)
+        with self.assertQueries(5):
+            response = self.client.delete(f"/api/v1/posts/{post_id}", HTTP_IF_MATCH=response.headers["ETag"])
+            self.assertEqual(response.status_code, 204)
+
+    def test_bulk_writes(self):
+        # Each bulk request is one transaction: the savepoint pair appears because TestCase wraps it in another
+        with self.assertQueries(3):
+            response = self.client.post(
+                "/api/v1/posts/bulk", [{"title": "Bulk", "content": "Content"}] * 3, content_type="application/json"
+            )
+        ids = [result["id"] for result in response.json()["results"]]
+        with self.assertQueries(4):
+            self.client.put(
+                "/api/v1/posts/bulk", [{"id": post_id, "title": "Bulk 2"} for post_id in ids], content_type="application/json"
+            )
+        with self.assertQueries(5):
+            self.client.post("/api/v1/posts/bulk/delete", {"ids": ids}, content_type="application/json")
+
+    def test_token_flow(self):
+        # User, reusable token lookup, then a new token
+        with self.assertQueries(3):
+            token = services.generate_token("counter", "secret-password")
+        with self.assertQueries(2):
+            self.assertEqual(services.generate_token("counter", "secret-password"), token)
+        # Authentication loads the user with the token, then serves it from the cache
+        with self.assertQueries(1):
+            self.assertEqual(APIAuthBearer().authenticate(None, token), self.user)
+        with self.assertQueries(0):
+            APIAuthBearer().authenticate(None, token)
+
+
+@local_posts_cache
+class MetricsIntegrationTest(TestCase):
+    """Integration tests for the per-route metrics middleware and endpoint"""
+
+    route = "/api/v1/posts/<post_id>"
+
+    def setUp(self):
+        cache.reset_backend()
+        self.post = services.create_post(PostCreate(title="Measured", content="Content"))
+
+    def sample(self, name, **labels):
+        return REGISTRY.get_sample_value(name, {"method": "GET", "route": self.route, **labels}) or 0
+
+    def test_records_route_status_and_queries(self):
+        """Requests are counted under their URL pattern, with the queries they ran"""
+        requests = self.sample("api_requests_total", status="200")
+        queries = self.sample("api_db_queries_per_request_sum")
+        cache.get_backend().delete(cache.POST_KEY.format(self.post.id))
+        with CaptureQueriesContext(connection) as captured:
+            self.assertEqual(self.client.get(f"/api/v1/posts/{self.post.id}").status_code, 200)
+
+        self.assertEqual(self.sample("api_requests_total", status="200"), requests + 1)
+        self.assertEqual(self.sample("api_db_queries_per_request_sum"), queries + len(captured))
+        self.assertGreater(self.sample("api_request_duration_seconds_count"), 0)
+
+    def test_metrics_endpoint(self):
+        self.client.get("/api/v1/posts/0")
+        response = self.client.get("/api/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        self.assertIn(
+            f'api_requests_total{{method="GET",route="{self.route}",status="404"}}', response.content.decode()
+        )
+
+
+@override_settings(READINESS={**settings.READINESS, "INTERVAL": 3600})
+class ReadinessIntegrationTest(TestCase):
+    """Integration tests for the /api/ready probe"""
+
+    def setUp(self):
+        # A fresh monitor per test whose background thread never gets to run
+        get_monitor.cache_clear()
+        self.addCleanup(get_monitor.cache_clear)
+
+    def test_ready_without_queries_per_probe(self):
+        response = self.client.get("/api/ready")
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body["status"], "ready")
+        self.assertTrue(body["checks"]["database:default"]["ok"])
+        self.assertEqual(body["worker"]["pid"], os.getpid())
+        self.assertEqual(response.headers["Cache-Control"], "no-store")
+
+        with self.assertNumQueries(0):
+            for _ in range(3):
+                self.client.get("/api/ready")
+
+    def test_unavailable_database(self):
+        with patch("blog.readiness.check_database", side_effect=ConnectionError("connection refused")):
+            response = self.client.get("/api/ready")
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(response.json()["checks"]["database:default"]["ok"])
+        self.assertEqual(self.client.get("/api/health").status_code, 200)
+
+
+@local_posts_cache
+@override_settings(DB_REPLICAS=["replica1"])
+class ReadReplicaIntegrationTest(TransactionTestCase):
+    """
+    Integration tests for read-your-writes with replicas configured.
+
+    TransactionTestCase, because reads inside TestCase's transaction always use the primary.
+    """
+
+    def setUp(self):
+        cache.reset_backend()
+
+    def test_cache_fills_after_a_write_read_the_primary(self):
+        """Right after a write, cache misses load from the primary rather than a lagging replica"""
+        # There is no "replica1" connection here, so any replica read would raise
+        post = services.create_post(PostCreate(title="Fresh", content="Content"))
+        cache.get_backend().delete(cache.POST_KEY.format(post.id))
+        self.assertEqual(services.get_post(post.id).title, "Fresh")
+        self.assertEqual(services.list_posts_page(limit=1)["posts"][0]["id"], post.id)
+
+    def test_writes_set_the_pin_cookie(self):
+        response = self.client.post(
+            "/api/v1/posts", {"title": "Pinned", "content": "Content"}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(PIN_COOKIE, response.cookies)
+        # The test client sends the cookie back, so this read is pinned to the primary
+        self.assertEqual(self.client.get(f"/api/v1/posts/{response.json()['id']}").status_code, 200)
@@ -0,0 +1,45 @@
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
+from post.export import export_queryset, gzip_stream, iter_ndjson
+
+
+class Command(BaseCommand):
+    help = "Stream all posts as NDJSON (one JSON object per line) with flat memory use."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", "-o", default="-", help="File to write, or '-' for stdout (default).")
+        parser.add_argument("--gzip", action="store_true", help="Gzip-compress the output.")
+        parser.add_argument(
+            "--updated-since", help="Only export posts updated at or after this ISO 8601 timestamp."
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=settings.POSTS_EXPORT_CHUNK_SIZE,
+            help="Rows fetched per server-side cursor round trip.",
+        )
+
+    def handle(self, *args, **options):
+        updated_since = None
+        if options["updated_since"]:
+            updated_since = parse_datetime(options["updated_since"])
+            if updated_since is None:
+                raise CommandError(f"Invalid --updated-since timestamp: {options['updated_since']}")
+
+        chunks = iter_ndjson(export_queryset(updated_since), options["chunk_size"])
+        if options["gzip"]:
+            chunks = gzip_stream(chunks)
+
+        if options["output"] == "-":
+            out = sys.stdout.buffer
+            for chunk in chunks:
+                out.write(chunk)
+            out.flush()
+            return
+
+        with open(options["output"], "wb") as out:
+            for chunk in chunks:
+                out.write(chunk)
+        self.stderr.write(self.style.SUCCESS(f"Exported posts to {options['output']}"))
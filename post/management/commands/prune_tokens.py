@@ -0,0 +1,41 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+from post.models import UserToken
+
+
+class Command(BaseCommand):
+    help = "Delete expired and inactive API tokens in small batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=1000, help="Tokens deleted per statement/transaction (default 1000)."
+        )
+        parser.add_argument(
+            "--sleep", type=float, default=0.0, help="Seconds to pause between batches to spread the load."
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Only report how many tokens would be deleted.")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        # Fix the cutoff up front so tokens expiring during the run are left for next time
+        stale = UserToken.objects.filter(Q(expires_at__lte=timezone.now()) | Q(is_active=False))
+
+        if options["dry_run"]:
+            self.stdout.write(f"{stale.count()} tokens would be deleted.")
+            return
+
+        deleted = 0
+        while True:
+            # Each batch is its own short autocommit transaction, so row locks are held briefly
+            ids = list(stale.order_by().values_list("id", flat=True)[:batch_size])
+            if not ids:
+                break
+            count, _ = UserToken.objects.filter(id__in=ids).delete()
+            deleted += count
+            self.stdout.write(f"Deleted {deleted} tokens so far...")
+            if options["sleep"]:
+                time.sleep(options["sleep"])
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired or inactive tokens."))
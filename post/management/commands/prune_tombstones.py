@@ -0,0 +1,47 @@
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from post.models import PostTombstone
+
+
+class Command(BaseCommand):
+    help = "Delete change feed tombstones older than the retention period in small batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.POSTS_CHANGES["TOMBSTONE_RETENTION_DAYS"],
+            help="Keep tombstones this many days (default POSTS_CHANGES_TOMBSTONE_RETENTION_DAYS).",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=1000, help="Tombstones deleted per statement/transaction (default 1000)."
+        )
+        parser.add_argument(
+            "--sleep", type=float, default=0.0, help="Seconds to pause between batches to spread the load."
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Only report how many tombstones would be deleted.")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        # The change feed answers 410 to cursors older than the retention, so nothing reads these any more
+        stale = PostTombstone.objects.filter(deleted_at__lt=timezone.now() - timedelta(days=options["days"]))
+
+        if options["dry_run"]:
+            self.stdout.write(f"{stale.count()} tombstones would be deleted.")
+            return
+
+        deleted = 0
+        while True:
+            ids = list(stale.order_by().values_list("id", flat=True)[:batch_size])
+            if not ids:
+                break
+            count, _ = PostTombstone.objects.filter(id__in=ids).delete()
+            deleted += count
+            self.stdout.write(f"Deleted {deleted} tombstones so far...")
+            if options["sleep"]:
+                time.sleep(options["sleep"])
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} tombstones older than {options['days']} days."))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+from post.authentication import revoke_tokens
+from post.models import UserToken
+
+
+class Command(BaseCommand):
+    help = "Revoke the active API tokens of the given users, or of everyone with --all."
+
+    def add_arguments(self, parser):
+        parser.add_argument("usernames", nargs="*", help="Users whose tokens are revoked.")
+        parser.add_argument("--all", action="store_true", help="Revoke every active token.")
+
+    def handle(self, *args, **options):
+        if options["all"] == bool(options["usernames"]):
+            raise CommandError("Give either usernames or --all.")
+        tokens = UserToken.objects.all()
+        if not options["all"]:
+            tokens = tokens.filter(user__username__in=options["usernames"])
+        revoked = revoke_tokens(tokens)
+        self.stdout.write(self.style.SUCCESS(f"Revoked {revoked} tokens."))
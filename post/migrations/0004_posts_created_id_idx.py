@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-17 07:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post', '0003_usertoken'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='posts',
+            index=models.Index(fields=['-created_at', '-id'], name='posts_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-17 07:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post', '0004_posts_created_id_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='usertoken',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['user', '-expires_at'], name='usertoken_active_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usertoken',
+            index=models.Index(fields=['expires_at'], name='usertoken_expires_at_idx'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2 on 2026-10-17 07:22
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# The trigger keeps search_vector current for every write path (save, bulk_create,
+# bulk_update, raw SQL). Other databases keep the column NULL and use the LIKE fallback.
+CREATE_SEARCH_SQL = """
+CREATE FUNCTION posts_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('pg_catalog.english', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('pg_catalog.english', coalesce(NEW.content, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER posts_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, content, search_vector ON posts
+    FOR EACH ROW EXECUTE FUNCTION posts_search_vector_update();
+
+UPDATE posts SET search_vector = NULL;
+
+CREATE INDEX posts_search_vector_idx ON posts USING gin (search_vector);
+"""
+
+DROP_SEARCH_SQL = """
+DROP INDEX IF EXISTS posts_search_vector_idx;
+DROP TRIGGER IF EXISTS posts_search_vector_trigger ON posts;
+DROP FUNCTION IF EXISTS posts_search_vector_update();
+"""
+
+
+def create_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(CREATE_SEARCH_SQL)
+
+
+def drop_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(DROP_SEARCH_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post', '0005_usertoken_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='posts',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, help_text='Weighted title+content tsvector, maintained by a trigger on PostgreSQL', null=True, serialize=False),
+        ),
+        migrations.RunPython(create_search_trigger, drop_search_trigger),
+    ]
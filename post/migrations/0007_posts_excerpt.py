@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-17 07:41
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post', '0006_posts_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='posts',
+            name='excerpt',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.text.Left('content', 200), help_text='First characters of the content, for summary listings', output_field=models.CharField(max_length=200)),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-17 08:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post', '0007_posts_excerpt'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='posts',
+            index=models.Index(fields=['updated_at', 'id'], name='posts_updated_id_idx'),
+        ),
+    ]
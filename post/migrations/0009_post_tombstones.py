@@ -0,0 +1,26 @@
+# Generated by Django 5.2 on 2026-10-17 08:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post', '0008_posts_updated_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post_id', models.BigIntegerField(help_text='Id of the deleted post')),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Timestamp when the post was deleted')),
+            ],
+            options={
+                'db_table': 'post_tombstones',
+                'indexes': [models.Index(fields=['deleted_at', 'id'], name='tombstones_deleted_id_idx')],
+            },
+        ),
+    ]
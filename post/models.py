@@ -1,5 +1,51 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
+from django.contrib.postgres.search import SearchVectorField
+from django.db.models.functions import Left
+from django.utils import timezone
+
+# Characters of content kept in Posts.excerpt for summary listings
+EXCERPT_LENGTH = 200
+
+
+class PostsQuerySet(models.QuerySet):
+    def delete_recorded(self) -> list[int]:
+        """
+        Delete these posts and record a PostTombstone for each, in one transaction.
+
+        Returns the deleted ids. `delete()` and `Posts.delete()` come here too, so deletions made
+        outside post.services (the admin, a shell) still reach the change feed and list validators.
+        """
+        if self.query.is_sliced:
+            raise TypeError("Cannot use 'limit' or 'offset' with delete().")
+        with transaction.atomic(using=self.db):
+            # Lock the rows first, so the tombstones name exactly the posts the DELETE removes
+            ids = list(self.order_by().select_for_update().values_list("pk", flat=True))
+            if ids:
+                # The base manager's plain QuerySet, so this does not come back here
+                self.model._base_manager.using(self.db).filter(pk__in=ids).delete()
+                deleted_at = timezone.now()
+                PostTombstone.objects.using(self.db).bulk_create(
+                    PostTombstone(post_id=post_id, deleted_at=deleted_at) for post_id in ids
+                )
+        return ids
+
+    delete_recorded.alters_data = True
+    delete_recorded.queryset_only = True
+
+    def delete(self):
+        ids = self.delete_recorded()
+        return len(ids), {self.model._meta.label: len(ids)}
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+
+class PostsManager(models.Manager.from_queryset(PostsQuerySet)):
+    def get_queryset(self):
+        # search_vector is maintained by a database trigger and only read by post.search;
+        # excerpt is only read by summary listings through .values()
+        return super().get_queryset().defer("search_vector", "excerpt")
 
 
 class Posts(models.Model):
@@ -9,13 +55,39 @@ class Posts(models.Model):
     content = models.TextField(null=False, blank=False, help_text="The main content of the blog post")
     created_at = models.DateTimeField(auto_now_add=True, help_text="Timestamp when the post was created")
     updated_at = models.DateTimeField(auto_now=True, help_text="Timestamp when the post was last updated")
+    # Stored generated column: the database recomputes it on every write, including
+    # bulk_create, queryset.update() and COPY imports, so reads never slice content
+    excerpt = models.GeneratedField(
+        expression=Left("content", EXCERPT_LENGTH),
+        output_field=models.CharField(max_length=EXCERPT_LENGTH),
+        db_persist=True,
+        help_text="First characters of the content, for summary listings",
+    )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        serialize=False,
+        help_text="Weighted title+content tsvector, maintained by a trigger on PostgreSQL",
+    )
+
+    objects = PostsManager()
 
     def __str__(self):
         return self.title
 
+    def delete(self, using=None, keep_parents=False):
+        # Through PostsQuerySet.delete(), so the deletion gets its tombstone
+        return type(self).objects.using(using).filter(pk=self.pk).delete()
+
     class Meta:
         ordering = ["-created_at"]
         db_table = "posts"
+        indexes = [
+            # Supports keyset pagination on (created_at, id), see post.pagination
+            models.Index(fields=["-created_at", "-id"], name="posts_created_id_idx"),
+            # Incremental export (updated_since) reads only recently changed rows
+            models.Index(fields=["updated_at", "id"], name="posts_updated_id_idx"),
+        ]
 
 
 class UserToken(models.Model):
@@ -27,6 +99,31 @@ class UserToken(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Finds a user's reusable token in services.generate_token
+            models.Index(
+                fields=["user", "-expires_at"], condition=models.Q(is_active=True), name="usertoken_active_user_idx"
+            ),
+            # Range scans for the prune_tokens management command
+            models.Index(fields=["expires_at"], name="usertoken_expires_at_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.username}'s token ({self.token})"
+
+
+class PostTombstone(models.Model):
+    """A deleted post, recorded by PostsQuerySet.delete() so the change feed (post.changes) can report it."""
+
+    post_id = models.BigIntegerField(help_text="Id of the deleted post")
+    deleted_at = models.DateTimeField(default=timezone.now, help_text="Timestamp when the post was deleted")
+
+    class Meta:
+        db_table = "post_tombstones"
+        indexes = [
+            # The change feed reads deletions in (deleted_at, id) order after a cursor
+            models.Index(fields=["deleted_at", "id"], name="tombstones_deleted_id_idx"),
+        ]
+
+    def __str__(self):
+        return f"Post {self.post_id} deleted at {self.deleted_at}"
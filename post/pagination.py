@@ -0,0 +1,83 @@
+import base64
+import binascii
+from datetime import datetime
+from django.db.models import Q, QuerySet
+from ninja.errors import HttpError
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+# Ranked search results are paged by offset; cap how deep a client may go
+MAX_SEARCH_OFFSET = 1000
+
+
+def encode_cursor(created_at: datetime, pk: int) -> str:
+    """Encode a (created_at, id) keyset position as an opaque URL-safe token."""
+    raw = f"{created_at.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Decode a token produced by `encode_cursor`. Raises HttpError(400) when malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, pk = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HttpError(400, "Invalid cursor")
+
+
+def _keyset_queryset(queryset: QuerySet, limit: int, after: str | None, before: str | None) -> QuerySet:
+    if after and before:
+        raise HttpError(400, "Only one of 'after' or 'before' may be provided.")
+
+    if before:
+        created_at, pk = decode_cursor(before)
+        # Walk backwards (oldest-first) from the cursor; _build_page flips the page back.
+        return queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)).order_by(
+            "created_at", "id"
+        )[: limit + 1]
+
+    queryset = queryset.order_by("-created_at", "-id")
+    if after:
+        created_at, pk = decode_cursor(after)
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+    return queryset[: limit + 1]
+
+
+def _row_cursor(row) -> str:
+    # Rows are model instances or `.values()` dicts
+    if isinstance(row, dict):
+        return encode_cursor(row["created_at"], row["id"])
+    return encode_cursor(row.created_at, row.id)
+
+
+def _build_page(rows: list, limit: int, after: str | None, before: str | None) -> dict:
+    has_more = len(rows) > limit
+    if before:
+        rows = rows[:limit][::-1]
+        next_cursor = _row_cursor(rows[-1]) if rows else None
+        prev_cursor = _row_cursor(rows[0]) if rows and has_more else None
+    else:
+        rows = rows[:limit]
+        next_cursor = _row_cursor(rows[-1]) if rows and has_more else None
+        prev_cursor = _row_cursor(rows[0]) if rows and after else None
+
+    return {"posts": rows, "next_cursor": next_cursor, "prev_cursor": prev_cursor}
+
+
+def paginate_keyset(queryset: QuerySet, limit: int, after: str | None = None, before: str | None = None) -> dict:
+    """
+    Slice `queryset` newest-first on (created_at, id) using keyset conditions.
+
+    Each page is a bounded index range scan, so the cost does not grow with how
+    deep the client pages, unlike OFFSET pagination.
+    """
+    return _build_page(list(_keyset_queryset(queryset, limit, after, before)), limit, after, before)
+
+
+async def apaginate_keyset(
+    queryset: QuerySet, limit: int, after: str | None = None, before: str | None = None
+) -> dict:
+    """Async version of `paginate_keyset`."""
+    rows = [row async for row in _keyset_queryset(queryset, limit, after, before)]
+    return _build_page(rows, limit, after, before)
@@ -1,6 +1,7 @@
 from ninja import Schema
 from pydantic import constr
 from datetime import datetime
+from typing import List, Literal
 from pydantic import Field
 from pydantic import model_validator
 
@@ -29,6 +30,67 @@ class PostOut(Schema):
     updated_at: datetime
 
 
+class PostPage(Schema):
+    posts: List[PostOut]
+    next_cursor: str | None = None
+    prev_cursor: str | None = None
+
+
+class PostSummary(Schema):
+    id: int
+    title: str
+    excerpt: str
+    created_at: datetime
+    updated_at: datetime
+
+
+class PostSummaryPage(Schema):
+    posts: List[PostSummary]
+    next_cursor: str | None = None
+    prev_cursor: str | None = None
+
+
+class PostSearchResult(PostOut):
+    rank: float
+
+
+class PostSearchPage(Schema):
+    posts: List[PostSearchResult]
+    next_offset: int | None = None
+
+
+class PostChange(Schema):
+    op: Literal["upsert", "delete"]
+    id: int
+    changed_at: datetime
+    post: PostOut | None = None
+
+
+class PostChangesPage(Schema):
+    changes: List[PostChange]
+    next_cursor: str
+    has_more: bool
+
+
+class PostBulkUpdate(PostUpdate):
+    id: int
+
+
+class PostBulkDelete(Schema):
+    ids: List[int] = Field(..., min_length=1)
+
+
+class PostBulkResult(Schema):
+    id: int
+    status: int
+    post: PostOut | None = None
+    error: str | None = None
+
+
+class PostBulkResponse(Schema):
+    results: List[PostBulkResult]
+
+
 class TokenRequest(Schema):
     username: str
     password: str
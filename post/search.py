@@ -0,0 +1,35 @@
+from functools import reduce
+from operator import and_
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import Case, F, FloatField, Q, QuerySet, Value, When
+
+SEARCH_CONFIG = "english"
+
+
+def search_queryset(queryset: QuerySet, terms: str) -> QuerySet:
+    """
+    Filter `queryset` to posts matching `terms`, annotated with `rank` and ordered best first.
+
+    On PostgreSQL this uses the trigger-maintained `search_vector` column and its GIN
+    index, with websearch syntax ("quoted phrases", OR, -exclusions). Other databases
+    (SQLite in tests) fall back to LIKE matching of every word, ranking title hits higher.
+    """
+    if connections[queryset.db].vendor == "postgresql":
+        query = SearchQuery(terms, search_type="websearch", config=SEARCH_CONFIG)
+        return (
+            queryset.filter(search_vector=query)
+            .annotate(rank=SearchRank(F("search_vector"), query))
+            .order_by("-rank", "-id")
+        )
+
+    words = terms.split()
+    if not words:
+        return queryset.none()
+    matches = reduce(and_, (Q(title__icontains=word) | Q(content__icontains=word) for word in words))
+    title_matches = reduce(and_, (Q(title__icontains=word) for word in words))
+    return (
+        queryset.filter(matches)
+        .annotate(rank=Case(When(title_matches, then=Value(1.0)), default=Value(0.5), output_field=FloatField()))
+        .order_by("-rank", "-id")
+    )
@@ -1,39 +1,324 @@
 from typing import List
-from .models import Posts, UserToken
-from .schemas import PostCreate, PostOut, PostUpdate
-from django.shortcuts import get_object_or_404
-from django.contrib.auth import authenticate
+from .models import Posts, PostTombstone, UserToken
+from .schemas import PostBulkUpdate, PostCreate, PostOut, PostSearchResult, PostSummary, PostUpdate
+from django.shortcuts import aget_object_or_404, get_object_or_404
+from django.http import Http404
+from django.contrib.auth import aauthenticate, authenticate
 from django.utils import timezone
-from datetime import timedelta
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.core.exceptions import EmptyResultSet
+from django.db import connections, router, transaction
+from django.db.models.sql import UpdateQuery
+from asgiref.sync import sync_to_async
+from blog.routers import use_primary
+from contextlib import nullcontext
+from django.db.models import Max
 from ninja.errors import HttpError
+from .pagination import DEFAULT_PAGE_SIZE, apaginate_keyset, paginate_keyset
+from .search import search_queryset
+from . import cache, http_cache
 import secrets
+import time
 
 
 def list_posts() -> List[PostOut]:
     return Posts.objects.all()
 
 
+# Columns behind PostOut and PostSummary. Every one is NOT NULL with a matching Python
+# type, so `.values()` rows already have the schema's shape and need no per-row validation.
+POST_OUT_FIELDS = tuple(PostOut.model_fields)
+POST_SUMMARY_FIELDS = tuple(PostSummary.model_fields)
+
+
+def _post_rows(summary: bool = False):
+    # Summaries select the stored excerpt instead of content, so the full body is never read
+    return Posts.objects.values(*(POST_SUMMARY_FIELDS if summary else POST_OUT_FIELDS))
+
+
+def _recently_written(written_at: float | None) -> bool:
+    return written_at is not None and time.time() - written_at < settings.DB_REPLICA_STICKY_SECONDS
+
+
+def _cache_fill_reads():
+    """
+    Context for reads whose results go into the cache.
+
+    For DB_REPLICA_STICKY_SECONDS after any post write they use the primary, so a lagging
+    replica cannot put rows the write already changed back into the shared cache.
+    """
+    if settings.DB_REPLICAS and _recently_written(cache.get_list_written_at()):
+        return use_primary()
+    return nullcontext()
+
+
+async def _acache_fill_reads():
+    if settings.DB_REPLICAS and _recently_written(await cache.aget_list_written_at()):
+        return use_primary()
+    return nullcontext()
+
+
+def _list_validators(last_updated: datetime | None, last_deleted: datetime | None) -> dict:
+    moments = [moment for moment in (last_updated, last_deleted) if moment is not None]
+    return {"last_updated": last_updated, "last_deleted": last_deleted, "last_modified": max(moments, default=None)}
+
+
+def _new_token() -> tuple[str, datetime]:
+    # Generate a secure random token with a 24 hour expiry
+    return secrets.token_urlsafe(32), timezone.now() + timedelta(hours=24)
+
+
+def _reusable_tokens(user):
+    min_expires_at = timezone.now() + timedelta(seconds=settings.AUTH_TOKEN_REUSE_MIN_REMAINING)
+    return (
+        UserToken.objects.filter(user=user, is_active=True, expires_at__gt=min_expires_at)
+        .order_by("-expires_at")
+        .values_list("token", flat=True)
+    )
+
+
+def list_posts_page(
+    limit: int = DEFAULT_PAGE_SIZE, after: str | None = None, before: str | None = None, summary: bool = False
+) -> dict:
+    """
+    A page of posts as plain PostOut-shaped dicts, read with `.values()` (no model instances).
+
+    With `summary`, rows are PostSummary-shaped: `excerpt` replaces `content`.
+    """
+
+    def load_page() -> dict:
+        with _cache_fill_reads():
+            return paginate_keyset(_post_rows(summary), limit, after=after, before=before)
+
+    return cache.get_list_page(limit, after, before, load_page, summary=summary)
+
+
+def _search_page(rows: list, limit: int, offset: int) -> dict:
+    return {
+        "posts": [PostSearchResult.from_orm(post).dict() for post in rows[:limit]],
+        "next_offset": offset + limit if len(rows) > limit else None,
+    }
+
+
+def search_posts(q: str, limit: int = DEFAULT_PAGE_SIZE, offset: int = 0) -> dict:
+    """
+    Rank posts against `q`, best match first.
+
+    Paged by offset rather than keyset: ranking has to score every match anyway,
+    so a cursor would not make deep pages cheaper.
+    """
+    rows = list(search_queryset(Posts.objects.all(), q)[offset : offset + limit + 1])
+    return _search_page(rows, limit, offset)
+
+
+def get_list_validators() -> dict:
+    """
+    Return the collection's `last_updated`, `last_deleted` and `last_modified` (the later of
+    the two), cached per collection version.
+
+    Every write moves one of them: creates, updates and imports stamp updated_at, and
+    deletions write a PostTombstone. Both maxima are read from the end of an index, so
+    the cost does not grow with the table.
+    """
+
+    def load_validators() -> dict:
+        with _cache_fill_reads():
+            last_updated = Posts.objects.aggregate(moment=Max("updated_at"))["moment"]
+            last_deleted = PostTombstone.objects.aggregate(moment=Max("deleted_at"))["moment"]
+        return _list_validators(last_updated, last_deleted)
+
+    return cache.get_list_validators(load_validators)
+
+
 def get_post(post_id: int) -> PostOut:
-    return get_object_or_404(Posts, pk=post_id)
+    cached = cache.get_post(post_id)
+    if cached == cache.NOT_FOUND:
+        raise Http404("No Posts matches the given query.")
+    if cached is not None:
+        return cached
+
+    try:
+        with _cache_fill_reads():
+            post = PostOut.from_orm(get_object_or_404(Posts, pk=post_id))
+    except Http404:
+        cache.fill_post_missing(post_id)
+        raise
+    cache.fill_post(post_id, post)
+    return post
 
 
 def create_post(data: PostCreate) -> PostOut:
-    return Posts.objects.create(**data.dict())
+    post = Posts.objects.create(**data.dict())
+    post_saved(post)
+    return post
+
+
+def post_saved(post: Posts) -> None:
+    """Write a saved post through the caches; for saves made outside these services too, e.g. the admin."""
+    cache.set_post(post.id, PostOut.from_orm(post))
+    cache.bump_list_version()
+    http_cache.purge_posts([post.id])
+
+
+PRECONDITION_FAILED = "The post was modified since it was read."
+
+
+def _versioned(post_id: int, versions: list[datetime] | None):
+    queryset = Posts.objects.filter(pk=post_id)
+    return queryset if versions is None else queryset.filter(updated_at__in=versions)
+
+
+def _update_returning(post_id: int, values: dict, versions: list[datetime] | None) -> PostOut | None:
+    """
+    Run one `UPDATE posts SET <values> WHERE id = ... [AND updated_at IN versions] RETURNING ...`.
+
+    Returns the updated post, or None when no row matched. The ORM builds the statement, as
+    for `.update()`, which has no RETURNING of its own, so that is appended here.
+    """
+    using = router.db_for_write(Posts)
+    connection = connections[using]
+    query = _versioned(post_id, versions).query.chain(UpdateQuery)
+    query.add_update_values(values)
+    try:
+        sql, params = query.get_compiler(using).as_sql()
+    except EmptyResultSet:
+        # No version in If-Match could ever match
+        return None
+
+    columns = [Posts._meta.get_field(name).get_col(Posts._meta.db_table) for name in POST_OUT_FIELDS]
+    returning = ", ".join(connection.ops.quote_name(column.target.column) for column in columns)
+    with transaction.mark_for_rollback_on_error(using), connection.cursor() as cursor:
+        cursor.execute(f"{sql} RETURNING {returning}", params)
+        row = cursor.fetchone()
+    if row is None:
+        return None
+
+    # Apply the backend's converters, as the ORM does for query results (SQLite returns text datetimes)
+    values = {}
+    for name, column, value in zip(POST_OUT_FIELDS, columns, row):
+        for converter in connection.ops.get_db_converters(column) + column.get_db_converters(connection):
+            value = converter(value, column, connection)
+        values[name] = value
+    return PostOut(**values)
+
+
+def _write_failed(post_id: int, versions: list[datetime] | None) -> HttpError | Http404:
+    """Why a conditional write matched no row. Only runs on that failure path."""
+    if versions is not None and Posts.objects.filter(pk=post_id).exists():
+        return HttpError(412, PRECONDITION_FAILED)
+    return Http404("No Posts matches the given query.")
 
 
-def update_post(post_id: int, data: PostUpdate) -> PostOut:
-    post = get_object_or_404(Posts, pk=post_id)
-    if data.title:
-        post.title = data.title
-    if data.content:
-        post.content = data.content
-    post.save()
+def _update_values(data: PostUpdate) -> dict:
+    # Only the provided fields; .update() skips auto_now, so stamp updated_at explicitly
+    values = {name: value for name, value in data.dict().items() if value}
+    values["updated_at"] = timezone.now()
+    return values
+
+
+def update_post(post_id: int, data: PostUpdate, versions: list[datetime] | None = None) -> PostOut:
+    """
+    Update the provided fields with a single UPDATE ... RETURNING.
+
+    With `versions` (from If-Match), the row is only updated while its updated_at is one
+    of them, so a concurrent edit makes this fail with 412 instead of being overwritten.
+    """
+    post = _update_returning(post_id, _update_values(data), versions)
+    if post is None:
+        raise _write_failed(post_id, versions)
+    cache.set_post(post_id, post)
+    cache.bump_list_version()
+    http_cache.purge_posts([post_id])
     return post
 
 
-def delete_post(post_id: int) -> None:
-    post = get_object_or_404(Posts, pk=post_id)
-    post.delete()
+def delete_posts(queryset) -> list[int]:
+    """
+    Delete the queryset's posts with their tombstones (see PostsQuerySet.delete_recorded) and
+    mark them missing in the caches; for deletes made outside the API too, e.g. the admin.
+    """
+    deleted = queryset.delete_recorded()
+    if deleted:
+        cache.set_posts_missing(deleted)
+        cache.bump_list_version()
+        http_cache.purge_posts(deleted)
+    return deleted
+
+
+def delete_post(post_id: int, versions: list[datetime] | None = None) -> None:
+    """Delete a post; no matching row is a 404, or a 412 when `versions` did not match."""
+    if not delete_posts(_versioned(post_id, versions)):
+        raise _write_failed(post_id, versions)
+
+
+def _check_bulk_size(items: list) -> None:
+    if len(items) > settings.POSTS_BULK_MAX_ITEMS:
+        raise HttpError(400, f"At most {settings.POSTS_BULK_MAX_ITEMS} items are allowed per bulk request.")
+
+
+def bulk_create_posts(items: List[PostCreate]) -> List[dict]:
+    """Insert all posts with batched multi-row INSERTs in one transaction."""
+    _check_bulk_size(items)
+    with transaction.atomic():
+        posts = Posts.objects.bulk_create(
+            [Posts(**item.dict()) for item in items], batch_size=settings.POSTS_BULK_BATCH_SIZE
+        )
+
+    out = {post.id: PostOut.from_orm(post) for post in posts}
+    cache.set_posts(out)
+    cache.bump_list_version()
+    http_cache.purge_posts(out)
+    return [{"id": post_id, "status": 201, "post": post} for post_id, post in out.items()]
+
+
+def bulk_update_posts(items: List[PostBulkUpdate]) -> List[dict]:
+    """
+    Apply partial updates with one SELECT and batched CASE-based UPDATEs.
+
+    Ids that do not exist are reported per item with status 404.
+    """
+    _check_bulk_size(items)
+    now = timezone.now()
+    with transaction.atomic():
+        # order_by(): the rows go into a dict, so Meta.ordering would only add a sort
+        posts = Posts.objects.order_by().in_bulk([item.id for item in items])
+        for item in items:
+            post = posts.get(item.id)
+            if post is None:
+                continue
+            if item.title:
+                post.title = item.title
+            if item.content:
+                post.content = item.content
+            # bulk_update() skips auto_now, so stamp updated_at explicitly
+            post.updated_at = now
+        Posts.objects.bulk_update(
+            posts.values(), ["title", "content", "updated_at"], batch_size=settings.POSTS_BULK_BATCH_SIZE
+        )
+
+    out = {post_id: PostOut.from_orm(post) for post_id, post in posts.items()}
+    cache.set_posts(out)
+    cache.bump_list_version()
+    http_cache.purge_posts(out)
+    return [
+        {"id": item.id, "status": 200, "post": out[item.id]}
+        if item.id in out
+        else {"id": item.id, "status": 404, "error": "No Posts matches the given query."}
+        for item in items
+    ]
+
+
+def bulk_delete_posts(post_ids: List[int]) -> List[dict]:
+    """Delete all given posts with a single DELETE ... WHERE id IN (...)."""
+    _check_bulk_size(post_ids)
+    existing = set(delete_posts(Posts.objects.filter(id__in=post_ids)))
+    return [
+        {"id": post_id, "status": 204}
+        if post_id in existing
+        else {"id": post_id, "status": 404, "error": "No Posts matches the given query."}
+        for post_id in post_ids
+    ]
 
 
 def generate_token(username: str, password: str) -> str:
@@ -41,11 +326,107 @@ def generate_token(username: str, password: str) -> str:
     if not user:
         raise HttpError(401, "Invalid credentials")
 
-    # Generate a secure random token
-    token = secrets.token_urlsafe(32)
+    # Hand back a still-valid token instead of growing the table on every login
+    token = _reusable_tokens(user).first()
+    if token:
+        return token
 
-    # Create token with 24 hour expiry
-    expires_at = timezone.now() + timedelta(hours=24)
+    token, expires_at = _new_token()
     UserToken.objects.create(user=user, token=token, expires_at=expires_at)
 
     return token
+
+
+# Async variants used by post.api_v1_async when the API runs under ASGI (API_ASYNC=True).
+# They mirror the sync services above, using Django's async ORM and cache APIs.
+
+
+async def alist_posts_page(
+    limit: int = DEFAULT_PAGE_SIZE, after: str | None = None, before: str | None = None, summary: bool = False
+) -> dict:
+    async def load_page() -> dict:
+        with await _acache_fill_reads():
+            return await apaginate_keyset(_post_rows(summary), limit, after=after, before=before)
+
+    return await cache.aget_list_page(limit, after, before, load_page, summary=summary)
+
+
+async def asearch_posts(q: str, limit: int = DEFAULT_PAGE_SIZE, offset: int = 0) -> dict:
+    rows = [post async for post in search_queryset(Posts.objects.all(), q)[offset : offset + limit + 1]]
+    return _search_page(rows, limit, offset)
+
+
+async def aget_list_validators() -> dict:
+    async def load_validators() -> dict:
+        with await _acache_fill_reads():
+            last_updated = (await Posts.objects.aaggregate(moment=Max("updated_at")))["moment"]
+            last_deleted = (await PostTombstone.objects.aaggregate(moment=Max("deleted_at")))["moment"]
+        return _list_validators(last_updated, last_deleted)
+
+    return await cache.aget_list_validators(load_validators)
+
+
+async def aget_post(post_id: int) -> PostOut:
+    cached = await cache.aget_post(post_id)
+    if cached == cache.NOT_FOUND:
+        raise Http404("No Posts matches the given query.")
+    if cached is not None:
+        return cached
+
+    try:
+        with await _acache_fill_reads():
+            post = PostOut.from_orm(await aget_object_or_404(Posts, pk=post_id))
+    except Http404:
+        await cache.afill_post_missing(post_id)
+        raise
+    await cache.afill_post(post_id, post)
+    return post
+
+
+async def acreate_post(data: PostCreate) -> PostOut:
+    post = await Posts.objects.acreate(**data.dict())
+    await cache.aset_post(post.id, PostOut.from_orm(post))
+    await cache.abump_list_version()
+    await http_cache.apurge_posts([post.id])
+    return post
+
+
+async def _awrite_failed(post_id: int, versions: list[datetime] | None) -> HttpError | Http404:
+    if versions is not None and await Posts.objects.filter(pk=post_id).aexists():
+        return HttpError(412, PRECONDITION_FAILED)
+    return Http404("No Posts matches the given query.")
+
+
+async def aupdate_post(post_id: int, data: PostUpdate, versions: list[datetime] | None = None) -> PostOut:
+    # The async ORM has no raw cursor, so the statement runs in a thread
+    post = await sync_to_async(_update_returning)(post_id, _update_values(data), versions)
+    if post is None:
+        raise await _awrite_failed(post_id, versions)
+    await cache.aset_post(post_id, post)
+    await cache.abump_list_version()
+    await http_cache.apurge_posts([post_id])
+    return post
+
+
+async def adelete_post(post_id: int, versions: list[datetime] | None = None) -> None:
+    # The tombstone needs transaction.atomic(), which the async ORM does not support
+    if not await sync_to_async(_versioned(post_id, versions).delete_recorded)():
+        raise await _awrite_failed(post_id, versions)
+    await cache.aset_post_missing(post_id)
+    await cache.abump_list_version()
+    await http_cache.apurge_posts([post_id])
+
+
+async def agenerate_token(username: str, password: str) -> str:
+    user = await aauthenticate(username=username, password=password)
+    if not user:
+        raise HttpError(401, "Invalid credentials")
+
+    token = await _reusable_tokens(user).afirst()
+    if token:
+        return token
+
+    token, expires_at = _new_token()
+    await UserToken.objects.acreate(user=user, token=token, expires_at=expires_at)
+
+    return token
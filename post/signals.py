@@ -0,0 +1,43 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from .authentication import bump_token_version
+from .models import UserToken
+
+
+@receiver(post_save, sender=UserToken)
+def revoke_cached_token_on_save(sender, instance, created, **kwargs):
+    # New tokens are never cached yet; any later change (is_active, expires_at) may revoke one
+    if not created:
+        bump_token_version()
+
+
+@receiver(post_delete, sender=UserToken)
+def revoke_cached_token_on_delete(sender, instance, **kwargs):
+    # Expired or inactive tokens (e.g. removed by prune_tokens) can't be cached as valid
+    if instance.is_active and instance.expires_at > timezone.now():
+        bump_token_version()
+
+
+# User fields whose change must reach cached tokens; deferred ones count as changed once loaded
+REVOKING_USER_FIELDS = ("is_active", "password")
+
+
+def _revoking_fields(user: User) -> tuple:
+    return tuple(user.__dict__.get(name) for name in REVOKING_USER_FIELDS)
+
+
+@receiver(post_init, sender=User)
+def remember_revoking_user_fields(sender, instance, **kwargs):
+    instance._revoking_fields = _revoking_fields(instance)
+
+
+@receiver(post_save, sender=User)
+def revoke_cached_tokens_on_user_change(sender, instance, created, **kwargs):
+    # Cached entries hold the User object, so deactivation or a new password must not wait for
+    # the TTL. Other saves, such as update_last_login on every login, leave the cache alone.
+    fields = _revoking_fields(instance)
+    if not created and fields != instance._revoking_fields:
+        bump_token_version()
+    instance._revoking_fields = fields
@@ -1,10 +1,28 @@
-from django.test import TestCase
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
 from unittest.mock import patch, MagicMock
-from django.http import Http404
-from datetime import datetime
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+import json
+import logging
+import queue
+import uuid
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import skipUnless
 from pydantic import ValidationError
 
+from ninja.errors import HttpError
+from ninja.parser import Parser
+from ninja.renderers import JSONRenderer
+from blog.middleware import SiteMiddleware
+from blog.readiness import ReadinessMonitor, WorkerStatsMiddleware, stats as worker_stats
+from blog.logging_queue import DroppingQueueHandler, RepeatedErrorFilter, ReportingQueueListener
+from blog.routers import PIN_COOKIE, PrimaryReplicaRouter, ReadYourWritesMiddleware, use_primary
+from blog.renderers import ORJSONParser, ORJSONRenderer, get_parser, get_renderer, orjson
+
 from .services import list_posts, get_post, create_post, update_post, delete_post
+from .pagination import encode_cursor, decode_cursor
+from .cache import LocalTTLCache, reset_backend
+from .endpoints import Endpoints, call
 from .models import Posts
 from .schemas import PostCreate, PostUpdate, PostOut
 
@@ -14,6 +32,7 @@ class PostServicesUnitTest(TestCase):
 
     def setUp(self):
         """Set up test data and mocks"""
+        reset_backend()
         # Create a sample post data that matches the PostOut schema
         self.sample_post_data = {
             "id": 1,
@@ -189,62 +208,381 @@ class PostServicesUnitTest(TestCase):
         except ValidationError:
             self.fail("Valid updates should not raise ValidationError")
 
-    @patch("post.services.get_object_or_404")
-    def test_update_post(self, mock_get_object):
+    @patch("post.services._update_returning")
+    def test_update_post(self, mock_update):
         """Test updating an existing post
 
         Should:
-        1. Update post with new title only
-        2. Update post with new content only
-        3. Update post with both new title and content
-        4. Raise Http404 if post doesn't exist
+        1. Write only the provided fields, plus updated_at, in one statement
+        2. Pass If-Match versions through to that statement
+        3. Raise Http404 if post doesn't exist
         """
-        # Setup mock to return an existing post
-        mock_get_object.return_value = self.sample_post
+        mock_update.return_value = PostOut(**self.sample_post_data)
 
         # Test updating title only
-        update_data = PostUpdate(title="New Title")
-        result = update_post(1, update_data)
-        self.assertEqual(self.sample_post.title, "New Title")
-        self.sample_post.save.assert_called_once()
-        self.sample_post.save.reset_mock()
-
-        # Test updating content only
-        update_data = PostUpdate(content="New Content")
-        result = update_post(1, update_data)
-        self.assertEqual(self.sample_post.content, "New Content")
-        self.sample_post.save.assert_called_once()
-        self.sample_post.save.reset_mock()
-
-        # Test updating both title and content
-        update_data = PostUpdate(title="Updated Title", content="Updated Content")
-        result = update_post(1, update_data)
-        self.assertEqual(self.sample_post.title, "Updated Title")
-        self.assertEqual(self.sample_post.content, "Updated Content")
-        self.sample_post.save.assert_called_once()
+        result = update_post(1, PostUpdate(title="New Title"))
+        self.assertEqual(result.id, 1)
+        post_id, values, versions = mock_update.call_args.args
+        self.assertEqual(post_id, 1)
+        self.assertEqual(set(values), {"title", "updated_at"})
+        self.assertEqual(values["title"], "New Title")
+        self.assertIsNone(versions)
+
+        # Test updating content only, conditionally
+        version = datetime.now(dt_timezone.utc)
+        update_post(1, PostUpdate(content="New Content"), [version])
+        post_id, values, versions = mock_update.call_args.args
+        self.assertEqual(set(values), {"content", "updated_at"})
+        self.assertEqual(versions, [version])
 
         # Test updating non-existent post
-        mock_get_object.side_effect = Http404
+        mock_update.return_value = None
         with self.assertRaises(Http404):
-            update_post(999, update_data)
+            update_post(999, PostUpdate(title="Updated Title"))
 
-    @patch("post.services.get_object_or_404")
-    def test_delete_post(self, mock_get_object):
+    @patch("post.services._versioned")
+    def test_delete_post(self, mock_versioned):
         """Test deleting a post
 
         Should:
-        1. Delete the post if it exists
-        2. Raise Http404 if post doesn't exist
+        1. Delete the post and its tombstone through the filtered queryset
+        2. Raise Http404 if no row was deleted
         """
-        # Setup mock to return a post
-        mock_get_object.return_value = self.sample_post
+        mock_versioned.return_value.delete_recorded.return_value = [1]
 
         # Test deleting existing post
         delete_post(1)
-        mock_get_object.assert_called_with(Posts, pk=1)
-        self.sample_post.delete.assert_called_once()
+        mock_versioned.assert_called_with(1, None)
+        mock_versioned.return_value.delete_recorded.assert_called_once()
 
         # Test deleting non-existent post
-        mock_get_object.side_effect = Http404
+        mock_versioned.return_value.delete_recorded.return_value = []
         with self.assertRaises(Http404):
             delete_post(999)
+
+
+class CursorUnitTest(TestCase):
+    """Unit tests for keyset pagination cursors"""
+
+    def test_cursor_round_trip(self):
+        """Encoded cursors should decode back to the same (created_at, id)"""
+        created_at = datetime(2025, 3, 20, 10, 0, 0, 123456)
+        cursor = encode_cursor(created_at, 42)
+        self.assertNotIn("=", cursor)
+        self.assertEqual(decode_cursor(cursor), (created_at, 42))
+
+    def test_invalid_cursor(self):
+        """Malformed cursors should raise a 400 HttpError"""
+        for cursor in ["not-a-cursor", "", encode_cursor(datetime(2025, 1, 1), 1)[:-3]]:
+            with self.assertRaises(HttpError) as context:
+                decode_cursor(cursor)
+            self.assertEqual(context.exception.status_code, 400)
+
+
+class EndpointsUnitTest(SimpleTestCase):
+    """Unit tests for handlers shared by the sync and async routers"""
+
+    def setUp(self):
+        self.endpoints = Endpoints()
+
+        async def adouble(value):
+            return value * 2
+
+        @self.endpoints.get("/double")
+        def double(request, value: int):
+            doubled = yield call(lambda value: value * 2, adouble, value)
+            return {"value": doubled}
+
+    def view(self, asynchronous: bool):
+        router = self.endpoints.build_router(asynchronous=asynchronous)
+        return router.path_operations["/double"].operations[0].view_func
+
+    def test_sync_view_runs_sync_side(self):
+        self.assertEqual(self.view(asynchronous=False)(None, value=2), {"value": 4})
+
+    async def test_async_view_awaits_async_twin(self):
+        self.assertEqual(await self.view(asynchronous=True)(None, value=2), {"value": 4})
+
+    def test_handlers_must_yield_their_calls(self):
+        with self.assertRaises(TypeError):
+            self.endpoints.get("/plain")(lambda request: {})
+
+
+class LocalTTLCacheUnitTest(TestCase):
+    """Unit tests for the in-process LRU/TTL cache"""
+
+    def test_lru_eviction(self):
+        """The least recently used entry should be evicted past max_entries"""
+        local_cache = LocalTTLCache(max_entries=2)
+        local_cache.set("a", 1)
+        local_cache.set("b", 2)
+        local_cache.get("a")
+        local_cache.set("c", 3)
+        self.assertEqual(local_cache.get("a"), 1)
+        self.assertIsNone(local_cache.get("b"))
+        self.assertEqual(len(local_cache), 2)
+
+    @patch("post.cache.time.monotonic")
+    def test_ttl_expiry(self, mock_monotonic):
+        """Entries should expire after their timeout; a None timeout never expires"""
+        mock_monotonic.return_value = 100
+        local_cache = LocalTTLCache(timeout=10)
+        local_cache.set("a", 1)
+        local_cache.set("forever", 1, None)
+        mock_monotonic.return_value = 111
+        self.assertIsNone(local_cache.get("a"))
+        self.assertEqual(local_cache.get("forever"), 1)
+
+    def test_incr(self):
+        """incr should add to existing values and raise ValueError for missing keys"""
+        local_cache = LocalTTLCache()
+        local_cache.set("version", 1)
+        self.assertEqual(local_cache.incr("version"), 2)
+        with self.assertRaises(ValueError):
+            local_cache.incr("missing")
+
+
+@skipUnless(orjson, "orjson is not installed")
+class ORJSONRendererUnitTest(TestCase):
+    """Unit tests for the orjson renderer and parser"""
+
+    def render_both(self, data):
+        default = JSONRenderer().render(None, data, response_status=200)
+        fast = ORJSONRenderer().render(None, data, response_status=200)
+        return json.loads(default), json.loads(fast)
+
+    def test_datetimes_match_default_renderer(self):
+        """Datetimes keep Django's millisecond/"Z" format for every timezone and precision"""
+        data = {
+            "utc_micro": datetime(2025, 3, 20, 10, 0, 0, 123456, tzinfo=dt_timezone.utc),
+            "utc_whole": datetime(2025, 3, 20, 10, 0, 0, tzinfo=dt_timezone.utc),
+            "offset": datetime(2025, 3, 20, 10, 0, 0, 5000, tzinfo=dt_timezone(timedelta(hours=2))),
+            "naive": datetime(2025, 3, 20, 10, 0, 0, 999999),
+            "date": date(2025, 3, 20),
+            "time": time(10, 0, 0, 123456),
+        }
+        default, fast = self.render_both(data)
+        self.assertEqual(fast, default)
+        self.assertEqual(fast["utc_micro"], "2025-03-20T10:00:00.123Z")
+
+    def test_other_types_match_default_renderer(self):
+        """Decimals, UUIDs, schemas and non-string keys render like ninja's encoder"""
+        post = PostOut(
+            id=1, title="Title", content="Ünïcode", created_at=datetime(2025, 1, 1), updated_at=datetime(2025, 1, 1)
+        )
+        data = {"decimal": Decimal("1.50"), "uuid": uuid.UUID(int=1), "post": post, 1: "int key"}
+        default, fast = self.render_both(data)
+        self.assertEqual(fast, default)
+
+    def test_parser(self):
+        request = MagicMock(body=b'{"title": "T\\u00fc", "content": "C"}')
+        self.assertEqual(ORJSONParser().parse_body(request), {"title": "Tü", "content": "C"})
+
+    def test_fallback_without_orjson(self):
+        """The default renderer and parser are used when orjson is missing or disabled"""
+        with patch("blog.renderers.orjson", None):
+            self.assertIs(type(get_renderer()), JSONRenderer)
+            self.assertIs(type(get_parser()), Parser)
+        with self.settings(API_FAST_JSON=False):
+            self.assertIs(type(get_renderer()), JSONRenderer)
+        self.assertIs(type(get_renderer()), ORJSONRenderer)
+
+
+@override_settings(DB_REPLICAS=["replica1"], DB_REPLICA_STICKY_SECONDS=5)
+class PrimaryReplicaRouterUnitTest(SimpleTestCase):
+    """Unit tests for read-replica routing and read-your-writes pinning"""
+
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+
+    def test_routing(self):
+        """Reads go to a replica unless pinned or inside a transaction; writes go to the primary"""
+        self.assertEqual(self.router.db_for_read(Posts), "replica1")
+        self.assertEqual(self.router.db_for_write(Posts), "default")
+        with use_primary():
+            self.assertEqual(self.router.db_for_read(Posts), "default")
+        self.assertEqual(self.router.db_for_read(Posts), "replica1")
+        with patch("blog.routers.connections", {"default": MagicMock(in_atomic_block=True)}):
+            self.assertEqual(self.router.db_for_read(Posts), "default")
+        self.assertFalse(self.router.allow_migrate("replica1", "post"))
+
+    def test_no_replicas(self):
+        with self.settings(DB_REPLICAS=[]):
+            self.assertEqual(self.router.db_for_read(Posts), "default")
+
+    def test_middleware_pins_writers(self):
+        """Unsafe requests read from the primary and set the pin cookie; the cookie pins later reads"""
+        factory = RequestFactory()
+        seen = []
+
+        def view(request):
+            seen.append(self.router.db_for_read(Posts))
+            return HttpResponse()
+
+        middleware = ReadYourWritesMiddleware(view)
+        response = middleware(factory.post("/api/v1/posts"))
+        self.assertEqual(response.cookies[PIN_COOKIE]["max-age"], 5)
+
+        middleware(factory.get("/api/v1/posts"))
+        pinned = factory.get("/api/v1/posts")
+        pinned.COOKIES[PIN_COOKIE] = "1"
+        middleware(pinned)
+        self.assertEqual(seen, ["default", "replica1", "default"])
+        self.assertEqual(self.router.db_for_read(Posts), "replica1")
+
+
+class LoggingQueueUnitTest(SimpleTestCase):
+    """Unit tests for the bounded log queue and the repeated-error filter"""
+
+    def make_record(self, msg, name="api.error"):
+        return logging.LogRecord(name, logging.ERROR, __file__, 1, msg, None, None)
+
+    def test_full_queue_drops_and_counts(self):
+        """A full queue should drop records without blocking, and the listener should report the count"""
+        handler = DroppingQueueHandler(queue.Queue(2))
+        for number in range(5):
+            handler.handle(self.make_record(f"error {number}"))
+        self.assertEqual(handler.dropped, 3)
+
+        target = MagicMock(level=logging.NOTSET)
+        listener = ReportingQueueListener(handler, target, logger_name="api.error")
+        listener.start()
+        listener.stop()
+        messages = [call.args[0].getMessage() for call in target.handle.call_args_list]
+        self.assertEqual(messages, ["Log queue full: dropped 3 records", "error 0", "error 1"])
+
+    def test_records_stay_structured(self):
+        """Dict messages should reach the handlers unformatted, for the JSON formatter"""
+        handler = DroppingQueueHandler(queue.Queue())
+        handler.handle(self.make_record({"error_type": "HttpError", "path": "/api/v1/posts"}))
+        self.assertEqual(handler.queue.get_nowait().msg["error_type"], "HttpError")
+
+    @patch("blog.logging_queue.time.monotonic")
+    def test_repeated_errors_rate_limited(self, mock_monotonic):
+        """Identical errors past the burst are suppressed until the window ends"""
+        mock_monotonic.return_value = 100
+        error_filter = RepeatedErrorFilter(burst=2, window=60)
+        error = {"error_type": "HttpError", "path": "/api/v1/posts/1", "status_code": 404}
+        allowed = [error_filter.filter(self.make_record(dict(error))) for _ in range(5)]
+        self.assertEqual(allowed, [True, True, False, False, False])
+        # A different path is a different error
+        self.assertTrue(error_filter.filter(self.make_record({**error, "path": "/api/v1/posts/2"})))
+
+        mock_monotonic.return_value = 161
+        record = self.make_record(dict(error))
+        self.assertTrue(error_filter.filter(record))
+        self.assertEqual(record.msg["suppressed"], 3)
+
+
+class SiteMiddlewareUnitTest(SimpleTestCase):
+    """Unit tests for skipping the session/CSRF/messages stack on API paths"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.seen = []
+
+        def view(request):
+            self.seen.append(request)
+            return HttpResponse()
+
+        self.view = view
+        self.middleware = SiteMiddleware(view)
+
+    def test_api_requests_skip_site_middleware(self):
+        response = self.middleware(self.factory.get("/api/v1/posts"))
+        self.assertFalse(hasattr(self.seen[0], "session"))
+        self.assertNotIn("X-Frame-Options", response.headers)
+        # CSRF is not checked for API paths
+        request = self.factory.post("/api/v1/posts")
+        self.assertIsNone(self.middleware.process_view(request, self.view, (), {}))
+
+    def test_other_paths_run_site_middleware(self):
+        response = self.middleware(self.factory.get("/admin/"))
+        self.assertTrue(hasattr(self.seen[0], "session"))
+        self.assertTrue(hasattr(self.seen[0], "user"))
+        self.assertEqual(response.headers["X-Frame-Options"], "DENY")
+        # process_view is relayed, so CSRF still protects the admin
+        request = self.factory.post("/admin/login/")
+        self.middleware(request)
+        self.assertEqual(self.middleware.process_view(request, self.view, (), {}).status_code, 403)
+
+
+class ReadinessUnitTest(SimpleTestCase):
+    """Unit tests for the cached readiness checks and worker stats"""
+
+    @staticmethod
+    def refuse():
+        raise ConnectionError("connection refused")
+
+    def test_ready_when_every_check_passes(self):
+        monitor = ReadinessMonitor({"database:default": lambda: None}, interval=3600, stale_after=60)
+        status = monitor.status()
+        self.assertEqual(status["status"], "ready")
+        self.assertTrue(status["checks"]["database:default"]["ok"])
+        self.assertIn("uptime_seconds", status["worker"])
+
+    def test_failing_check(self):
+        checks = {"database:default": lambda: None, "cache": self.refuse}
+        monitor = ReadinessMonitor(checks, interval=3600, stale_after=60)
+        status = monitor.status()
+        self.assertEqual(status["status"], "unavailable")
+        self.assertEqual(status["checks"]["cache"]["error"], "ConnectionError: connection refused")
+
+    def test_probes_reuse_the_last_result(self):
+        calls = []
+        monitor = ReadinessMonitor({"database:default": lambda: calls.append(1)}, interval=3600, stale_after=60)
+        for _ in range(5):
+            monitor.status()
+        self.assertEqual(len(calls), 1)
+
+    def test_stale_result_is_not_ready(self):
+        """A checker stuck on a hanging check must not keep reporting its last success"""
+        monitor = ReadinessMonitor({"database:default": lambda: None}, interval=3600, stale_after=-1)
+        self.assertEqual(monitor.status()["status"], "unavailable")
+
+    def test_worker_stats_middleware_counts_in_flight(self):
+        seen = []
+
+        def view(request):
+            seen.append(worker_stats.in_flight)
+            return HttpResponse()
+
+        in_flight, served = worker_stats.in_flight, worker_stats.served
+        WorkerStatsMiddleware(view)(RequestFactory().get("/api/health"))
+        self.assertEqual(seen, [in_flight + 1])
+        self.assertEqual((worker_stats.in_flight, worker_stats.served), (in_flight, served + 1))
+
+    def test_streaming_response_in_flight_until_sent(self):
+        """A streamed body is still being served after the view returns, until it is drained"""
+        in_flight, served = worker_stats.in_flight, worker_stats.served
+        response = WorkerStatsMiddleware(lambda request: StreamingHttpResponse(iter([b"a", b"b"])))(
+            RequestFactory().get("/api/v1/posts/changes/stream")
+        )
+        chunks = iter(response)
+        self.assertEqual(next(chunks), b"a")
+        self.assertEqual(worker_stats.in_flight, in_flight + 1)
+        self.assertEqual(list(chunks), [b"b"])
+        self.assertEqual((worker_stats.in_flight, worker_stats.served), (in_flight, served + 1))
+
+    def test_streaming_response_closed_early(self):
+        in_flight = worker_stats.in_flight
+        response = WorkerStatsMiddleware(lambda request: StreamingHttpResponse(iter([b"a", b"b"])))(
+            RequestFactory().get("/api/v1/posts/export")
+        )
+        next(iter(response))
+        response.close()
+        self.assertEqual(worker_stats.in_flight, in_flight)
+
+    async def test_async_streaming_response_in_flight_until_sent(self):
+        async def chunks():
+            yield b"a"
+
+        async def view(request):
+            return StreamingHttpResponse(chunks())
+
+        in_flight = worker_stats.in_flight
+        response = await WorkerStatsMiddleware(view)(RequestFactory().get("/api/v1/posts/export"))
+        self.assertEqual(worker_stats.in_flight, in_flight + 1)
+        self.assertEqual([chunk async for chunk in response], [b"a"])
+        self.assertEqual(worker_stats.in_flight, in_flight)
+